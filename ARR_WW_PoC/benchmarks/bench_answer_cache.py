@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Answer cache lookup latency on misses and hits
+
+Fills an AnswerCache in a temporary directory with synthetic entries (random
+query embeddings over a pool of retrieved chunk sets), then times lookups for
+three cases: a chunk set that was never cached, a cached chunk set with an
+unrelated query, and a paraphrase (slightly perturbed embedding) of a cached
+query. Exits with status 1 if the p99 miss latency exceeds --max-miss-ms.
+
+Usage (from ARR_WW_PoC/):
+    python benchmarks/bench_answer_cache.py --entries 50000
+    python benchmarks/bench_answer_cache.py --entries 200000 --chunk-sets 20000
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_rag import latency_summary
+from benchmarks.fakes import ANSWER
+
+def random_unit(rng, dim: int) -> np.ndarray:
+    vector = rng.standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+def time_lookups(cache, cases):
+    """Time cache.get for each (embedding, chunk IDs); returns (seconds per lookup, hits)"""
+    latencies, hits = [], 0
+    for embedding, chunk_ids in cases:
+        start = time.perf_counter()
+        result = cache.get(embedding, chunk_ids)
+        latencies.append(time.perf_counter() - start)
+        hits += result is not None
+    return latencies, hits
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer cache lookup benchmark")
+    parser.add_argument("--entries", type=int, default=50000, help="Cached answers")
+    parser.add_argument("--chunk-sets", type=int, default=5000, help="Distinct retrieved chunk sets cached")
+    parser.add_argument("--dim", type=int, default=768, help="Embedding dimension")
+    parser.add_argument("--lookups", type=int, default=5000, help="Lookups timed per case")
+    parser.add_argument("--noise", type=float, default=0.01, help="Perturbation of paraphrase embeddings")
+    parser.add_argument("--max-miss-ms", type=float, default=1.0, help="Fail if p99 miss latency exceeds this")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
+    from src.answer_cache import AnswerCache
+    
+    rng = np.random.default_rng(args.seed)
+    chunk_sets = [[f"chunk-{i}-{j}" for j in range(5)] for i in range(args.chunk_sets)]
+    sources = [f"[{j + 1}] report.pdf (Page: {j})" for j in range(5)]
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        cache = AnswerCache(os.path.join(workdir, "answers.sqlite3"), max_entries=args.entries)
+        entries = []
+        start = time.perf_counter()
+        for number in range(args.entries):
+            embedding = random_unit(rng, args.dim)
+            chunk_ids = chunk_sets[number % args.chunk_sets]
+            cache.put(f"question {number}", embedding, chunk_ids, ANSWER, sources)
+            entries.append((embedding, chunk_ids))
+        fill_seconds = time.perf_counter() - start
+        
+        picks = rng.integers(0, len(entries), args.lookups)
+        unseen = [(random_unit(rng, args.dim), [f"unseen-{i}-{j}" for j in range(5)]) for i in range(args.lookups)]
+        unrelated = [(random_unit(rng, args.dim), entries[i][1]) for i in picks]
+        paraphrases = []
+        for i in picks:
+            embedding, chunk_ids = entries[i]
+            noisy = embedding + rng.standard_normal(args.dim).astype(np.float32) * args.noise
+            paraphrases.append((noisy / np.linalg.norm(noisy), list(reversed(chunk_ids))))
+        
+        results = {}
+        for name, cases in [("miss_new_chunks", unseen), ("miss_same_chunks", unrelated), ("hit_paraphrase", paraphrases)]:
+            latencies, hits = time_lookups(cache, cases)
+            results[name] = {**latency_summary(latencies), "hit_rate": hits / len(cases)}
+        
+        # Reopening rebuilds the in-memory lookup from SQLite
+        cache.close()
+        start = time.perf_counter()
+        cache = AnswerCache(os.path.join(workdir, "answers.sqlite3"), max_entries=args.entries)
+        reload_seconds = time.perf_counter() - start
+        cache.close()
+    
+    print(f"\n{args.entries} cached answers over {args.chunk_sets} chunk sets "
+          f"(filled in {fill_seconds:.1f}s, reopened in {reload_seconds:.2f}s)")
+    for name, row in results.items():
+        print(f"  {name:>16}: p50 {row['p50_ms']} ms, p99 {row['p99_ms']} ms, hit rate {row['hit_rate']:.0%}")
+    
+    worst_miss = max(results["miss_new_chunks"]["p99_ms"], results["miss_same_chunks"]["p99_ms"])
+    if worst_miss > args.max_miss_ms:
+        print(f"❌ p99 miss latency {worst_miss} ms exceeds {args.max_miss_ms} ms")
+        sys.exit(1)
+    print(f"✅ p99 miss latency {worst_miss} ms (limit {args.max_miss_ms} ms)")
+
+if __name__ == "__main__":
+    main()
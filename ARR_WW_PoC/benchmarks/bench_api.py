@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Load test of the HTTP API server against a local stub LLM
+
+Indexes a synthetic corpus, starts the API server in-process, and drives
+/query (or /query/stream) from many concurrent clients. A share of the
+requests repeat a small set of hot queries so request coalescing shows up in
+the number of calls that reach the stub LLM.
+
+Usage (from ARR_WW_PoC/):
+    python benchmarks/bench_api.py --requests 2000 --clients 64
+    python benchmarks/bench_api.py --stream --max-concurrency 8 --max-queue 8
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+import threading
+
+import aiohttp
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.corpus import generate_corpus, make_queries
+from benchmarks.fakes import FakeEmbeddings, StubLLMServer
+from benchmarks.bench_rag import latency_summary, git_commit
+
+def start_api(app: web.Application, port: int) -> asyncio.AbstractEventLoop:
+    """Serve app on its own event loop in a background thread"""
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app)
+    ready = threading.Event()
+    
+    def serve():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+        ready.set()
+        loop.run_forever()
+        loop.run_until_complete(runner.cleanup())
+    
+    threading.Thread(target=serve, name="bench-api", daemon=True).start()
+    ready.wait()
+    return loop
+
+async def drive(url: str, queries, clients: int, stream: bool) -> dict:
+    """Send every query from `clients` concurrent workers, honouring Retry-After on 429"""
+    latencies, statuses = [], {}
+    pending = list(reversed(queries))
+    endpoint = f"{url}/query/stream" if stream else f"{url}/query"
+    
+    async def client(session: aiohttp.ClientSession):
+        while pending:
+            query = pending.pop()
+            start = time.perf_counter()
+            async with session.post(endpoint, json={"query": query}) as response:
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+                if response.status == 429:
+                    pending.append(query)
+                    await asyncio.sleep(float(response.headers.get("Retry-After", 1)) * random.random())
+                    continue
+                await response.read()
+            latencies.append(time.perf_counter() - start)
+    
+    connector = aiohttp.TCPConnector(limit=clients)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(session) for _ in range(clients)))
+        wall = time.perf_counter() - start
+    return {
+        **latency_summary(latencies),
+        "throughput_qps": round(len(latencies) / wall, 2),
+        "statuses": statuses
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the RAG HTTP API")
+    parser.add_argument("--documents", type=int, default=50, help="Files in the synthetic corpus")
+    parser.add_argument("--requests", type=int, default=1000, help="Total requests sent")
+    parser.add_argument("--clients", type=int, default=64, help="Concurrent HTTP clients")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.5,
+                        help="Share of requests drawn from a small set of hot queries")
+    parser.add_argument("--hot-queries", type=int, default=5)
+    parser.add_argument("--stream", action="store_true", help="Load the SSE endpoint instead of /query")
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--llm-latency-ms", type=float, default=200)
+    parser.add_argument("--llm-jitter-ms", type=float, default=50)
+    parser.add_argument("--workdir", help="Directory for the corpus and index (default: a temp dir)")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/api-<commit>.json)")
+    args = parser.parse_args()
+    
+    commit = git_commit()
+    output = os.path.abspath(args.output or os.path.join(ROOT, "benchmarks", "results", f"api-{commit}.json"))
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="bench_api_"))
+    os.makedirs(workdir, exist_ok=True)
+    
+    server = StubLLMServer(args.llm_latency_ms, args.llm_jitter_ms).start()
+    os.environ.update({
+        "CEREBRAS_API_BASE": server.url,
+        "CEREBRAS_API_KEY": "offline-benchmark",
+        "QUERY_CACHE_ENABLED": "false",
+        "SYNC_ON_STARTUP": "false",
+        "HF_HUB_OFFLINE": "1",
+        "TRANSFORMERS_OFFLINE": "1",
+        "ANONYMIZED_TELEMETRY": "False"
+    })
+    os.chdir(workdir)
+    
+    try:
+        print(f"📄 Indexing {args.documents} documents in {workdir}")
+        _, samples = generate_corpus("./data", args.documents, 0.0, 1, 40)
+        
+        from src.config import config
+        from src.resources import set_embedding_model
+        from src.vectorstore import VectorStoreManager
+        from src.rag_engine import RAGEngine
+        from src.api_server import RAGApiServer
+        set_embedding_model(FakeEmbeddings())
+        manager = VectorStoreManager()
+        manager.sync_documents(config.DATA_DIR)
+        manager.close()
+        
+        api = RAGApiServer(RAGEngine(), args.max_concurrency, args.max_queue)
+        loop = start_api(api.create_app(), args.port)
+        
+        unique = make_queries(samples, args.requests)
+        hot = unique[:args.hot_queries]
+        rng = random.Random(0)
+        queries = [rng.choice(hot) if rng.random() < args.duplicate_ratio else query for query in unique]
+        
+        print(f"🚀 {args.requests} requests from {args.clients} clients "
+              f"({args.duplicate_ratio:.0%} hot, {'stream' if args.stream else 'json'})")
+        load = asyncio.run(drive(f"http://127.0.0.1:{args.port}", queries, args.clients, args.stream))
+        report = {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "settings": vars(args),
+            "load": {
+                **load,
+                "rejected": api.admission.rejected,
+                "coalesced": api.coalesced,
+                "llm_requests": server.requests
+            }
+        }
+        loop.call_soon_threadsafe(loop.stop)
+    finally:
+        server.stop()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    
+    load = report["load"]
+    print(f"\nLatency p50 {load['p50_ms']} ms, p99 {load['p99_ms']} ms, {load['throughput_qps']} queries/s")
+    print(f"429 responses: {load['rejected']}, coalesced: {load['coalesced']}, "
+          f"LLM calls: {load['llm_requests']} for {args.requests} requests")
+    print(f"✅ Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Character vs token chunking: splitting throughput, chunk count and chunk sizes
+
+Loads the pages of a synthetic corpus (or --data-dir) once, splits them with
+the character splitter (CHUNK_SIZE / CHUNK_OVERLAP) and the token splitter
+(CHUNK_SIZE_TOKENS / CHUNK_OVERLAP_TOKENS), and reports pages/s, chunks,
+chunk length in embedding-model tokens and the share of chunks the model
+would truncate at EMBEDDING_MAX_TOKENS. Needs the tokenizer of
+EMBEDDING_MODEL in the local Hugging Face cache.
+
+Usage (from ARR_WW_PoC/):
+    python benchmarks/bench_chunking.py --documents 200
+    python benchmarks/bench_chunking.py --data-dir ./data
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.corpus import generate_corpus
+
+def load_pages(data_dir: str):
+    from src.vectorstore import iter_file_pages
+    pages = []
+    for filename in sorted(os.listdir(data_dir)):
+        if filename.endswith((".pdf", ".txt")):
+            pages.extend(iter_file_pages(os.path.join(data_dir, filename), filename))
+    return pages
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunking benchmark")
+    parser.add_argument("--documents", type=int, default=100, help="Synthetic documents (ignored with --data-dir)")
+    parser.add_argument("--data-dir", help="Split an existing document directory instead")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per splitter; the best is kept")
+    args = parser.parse_args()
+    
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+    from transformers import AutoTokenizer
+    from src.config import config
+    from src.vectorstore import build_text_splitter, text_splitter_signature
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        data_dir = args.data_dir
+        if not data_dir:
+            data_dir = os.path.join(workdir, "data")
+            generate_corpus(data_dir, args.documents)
+        pages = load_pages(data_dir)
+    
+    tokenizer = AutoTokenizer.from_pretrained(config.EMBEDDING_MODEL).backend_tokenizer
+    tokenizer.no_truncation()
+    limit = config.EMBEDDING_MAX_TOKENS - 2
+    print(f"{len(pages)} pages, {sum(len(page.page_content) for page in pages) / 2**20:.1f} MB of text")
+    
+    for mode in ("characters", "tokens"):
+        splitter = build_text_splitter(mode=mode)
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            chunks = splitter.split_documents(pages)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        lengths = np.asarray([len(encoding.ids) for encoding in tokenizer.encode_batch(
+            [chunk.page_content for chunk in chunks], add_special_tokens=False)])
+        print(f"\n  {text_splitter_signature(mode)}")
+        print(f"    {len(pages) / best:10.0f} pages/s, {len(chunks)} chunks")
+        print(f"    tokens per chunk: mean {lengths.mean():.0f}, p5 {np.percentile(lengths, 5):.0f}, "
+              f"max {lengths.max()}; {(lengths > limit).mean():.1%} over the {config.EMBEDDING_MAX_TOKENS}-token limit")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate chunk elimination: throughput, accuracy and memory at scale
+
+Generates --chunks synthetic chunks, a --duplicates share of which are
+re-issued editions of an earlier chunk (each word replaced with probability
+--edit-rate), and runs them through ChunkDeduplicator. Reports chunks/s, how
+many editions at or above the threshold were collapsed (recall), how many
+collapsed chunks were merged into a chunk below threshold - 0.05 (false
+merges), bytes saved, the SQLite index size and the peak resident memory,
+which stays flat as --chunks grows.
+
+Usage (from ARR_WW_PoC/):
+    python benchmarks/bench_dedup.py --chunks 200000
+    python benchmarks/bench_dedup.py --chunks 20000 --threshold 0.8 --edit-rate 0.03
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import resource
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.dedup import ChunkDeduplicator
+
+def shingles(text: str, size: int = ChunkDeduplicator.SHINGLE_SIZE) -> set:
+    words = text.lower().split()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def jaccard(a: str, b: str) -> float:
+    a, b = shingles(a), shingles(b)
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate chunk elimination benchmark")
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--duplicates", type=float, default=0.3, help="Share of chunks that are edited copies")
+    parser.add_argument("--edit-rate", type=float, default=0.01, help="Probability each word of a copy is replaced")
+    parser.add_argument("--words", type=int, default=160, help="Words per chunk")
+    parser.add_argument("--threshold", type=float, default=0.9)
+    parser.add_argument("--num-perm", type=int, default=128)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    vocab = [f"term{i}" for i in range(50000)]
+    # Originals are kept only within a bounded window, like editions of
+    # reports ingested near each other
+    window = []
+    expected = collapsed = recalled = false_merges = 0
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        dedup = ChunkDeduplicator(os.path.join(workdir, "dedup.sqlite3"), args.threshold, args.num_perm)
+        print(f"LSH: {dedup.bands} bands x {dedup.rows} rows over {args.num_perm} permutations, "
+              f"threshold {args.threshold}")
+        elapsed = 0.0
+        for number in range(args.chunks):
+            chunk_id = f"{number:032x}"
+            original = None
+            if window and rng.random() < args.duplicates:
+                original_id, original = window[rng.randrange(len(window))]
+                text = " ".join(rng.choice(vocab) if rng.random() < args.edit_rate else word
+                                for word in original.split())
+            else:
+                text = " ".join(rng.choice(vocab) for _ in range(args.words))
+            
+            start = time.perf_counter()
+            group_id = dedup.assign(chunk_id, text, f"report-{number // 100}.pdf", number % 100)
+            if number % 1000 == 999:
+                dedup.commit()
+            elapsed += time.perf_counter() - start
+            
+            similarity = jaccard(text, original) if original is not None else 0.0
+            if original is not None and similarity >= args.threshold:
+                expected += 1
+                recalled += group_id != chunk_id
+            if group_id != chunk_id:
+                collapsed += 1
+                if original is None or (group_id != original_id and similarity < args.threshold - 0.05):
+                    false_merges += 1
+            elif len(window) < 2000:
+                window.append((chunk_id, text))
+            else:
+                window[rng.randrange(len(window))] = (chunk_id, text)
+        dedup.commit()
+        stats = dedup.stats()
+        dedup.close()
+        size = sum(os.path.getsize(os.path.join(workdir, name)) for name in os.listdir(workdir))
+    
+    print(f"  {args.chunks / elapsed:10.0f} chunks/s ({elapsed:.1f}s in the deduplicator)")
+    print(f"  collapsed {collapsed} chunks; recall {recalled / max(expected, 1):.1%} of {expected} "
+          f"copies at or above the threshold; {false_merges} false merges")
+    print(f"  saved {stats['total_saved_bytes'] / 2**20:.1f} MB of text and {stats['total_saved_chunks']} embeddings")
+    # ru_maxrss is in KB on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"  index {size / 2**20:.1f} MB on disk, peak resident memory {peak:.0f} MB")
+
+if __name__ == "__main__":
+    main()
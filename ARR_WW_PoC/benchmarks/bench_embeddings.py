@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Query-embedding throughput per core: batch-1 PyTorch vs micro-batched runtimes
+
+Embeds the same queries with the reference sentence-transformers model one at
+a time, then through MicroBatchingEmbeddings from many concurrent threads on
+each available runtime (PyTorch, ONNX float32, ONNX int8), and reports
+queries/s, queries/s per core, latency percentiles, mean batch size and the
+cosine agreement of each runtime with the reference. Needs the embedding
+model in the local Hugging Face cache (and onnxruntime for the ONNX rows).
+
+Usage (from ARR_WW_PoC/):
+    python benchmarks/bench_embeddings.py --queries 2000 --concurrency 32
+    python benchmarks/bench_embeddings.py --runtimes torch onnx-int8 --window-ms 5
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.corpus import generate_corpus, make_queries
+from benchmarks.bench_rag import latency_summary, git_commit
+
+def run_concurrent(embeddings, queries, concurrency: int):
+    """Embed every query from `concurrency` threads; returns (wall seconds, per-query seconds)"""
+    def timed(query):
+        start = time.perf_counter()
+        embeddings.embed_query(query)
+        return time.perf_counter() - start
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed, queries))
+    return time.perf_counter() - start, latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding throughput benchmark")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32, help="Threads issuing embed_query calls")
+    parser.add_argument("--runtimes", nargs="+", default=["torch", "onnx", "onnx-int8"],
+                        choices=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--window-ms", type=float, help="Micro-batching window (default: EMBEDDING_BATCH_WINDOW_MS)")
+    parser.add_argument("--max-batch", type=int, help="Micro-batch size cap (default: EMBEDDING_BATCH_MAX_SIZE)")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/embeddings-<commit>.json)")
+    args = parser.parse_args()
+    
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+    from src.config import config
+    from src.embedding_service import MicroBatchingEmbeddings, cosine_agreement, load_onnx_embeddings, VERIFY_TEXTS
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    
+    commit = git_commit()
+    output = os.path.abspath(args.output or os.path.join(ROOT, "benchmarks", "results", f"embeddings-{commit}.json"))
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    window_ms = config.EMBEDDING_BATCH_WINDOW_MS if args.window_ms is None else args.window_ms
+    max_batch = args.max_batch or config.EMBEDDING_BATCH_MAX_SIZE
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        _, samples = generate_corpus(os.path.join(workdir, "data"), 50, 0.0, 1, 20)
+    queries = make_queries(samples, args.queries)
+    
+    reference = HuggingFaceEmbeddings(model_name=config.EMBEDDING_MODEL)
+    reference.embed_query("warm up")
+    start = time.perf_counter()
+    baseline = []
+    for query in queries[:min(len(queries), 200)]:
+        query_start = time.perf_counter()
+        reference.embed_query(query)
+        baseline.append(time.perf_counter() - query_start)
+    baseline_qps = len(baseline) / (time.perf_counter() - start)
+    results = {
+        "torch-batch1": {
+            **latency_summary(baseline),
+            "queries_per_second": round(baseline_qps, 1),
+            "queries_per_second_per_core": round(baseline_qps / cores, 2)
+        }
+    }
+    
+    for runtime in args.runtimes:
+        try:
+            model = reference if runtime == "torch" else load_onnx_embeddings(runtime)
+        except Exception as e:
+            print(f"⚠️  Skipping {runtime}: {e}")
+            continue
+        agreement = cosine_agreement(reference, model, VERIFY_TEXTS + queries[:50])
+        service = MicroBatchingEmbeddings(model, window_ms, max_batch)
+        run_concurrent(service, queries[:args.concurrency * 2], args.concurrency)
+        service.batches = service.queries = 0
+        wall, latencies = run_concurrent(service, queries, args.concurrency)
+        qps = len(queries) / wall
+        results[f"{runtime}-microbatch"] = {
+            **latency_summary(latencies),
+            "queries_per_second": round(qps, 1),
+            "queries_per_second_per_core": round(qps / cores, 2),
+            "mean_batch": round(service.stats()["mean_batch"], 1),
+            "cosine_mean": round(agreement["mean"], 5),
+            "cosine_min": round(agreement["min"], 5)
+        }
+    
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {**vars(args), "cores": cores, "window_ms": window_ms, "max_batch": max_batch},
+        "results": results
+    }
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    
+    print(f"\n{cores} cores, {args.concurrency} concurrent callers")
+    for name, row in results.items():
+        extra = f", mean batch {row['mean_batch']}, cosine min {row['cosine_min']}" if "mean_batch" in row else ""
+        print(f"  {name:>20}: {row['queries_per_second']:>8} q/s ({row['queries_per_second_per_core']} per core), "
+              f"p50 {row['p50_ms']} ms, p99 {row['p99_ms']} ms{extra}")
+    print(f"✅ Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Ingest memory check: peak working memory must not grow with corpus size
+
+Indexes a corpus of large PDFs and a corpus --scale times bigger, each in a
+fresh interpreter, and measures Python allocations with tracemalloc. The working
+set of an ingest is its peak minus what is still held afterwards (the
+lexical index and manifest grow with the corpus by design). Streaming ingest
+keeps the working set bounded by UPSERT_BATCH_SIZE, so it must stay within
+--max-growth of the small run; the check fails otherwise.
+
+Usage (from ARR_WW_PoC/):
+    python benchmarks/bench_ingest_memory.py
+    python benchmarks/bench_ingest_memory.py --documents 20 --scale 8 --pages-per-pdf 100
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.fakes import FakeEmbeddings
+
+def measure_ingest(workdir: str, documents: int, pages_per_pdf: int, dim: int) -> dict:
+    """Index a fresh corpus in workdir; returns chunk count and traced memory in bytes"""
+    os.chdir(workdir)
+    from src.config import config
+    from src.resources import set_embedding_model
+    from src.vectorstore import VectorStoreManager
+    set_embedding_model(FakeEmbeddings(dim))
+    
+    generate_corpus("./data", documents, 1.0, pages_per_pdf, 40)
+    manager = VectorStoreManager()
+    manager.embeddings
+    manager._open_vector_store()
+    
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    stats = manager.sync_documents(config.DATA_DIR)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    manager.close()
+    return {
+        "documents": documents,
+        "chunks": stats["added_chunks"],
+        "batch_size": config.UPSERT_BATCH_SIZE,
+        "working_set": peak - after,
+        "retained": after - before
+    }
+
+def run_isolated(workdir: str, documents: int, args) -> dict:
+    """Measure one ingest in a fresh interpreter, so runs share no clients or caches"""
+    os.makedirs(workdir)
+    command = [sys.executable, os.path.abspath(__file__), "--measure", workdir,
+               "--documents", str(documents), "--pages-per-pdf", str(args.pages_per_pdf), "--dim", str(args.dim)]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Ingest of {documents} documents failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that ingest memory is bounded by the batch size")
+    parser.add_argument("--documents", type=int, default=10, help="PDFs in the small corpus")
+    parser.add_argument("--scale", type=int, default=4, help="Size of the large corpus relative to the small one")
+    parser.add_argument("--pages-per-pdf", type=int, default=60)
+    parser.add_argument("--max-growth", type=float, default=1.5,
+                        help="Allowed working-set ratio between the large and the small run")
+    parser.add_argument("--dim", type=int, default=768, help="Dimension of the fake embeddings")
+    parser.add_argument("--measure", metavar="WORKDIR", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    os.environ.update({
+        "EMBEDDING_CACHE_ENABLED": "false",
+        "INGEST_WORKERS": "1",
+        "VECTOR_BACKEND": "chroma",
+        "HF_HUB_OFFLINE": "1",
+        "TRANSFORMERS_OFFLINE": "1",
+        "ANONYMIZED_TELEMETRY": "False"
+    })
+    if args.measure:
+        print(json.dumps(measure_ingest(args.measure, args.documents, args.pages_per_pdf, args.dim)))
+        return
+    
+    workdir = tempfile.mkdtemp(prefix="bench_ingest_memory_")
+    try:
+        runs = [
+            run_isolated(os.path.join(workdir, f"run{number}"), documents, args)
+            for number, documents in enumerate((args.documents, args.documents * args.scale))
+        ]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    print(f"\nBatch size: {runs[0]['batch_size']} chunks")
+    for run in runs:
+        print(f"  {run['documents']:>5} PDFs, {run['chunks']:>7} chunks: "
+              f"working set {run['working_set'] / 2**20:.1f} MB, retained {run['retained'] / 2**20:.1f} MB")
+    
+    small, large = runs
+    # Allow 1 MB of slack so tiny corpora don't fail on allocator noise
+    limit = small["working_set"] * args.max_growth + 2**20
+    if large["working_set"] > limit:
+        print(f"❌ Working set grew from {small['working_set'] / 2**20:.1f} MB to "
+              f"{large['working_set'] / 2**20:.1f} MB with a {args.scale}x larger corpus "
+              f"(limit {limit / 2**20:.1f} MB)")
+        sys.exit(1)
+    print(f"\n✅ Ingest working set bounded ({large['working_set'] / small['working_set']:.2f}x "
+          f"for a {args.scale}x larger corpus)")
+
+if __name__ == "__main__":
+    main()
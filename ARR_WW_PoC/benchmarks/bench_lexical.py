@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+BM25 lookup latency of LexicalIndex at a million chunks
+
+Builds the postings of --chunks synthetic chunks (--words tokens each, drawn
+with the skewed word frequencies of benchmarks/corpus.py, a --burstiness share
+of them repeating a few topic words per chunk) directly as arrays,
+then times LexicalIndex.search for queries of 1-4 words: the impact-ordered
+search with early exit against scoring every posting of the query terms.
+Both must return the same top k. The impact orders of the query terms are
+computed on the first search of each and reported separately; indexes saved
+by VectorStoreManager or written to snapshots carry them.
+
+Usage (from ARR_WW_PoC/):
+    python benchmarks/bench_lexical.py
+    python benchmarks/bench_lexical.py --chunks 200000 --words 160 --k 20
+    python benchmarks/bench_lexical.py --burstiness 0
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.corpus import make_vocabulary
+from benchmarks.bench_rag import latency_summary, git_commit
+from src.lexical_index import LexicalIndex, tokenize
+
+def build_arrays(chunks: int, words: int, vocabulary_size: int, seed: int,
+                 burstiness: float = 0.0, topics: int = 4, batch: int = 50000) -> dict:
+    """Postings of a synthetic corpus in the layout LexicalIndex.to_arrays() returns
+    
+    A `burstiness` share of each chunk's tokens repeat one of `topics` words
+    picked for that chunk, as words cluster in real text; the rest are drawn
+    independently.
+    """
+    rng = np.random.default_rng(seed)
+    terms, docs, tfs = [], [], []
+    lengths = rng.integers(words // 2, words * 3 // 2 + 1, size=chunks).astype(np.uint32)
+    for start in range(0, chunks, batch):
+        end = min(chunks, start + batch)
+        doc = np.repeat(np.arange(start, end, dtype=np.int64), lengths[start:end])
+        term = (vocabulary_size * rng.random(len(doc)) ** 3).astype(np.int64)
+        if burstiness:
+            chunk_topics = (vocabulary_size * rng.random((end - start, topics)) ** 3).astype(np.int64)
+            bursty = rng.random(len(doc)) < burstiness
+            term[bursty] = chunk_topics[doc[bursty] - start, rng.integers(0, topics, size=int(bursty.sum()))]
+        pairs, counts = np.unique(term * chunks + doc, return_counts=True)
+        terms.append((pairs // chunks).astype(np.uint32))
+        docs.append((pairs % chunks).astype(np.uint32))
+        tfs.append(np.minimum(counts, 65535).astype(np.uint16))
+    terms, docs, tfs = np.concatenate(terms), np.concatenate(docs), np.concatenate(tfs)
+    # Batches cover increasing chunk numbers, so a stable sort by term keeps
+    # each term's postings in chunk order
+    order = np.argsort(terms, kind="stable")
+    terms, docs, tfs = terms[order], docs[order], tfs[order]
+    present, starts = np.unique(terms, return_index=True)
+    return {
+        "term_ids": present,
+        "offsets": np.append(starts, len(terms)).astype(np.int64),
+        "docs": docs,
+        "tfs": tfs,
+        "doc_ids": np.array([f"{number:032x}" for number in range(chunks)], dtype=str),
+        "doc_lengths": lengths
+    }
+
+def exhaustive_search(index: LexicalIndex, query: str, k: int) -> list:
+    """Score every posting of the query terms, as LexicalIndex did before impact ordering"""
+    n = index.live_count
+    avg_length = index.total_length / n
+    doc_parts, score_parts = [], []
+    for term in set(tokenize(query)):
+        entry = index._get_postings(term)
+        if entry is None or len(entry[0]) > index.max_df_ratio * len(index.doc_ids):
+            continue
+        docs, tfs = entry
+        idf = float(np.log(1.0 + (n - len(docs) + 0.5) / (len(docs) + 0.5)))
+        doc_parts.append(docs)
+        score_parts.append(idf * index._weights(tfs, docs, avg_length))
+    if not doc_parts:
+        return []
+    docs, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+    scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+    if len(docs) > k:
+        top = np.argpartition(-scores, k)[:k]
+        docs, scores = docs[top], scores[top]
+    order = np.argsort(-scores)
+    return [(index.doc_ids[docs[i]], float(scores[i])) for i in order]
+
+def main():
+    parser = argparse.ArgumentParser(description="BM25 lookup latency at scale")
+    parser.add_argument("--chunks", type=int, default=1000000)
+    parser.add_argument("--words", type=int, default=80, help="Mean tokens per chunk")
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--burstiness", type=float, default=0.3,
+                        help="Share of each chunk's tokens drawn from its own few topic words (0 = independent words)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20, help="Results per search (hybrid fetches k * multiplier)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/lexical-<commit>.json)")
+    args = parser.parse_args()
+    
+    commit = git_commit()
+    output = os.path.abspath(args.output or os.path.join(ROOT, "benchmarks", "results", f"lexical-{commit}.json"))
+    
+    print(f"🔤 Building postings for {args.chunks} chunks of ~{args.words} tokens")
+    start = time.perf_counter()
+    arrays = build_arrays(args.chunks, args.words, args.vocabulary, args.seed, args.burstiness)
+    vocabulary = make_vocabulary(args.vocabulary, random.Random(args.seed))
+    arrays["terms"] = np.array([vocabulary[term] for term in arrays.pop("term_ids").tolist()], dtype=str)
+    index = LexicalIndex.from_arrays("", arrays)
+    build_seconds = time.perf_counter() - start
+    postings = len(arrays["docs"])
+    print(f"  {postings} postings in {build_seconds:.1f}s")
+    
+    rng = random.Random(args.seed)
+    queries = [" ".join(vocabulary[int(args.vocabulary * rng.random() ** 3)] for _ in range(rng.randint(1, 4)))
+               for _ in range(args.queries)]
+    
+    # First search of each query computes the impact orders of its terms
+    start = time.perf_counter()
+    for query in queries:
+        index.search(query, args.k)
+    first_seconds = time.perf_counter() - start
+    
+    impact, exhaustive = [], []
+    for query in queries:
+        started = time.perf_counter()
+        hits = index.search(query, args.k)
+        impact.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        expected = exhaustive_search(index, query, args.k)
+        exhaustive.append(time.perf_counter() - started)
+        assert np.allclose([score for _, score in hits], [score for _, score in expected], rtol=1e-5), query
+    
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": vars(args),
+        "postings": postings,
+        "build_seconds": round(build_seconds, 2),
+        "first_search_seconds": round(first_seconds, 2),
+        "impact_ordered": latency_summary(impact),
+        "exhaustive": latency_summary(exhaustive)
+    }
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    
+    for name in ("impact_ordered", "exhaustive"):
+        stats = report[name]
+        print(f"{name:>15}: p50 {stats['p50_ms']} ms, p99 {stats['p99_ms']} ms, mean {stats['mean_ms']} ms")
+    print(f"✅ Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Prompt size and latency of MMR retrieval against plain dense retrieval
+
+Indexes a synthetic corpus of PDFs with many near-duplicate pages, then
+builds the LLM prompt for the same queries with RETRIEVAL_MODE=dense and
+RETRIEVAL_MODE=mmr and compares chunks sent and prompt tokens. Also times
+the MMR selection step alone on MMR_FETCH_K random candidates.
+
+Usage (from ARR_WW_PoC/):
+    python benchmarks/bench_mmr.py --documents 100 --queries 200
+    python benchmarks/bench_mmr.py --duplicate-page-ratio 0.8 --fetch-k 200
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.corpus import generate_corpus, make_queries
+from benchmarks.fakes import FakeEmbeddings
+from benchmarks.bench_rag import latency_summary, git_commit
+
+def prompt_stats(engine, queries, k: int) -> dict:
+    """Chunks retrieved and prompt tokens per query in the current retrieval mode"""
+    from src.context_packer import count_tokens
+    chunks, tokens, seconds = [], [], []
+    for query in queries:
+        start = time.perf_counter()
+        documents = engine._retrieve_documents(query, k)
+        seconds.append(time.perf_counter() - start)
+        messages, _ = engine._build_messages(query, documents)
+        chunks.append(len(documents))
+        tokens.append(sum(count_tokens(message["content"]) for message in messages))
+    return {
+        "chunks_per_query": round(float(np.mean(chunks)), 2),
+        "prompt_tokens_mean": round(float(np.mean(tokens)), 1),
+        "prompt_tokens_p50": float(np.percentile(tokens, 50)),
+        "retrieval": latency_summary(seconds)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="MMR vs dense retrieval prompt size")
+    parser.add_argument("--documents", type=int, default=60, help="PDFs in the synthetic corpus")
+    parser.add_argument("--pages-per-pdf", type=int, default=8)
+    parser.add_argument("--duplicate-page-ratio", type=float, default=0.6,
+                        help="Share of pages that are near-copies of the previous page")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--fetch-k", type=int, help="MMR candidate pool (default: MMR_FETCH_K)")
+    parser.add_argument("--dim", type=int, default=768, help="Dimension of the fake embeddings")
+    parser.add_argument("--workdir", help="Directory for the corpus and index (default: a temp dir)")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/mmr-<commit>.json)")
+    args = parser.parse_args()
+    
+    commit = git_commit()
+    output = os.path.abspath(args.output or os.path.join(ROOT, "benchmarks", "results", f"mmr-{commit}.json"))
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="bench_mmr_"))
+    os.makedirs(workdir, exist_ok=True)
+    
+    os.environ.update({
+        "CEREBRAS_API_KEY": "offline-benchmark",
+        "QUERY_CACHE_ENABLED": "false",
+        "SYNC_ON_STARTUP": "false",
+        "HF_HUB_OFFLINE": "1",
+        "TRANSFORMERS_OFFLINE": "1",
+        "ANONYMIZED_TELEMETRY": "False"
+    })
+    if args.fetch_k:
+        os.environ["MMR_FETCH_K"] = str(args.fetch_k)
+    os.chdir(workdir)
+    
+    try:
+        print(f"📄 Indexing {args.documents} PDFs ({args.duplicate_page_ratio:.0%} near-duplicate pages)")
+        _, samples = generate_corpus("./data", args.documents, 1.0, args.pages_per_pdf, 40,
+                                     duplicate_page_ratio=args.duplicate_page_ratio)
+        queries = make_queries(samples, args.queries)
+        
+        from src.config import config
+        from src.resources import set_embedding_model
+        from src.vectorstore import VectorStoreManager
+        from src.rag_engine import RAGEngine
+        from src.mmr import maximal_marginal_relevance
+        set_embedding_model(FakeEmbeddings(args.dim))
+        manager = VectorStoreManager()
+        manager.sync_documents(config.DATA_DIR)
+        manager.close()
+        
+        engine = RAGEngine()
+        modes = {}
+        for mode in ("dense", "mmr"):
+            config.RETRIEVAL_MODE = mode
+            modes[mode] = prompt_stats(engine, queries, config.RETRIEVAL_COUNT)
+        engine.close()
+        
+        rng = np.random.default_rng(0)
+        candidates = rng.normal(size=(config.MMR_FETCH_K, args.dim)).astype(np.float32)
+        query = rng.normal(size=args.dim).astype(np.float32)
+        selection = []
+        for _ in range(200):
+            start = time.perf_counter()
+            maximal_marginal_relevance(query, candidates, config.MMR_RESULT_COUNT, config.MMR_LAMBDA)
+            selection.append(time.perf_counter() - start)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    
+    dense, mmr = modes["dense"]["prompt_tokens_mean"], modes["mmr"]["prompt_tokens_mean"]
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {**vars(args), "fetch_k": config.MMR_FETCH_K, "result_count": config.MMR_RESULT_COUNT,
+                     "lambda": config.MMR_LAMBDA},
+        "modes": modes,
+        "prompt_token_reduction": round(1 - mmr / dense, 3) if dense else 0.0,
+        "mmr_selection": latency_summary(selection)
+    }
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    
+    for mode, stats in modes.items():
+        print(f"{mode:>5}: {stats['chunks_per_query']} chunks, {stats['prompt_tokens_mean']} prompt tokens, "
+              f"retrieval p50 {stats['retrieval']['p50_ms']} ms")
+    print(f"Prompt tokens reduced by {report['prompt_token_reduction']:.1%}; "
+          f"MMR selection over {config.MMR_FETCH_K} candidates: p50 {report['mmr_selection']['p50_ms']} ms")
+    print(f"✅ Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of ingest, retrieval and end-to-end query latency
+
+Generates a synthetic text/PDF corpus, indexes it with VectorStoreManager,
+times search_documents and RAGEngine.process_query against a local stub of
+the Cerebras endpoint, and writes the results as JSON so runs can be compared
+across commits. Runs fully offline on CPU.
+
+Usage (from ARR_WW_PoC/):
+    python benchmarks/bench_rag.py --documents 200 --queries 200
+    python benchmarks/bench_rag.py --embeddings real --llm-latency-ms 500 --concurrency 16
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.corpus import generate_corpus, make_queries
+from benchmarks.fakes import FakeEmbeddings, StubLLMServer
+
+def latency_summary(seconds) -> dict:
+    ms = np.asarray(seconds) * 1000
+    return {
+        "count": len(ms),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3)
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline RAG benchmark")
+    parser.add_argument("--documents", type=int, default=100, help="Files in the synthetic corpus")
+    parser.add_argument("--pdf-ratio", type=float, default=0.3, help="Share of files written as PDF")
+    parser.add_argument("--pages-per-pdf", type=int, default=5)
+    parser.add_argument("--sentences-per-page", type=int, default=40)
+    parser.add_argument("--embeddings", choices=["fake", "real"], default="fake",
+                        help="Deterministic hashing embeddings, or the configured model (must be cached locally)")
+    parser.add_argument("--dim", type=int, default=768, help="Dimension of the fake embeddings")
+    parser.add_argument("--queries", type=int, default=100, help="Queries timed per stage")
+    parser.add_argument("--concurrency", type=int, default=8, help="Threads for the throughput run")
+    parser.add_argument("--llm-latency-ms", type=float, default=200)
+    parser.add_argument("--llm-jitter-ms", type=float, default=50)
+    parser.add_argument("--llm-tokens", type=int, default=40)
+    parser.add_argument("--embedding-cache", action="store_true", help="Keep the embedding cache enabled")
+    parser.add_argument("--workdir", help="Directory for the corpus and index (default: a temp dir)")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/rag-<commit>.json)")
+    args = parser.parse_args()
+    
+    commit = git_commit()
+    output = os.path.abspath(args.output or os.path.join(ROOT, "benchmarks", "results", f"rag-{commit}.json"))
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="bench_rag_"))
+    os.makedirs(workdir, exist_ok=True)
+    
+    server = StubLLMServer(args.llm_latency_ms, args.llm_jitter_ms, args.llm_tokens).start()
+    # Config is read at import time, so point it at the stub before importing src
+    os.environ.update({
+        "CEREBRAS_API_BASE": server.url,
+        "CEREBRAS_API_KEY": "offline-benchmark",
+        "EMBEDDING_CACHE_ENABLED": "true" if args.embedding_cache else "false",
+        "SYNC_ON_STARTUP": "false",
+        "HF_HUB_OFFLINE": "1",
+        "TRANSFORMERS_OFFLINE": "1",
+        "ANONYMIZED_TELEMETRY": "False"
+    })
+    # Index, data and cache paths in config are relative to the working directory
+    os.chdir(workdir)
+    
+    try:
+        print(f"📄 Generating {args.documents} documents in {workdir}")
+        filenames, samples = generate_corpus(
+            "./data", args.documents, args.pdf_ratio, args.pages_per_pdf, args.sentences_per_page
+        )
+        queries = make_queries(samples, args.queries * 2)
+        
+        from src.config import config
+        from src.resources import set_embedding_model
+        from src.metrics import metrics
+        if args.embeddings == "fake":
+            set_embedding_model(FakeEmbeddings(args.dim))
+        
+        from src.vectorstore import VectorStoreManager
+        manager = VectorStoreManager()
+        _, model_load = timed(lambda: manager.embeddings)
+        
+        print("📥 Ingest")
+        stats, ingest_seconds = timed(manager.sync_documents, config.DATA_DIR)
+        ingest = {
+            "files": len(filenames),
+            "chunks": stats["added_chunks"],
+            "seconds": round(ingest_seconds, 3),
+            "docs_per_s": round(len(filenames) / ingest_seconds, 2),
+            "chunks_per_s": round(stats["added_chunks"] / ingest_seconds, 2),
+            "model_load_s": round(model_load, 3)
+        }
+        
+        print("🔎 search_documents")
+        for query in queries[:5]:
+            manager.search_documents(query, config.RETRIEVAL_COUNT)
+        search_times = [timed(manager.search_documents, query, config.RETRIEVAL_COUNT)[1]
+                        for query in queries[:args.queries]]
+        manager.close()
+        
+        print("🤖 process_query")
+        from src.rag_engine import RAGEngine
+        engine = RAGEngine()
+        sequential = []
+        failures = 0
+        for query in queries[:args.queries]:
+            result, seconds = timed(engine.process_query, query)
+            sequential.append(seconds)
+            failures += not result["success"]
+        
+        concurrent_queries = queries[args.queries:]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            results = list(executor.map(engine.process_query, concurrent_queries))
+        wall = time.perf_counter() - start
+        failures += sum(not result["success"] for result in results)
+        engine.close()
+        
+        report = {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "settings": vars(args),
+            "ingest": ingest,
+            "search_documents": latency_summary(search_times),
+            "process_query": {
+                **latency_summary(sequential),
+                "throughput_qps": round(len(concurrent_queries) / wall, 2),
+                "concurrency": args.concurrency,
+                "failures": failures,
+                "llm_requests": server.requests
+            },
+            "stages": metrics.summary()
+        }
+    finally:
+        server.stop()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    
+    print(f"\nIngest: {ingest['docs_per_s']} docs/s, {ingest['chunks_per_s']} chunks/s ({ingest['chunks']} chunks)")
+    print(f"search_documents: p50 {report['search_documents']['p50_ms']} ms, p99 {report['search_documents']['p99_ms']} ms")
+    e2e = report["process_query"]
+    print(f"process_query: p50 {e2e['p50_ms']} ms, p99 {e2e['p99_ms']} ms, "
+          f"{e2e['throughput_qps']} queries/s at concurrency {args.concurrency} ({failures} failures)")
+    print(f"✅ Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Memory of many concurrent chat sessions over one shared engine
+
+Drives SessionManager with thousands of sessions, each holding a long
+conversation, against an engine stub that returns fixed-size answers, and
+reports memory traced by tracemalloc alongside SessionManager.stats(). With
+the ring buffer, the per-turn token cap and max_sessions, memory should level
+off however many sessions and turns are simulated.
+
+Usage (from ARR_WW_PoC/):
+    python benchmarks/bench_sessions.py --sessions 5000 --turns 50
+    python benchmarks/bench_sessions.py --sessions 50000 --max-sessions 10000
+"""
+
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import ANSWER
+
+class EchoEngine:
+    """Stands in for RAGEngine: answers instantly with a fixed-size answer"""
+    
+    def __init__(self, answer_words: int):
+        self.answer = " ".join((ANSWER * (answer_words // 12 + 1)).split()[:answer_words])
+        self.history_messages = 0
+    
+    def process_query(self, query, embedding=None, history=None):
+        self.history_messages += len(history or [])
+        return {"success": True, "answer": self.answer, "sources": [], "documents_retrieved": 0,
+                "query": query, "timings": {}}
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat session memory benchmark")
+    parser.add_argument("--sessions", type=int, default=5000, help="Sessions simulated")
+    parser.add_argument("--turns", type=int, default=40, help="Questions asked per session")
+    parser.add_argument("--answer-words", type=int, default=300, help="Length of each stub answer")
+    parser.add_argument("--max-sessions", type=int, help="Session cap (default: SESSION_MAX_SESSIONS)")
+    parser.add_argument("--report-every", type=int, default=1000, help="Sessions between memory reports")
+    args = parser.parse_args()
+    
+    from src.config import config
+    from src.sessions import SessionManager
+    
+    engine = EchoEngine(args.answer_words)
+    manager = SessionManager(engine, max_sessions=args.max_sessions or config.SESSION_MAX_SESSIONS)
+    
+    tracemalloc.start()
+    start = time.perf_counter()
+    for number in range(1, args.sessions + 1):
+        session_id = f"user-{number}"
+        for turn in range(args.turns):
+            manager.process_query(session_id, f"Follow-up question {turn} about the monsoon report?")
+        if number % args.report_every == 0 or number == args.sessions:
+            traced, _ = tracemalloc.get_traced_memory()
+            stats = manager.stats()
+            print(f"  {number:>7} sessions simulated, {stats['sessions']:>6} held: traced {traced / 2**20:7.1f} MB, "
+                  f"{stats['mean_session_bytes'] / 1024:.1f} KB per session (max {stats['max_session_bytes'] / 1024:.1f} KB)")
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    queries = args.sessions * args.turns
+    stats = manager.stats()
+    print(f"\n{queries} queries in {elapsed:.2f}s ({queries / elapsed:.0f}/s of session bookkeeping)")
+    print(f"Sessions held: {stats['sessions']}, evicted: {stats['evicted']}, "
+          f"history memory {stats['bytes'] / 2**20:.1f} MB, traced peak {peak / 2**20:.1f} MB")
+    print(f"History messages sent per query: {engine.history_messages / queries:.1f} "
+          f"(SESSION_HISTORY_TOKENS={config.SESSION_HISTORY_TOKENS})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Cold-start time of an index snapshot versus the NumPy index directory
+
+Writes the same synthetic chunks (random embeddings, short texts, source/page
+metadata) to a snapshot bundle and to a NumPy index directory, then opens each
+in a fresh interpreter and reports the time to open it and to answer a first
+query, with and without snapshot checksum verification. Hybrid retrieval also
+needs the BM25 index: the snapshot carries it, while the directory has to
+rebuild it from the texts ("numpy+bm25").
+
+Usage (from ARR_WW_PoC/):
+    python benchmarks/bench_snapshot.py --chunks 200000 --dim 768
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def build(workdir: str, chunks: int, dim: int, seed: int):
+    from src.numpy_index import NumpyIndexWriter
+    from src.snapshot import SnapshotWriter
+    
+    rng = np.random.default_rng(seed)
+    snapshot = SnapshotWriter(os.path.join(workdir, "index.ragsnap"), chunks, dim, embedding_model="bench")
+    directory = NumpyIndexWriter(os.path.join(workdir, "numpy_index"), chunks, dim)
+    for start in range(0, chunks, 1000):
+        count = min(1000, chunks - start)
+        ids = [f"{row:032x}" for row in range(start, start + count)]
+        vectors = rng.standard_normal((count, dim)).astype(np.float32)
+        texts = [f"Chunk {row} of the synthetic corpus about monsoon rainfall." for row in range(start, start + count)]
+        metadatas = [{"source": f"report-{row // 50}.pdf", "page": row % 50, "chunk_id": chunk_id}
+                     for row, chunk_id in zip(range(start, start + count), ids)]
+        snapshot.add(ids, vectors, texts, metadatas)
+        directory.add(ids, vectors, texts, metadatas)
+    snapshot.commit()
+    directory.commit()
+
+def measure(kind: str, workdir: str, dim: int):
+    """Runs in a fresh interpreter: open the index, answer one query, print timings as JSON"""
+    from src.lexical_index import LexicalIndex
+    
+    start = time.perf_counter()
+    lexical_index = None
+    if kind.startswith("numpy"):
+        from src.numpy_index import NumpyVectorIndex
+        index = NumpyVectorIndex(os.path.join(workdir, "numpy_index"))
+        if kind == "numpy+bm25":
+            lexical_index = LexicalIndex("")
+            for ids, texts in index.iter_texts():
+                lexical_index.add(ids, texts)
+    else:
+        from src.snapshot import SnapshotIndex
+        index = SnapshotIndex(os.path.join(workdir, "index.ragsnap"), embedding_model="bench",
+                              verify=kind == "snapshot-verified")
+        lexical_index = index.load_lexical_index("")
+    opened = time.perf_counter()
+    hits = index.search(np.ones(dim, dtype=np.float32), 5)
+    if lexical_index is not None:
+        hits += lexical_index.search("chunk 12345 monsoon rainfall", 5)
+    index.get([chunk_id for chunk_id, _ in hits])
+    done = time.perf_counter()
+    print(json.dumps({"open_ms": (opened - start) * 1000, "first_query_ms": (done - opened) * 1000}))
+
+def main():
+    parser = argparse.ArgumentParser(description="Index snapshot cold-start benchmark")
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--measure", nargs=2, metavar=("KIND", "WORKDIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.measure:
+        measure(args.measure[0], args.measure[1], args.dim)
+        return
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        build(workdir, args.chunks, args.dim, args.seed)
+        print(f"Built {args.chunks} chunks x {args.dim} dims in {time.perf_counter() - start:.1f}s "
+              f"(snapshot {os.path.getsize(os.path.join(workdir, 'index.ragsnap')) / 2**20:.1f} MB)")
+        for kind in ("numpy", "numpy+bm25", "snapshot", "snapshot-verified"):
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--dim", str(args.dim), "--measure", kind, workdir],
+                capture_output=True, text=True, check=True
+            )
+            timings = json.loads(result.stdout.strip().splitlines()[-1])
+            print(f"  {kind:>18}: open {timings['open_ms']:8.1f} ms, first query {timings['first_query_ms']:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark with a regression budget, based on `python -X importtime`
+
+Each target is imported in a fresh interpreter. The benchmark reports the
+total import time (best of --repeat runs) and the slowest modules, and fails
+if a target exceeds its time budget or imports a module it must not pull in.
+
+Usage (from ARR_WW_PoC/):
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --budget-scale 2 --top 15
+"""
+
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must stay out of the lightweight startup paths
+HEAVY_MODULES = ("streamlit", "torch", "transformers", "sentence_transformers", "chromadb")
+
+TARGETS = [
+    {
+        "name": "package",
+        "code": "import src",
+        "budget_ms": 150,
+        "forbidden": HEAVY_MODULES + ("langchain_core", "langchain_community", "numpy", "requests")
+    },
+    {
+        "name": "cli",
+        "code": "import src.main",
+        "budget_ms": 150,
+        "forbidden": HEAVY_MODULES + ("langchain_core", "langchain_community", "numpy", "requests")
+    },
+    {
+        "name": "engine",
+        "code": "from src.rag_engine import RAGEngine",
+        "budget_ms": 1200,
+        "forbidden": HEAVY_MODULES + ("aiohttp", "langchain_community", "langchain_text_splitters")
+    },
+]
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def parse_importtime(stderr: str):
+    """Return (total_us, {module: (self_us, cumulative_us)}) from -X importtime output"""
+    modules = {}
+    total = 0
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = int(match[1]), int(match[2]), match[3], match[4]
+        modules[module] = (self_us, cumulative_us)
+        # Top-level imports (one space of indent) add up to the total
+        if len(indent) == 1:
+            total += cumulative_us
+    return total, modules
+
+def run_target(code: str, python: str):
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "import failed")
+    return parse_importtime(result.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time benchmark with regression budget")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per target; the best is kept")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to list per target")
+    parser.add_argument("--budget-scale", type=float, default=1.0,
+                        help="Multiply every budget, e.g. for slow CI machines")
+    parser.add_argument("--python", default=sys.executable)
+    args = parser.parse_args()
+    
+    failures = []
+    for target in TARGETS:
+        try:
+            runs = [run_target(target["code"], args.python) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"❌ {target['name']}: {e}")
+            failures.append(target["name"])
+            continue
+        total, modules = min(runs, key=lambda run: run[0])
+        budget_ms = target["budget_ms"] * args.budget_scale
+        total_ms = total / 1000
+        
+        status = "✅" if total_ms <= budget_ms else "❌"
+        print(f"\n{status} {target['name']}: `{target['code']}` {total_ms:.1f} ms (budget {budget_ms:.0f} ms)")
+        for module, (self_us, cumulative_us) in sorted(modules.items(), key=lambda item: -item[1][0])[:args.top]:
+            print(f"    {self_us / 1000:8.2f} ms self {cumulative_us / 1000:8.2f} ms cumulative  {module}")
+        
+        leaked = sorted({module.split(".")[0] for module in modules} & set(target["forbidden"]))
+        if leaked:
+            print(f"    ❌ imports modules it should not: {', '.join(leaked)}")
+        if total_ms > budget_ms or leaked:
+            failures.append(target["name"])
+    
+    if failures:
+        print(f"\n❌ Startup budget exceeded: {', '.join(failures)}")
+        sys.exit(1)
+    print("\n✅ All startup targets within budget")
+
+if __name__ == "__main__":
+    main()
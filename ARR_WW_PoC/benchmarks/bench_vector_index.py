@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark the NumPy vector index against Chroma: recall@k and search latency
+
+Usage (from ARR_WW_PoC/):
+    python benchmarks/bench_vector_index.py --chunks 100000 --dim 768 --queries 200
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.numpy_index import NumpyIndexWriter, NumpyVectorIndex
+
+def make_corpus(chunks: int, dim: int, queries: int, seed: int = 0):
+    """Clustered unit vectors (like sentence embeddings) and nearby queries"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, chunks // 100), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), chunks)]
+    vectors += 0.6 * rng.standard_normal((chunks, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    picks = rng.integers(0, chunks, queries)
+    query_vectors = vectors[picks] + 0.3 * rng.standard_normal((queries, dim)).astype(np.float32) / np.sqrt(dim)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    return vectors, query_vectors
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Brute-force L2 neighbours in float32"""
+    norms = np.einsum("ij,ij->i", vectors, vectors)
+    result = []
+    for start in range(0, len(queries), 64):
+        scores = 2 * queries[start:start + 64] @ vectors.T - norms
+        result.append(np.argsort(-scores, axis=1)[:, :k])
+    return np.concatenate(result)
+
+def recall(found, truth: np.ndarray, k: int) -> float:
+    return float(np.mean([len(set(ids[:k]) & set(row.tolist())) / k for ids, row in zip(found, truth)]))
+
+def latency_stats(seconds) -> dict:
+    ms = np.asarray(seconds) * 1000
+    return {"p50_ms": float(np.percentile(ms, 50)), "p95_ms": float(np.percentile(ms, 95))}
+
+def bench_numpy(path, vectors, queries, truth, k, quantization):
+    start = time.perf_counter()
+    writer = NumpyIndexWriter(path, len(vectors), vectors.shape[1], quantization)
+    for offset in range(0, len(vectors), 1000):
+        batch = range(offset, min(offset + 1000, len(vectors)))
+        writer.add([str(i) for i in batch], vectors[offset:offset + 1000],
+                   [f"chunk {i}" for i in batch], [{"row": i} for i in batch])
+    writer.commit()
+    build = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    index = NumpyVectorIndex(path)
+    open_time = time.perf_counter() - start
+    
+    found, timings = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = index.search(query, k)
+        timings.append(time.perf_counter() - start)
+        found.append([int(chunk_id) for chunk_id, _ in hits])
+    
+    start = time.perf_counter()
+    index.search_batch(queries, k)
+    batch_per_query = (time.perf_counter() - start) / len(queries)
+    
+    return {
+        "backend": f"numpy ({'float16' if quantization == 'none' else 'int8 + rescore'})",
+        "build_s": build, "open_s": open_time, f"recall@{k}": recall(found, truth, k),
+        **latency_stats(timings), "batch_ms_per_query": batch_per_query * 1000
+    }
+
+def bench_chroma(path, vectors, queries, truth, k):
+    try:
+        import chromadb
+    except ImportError:
+        print("⚠️  chromadb not installed, skipping the Chroma baseline")
+        return None
+    
+    start = time.perf_counter()
+    client = chromadb.PersistentClient(path=path)
+    collection = client.get_or_create_collection("bench")
+    for offset in range(0, len(vectors), 1000):
+        batch = range(offset, min(offset + 1000, len(vectors)))
+        collection.add(ids=[str(i) for i in batch], embeddings=vectors[offset:offset + 1000].tolist(),
+                       documents=[f"chunk {i}" for i in batch], metadatas=[{"row": i} for i in batch])
+    build = time.perf_counter() - start
+    del collection, client
+    
+    start = time.perf_counter()
+    collection = chromadb.PersistentClient(path=path).get_collection("bench")
+    collection.query(query_embeddings=[queries[0].tolist()], n_results=k)
+    open_time = time.perf_counter() - start
+    
+    found, timings = [], []
+    for query in queries:
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=k,
+                                  include=["documents", "metadatas"])
+        timings.append(time.perf_counter() - start)
+        found.append([int(chunk_id) for chunk_id in result["ids"][0]])
+    
+    return {
+        "backend": "chroma (hnsw)", "build_s": build, "open_s": open_time,
+        f"recall@{k}": recall(found, truth, k), **latency_stats(timings)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="NumPy vector index vs Chroma")
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+    
+    print(f"📊 {args.chunks} chunks x {args.dim} dims, {args.queries} queries, k={args.k}")
+    vectors, queries = make_corpus(args.chunks, args.dim, args.queries)
+    truth = exact_neighbours(vectors, queries, args.k)
+    
+    workdir = tempfile.mkdtemp(prefix="bench_vector_index_")
+    try:
+        results = [
+            bench_numpy(os.path.join(workdir, "f16"), vectors, queries, truth, args.k, "none"),
+            bench_numpy(os.path.join(workdir, "i8"), vectors, queries, truth, args.k, "int8"),
+            bench_chroma(os.path.join(workdir, "chroma"), vectors, queries, truth, args.k)
+        ]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    print(f"{'backend':<26}{'build s':>9}{'open s':>9}{'recall':>9}{'p50 ms':>9}{'p95 ms':>9}{'batch ms/q':>12}")
+    for result in filter(None, results):
+        print(f"{result['backend']:<26}{result['build_s']:>9.2f}{result['open_s']:>9.3f}"
+              f"{result[f'recall@{args.k}']:>9.3f}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+              f"{result.get('batch_ms_per_query', float('nan')):>12.2f}")
+
+if __name__ == "__main__":
+    main()
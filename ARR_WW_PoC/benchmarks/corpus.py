@@ -0,0 +1,133 @@
+"""
+Synthetic corpus generation for the offline benchmarks
+"""
+
+import os
+import random
+from typing import List, Tuple
+
+TOPIC_WORDS = [
+    "glacier", "monsoon", "emission", "adaptation", "mitigation", "hydropower", "forest",
+    "carbon", "rainfall", "temperature", "flood", "drought", "agriculture", "biodiversity",
+    "lake", "outburst", "policy", "energy", "watershed", "himalaya", "sediment", "runoff"
+]
+
+def make_vocabulary(size: int, rng: random.Random) -> List[str]:
+    """Pronounceable pseudo-words plus a few topic words"""
+    consonants, vowels = "bcdfghjklmnprstvwz", "aeiou"
+    words = set(TOPIC_WORDS)
+    while len(words) < size:
+        length = rng.randint(2, 4)
+        words.add("".join(rng.choice(consonants) + rng.choice(vowels) for _ in range(length)))
+    # Position in the list is the word's frequency rank
+    words = sorted(words)
+    rng.shuffle(words)
+    return words
+
+def make_sentence(vocabulary: List[str], rng: random.Random) -> str:
+    # Skewed word frequencies, like natural text
+    words = [vocabulary[int(len(vocabulary) * rng.random() ** 3)] for _ in range(rng.randint(8, 20))]
+    if rng.random() < 0.1:
+        words.insert(rng.randrange(len(words)), f"NEC-{rng.randint(1000, 9999)}")
+    return " ".join(words).capitalize() + "."
+
+def make_page(vocabulary: List[str], rng: random.Random, sentences: int) -> str:
+    paragraphs = []
+    while sentences > 0:
+        count = min(sentences, rng.randint(3, 7))
+        paragraphs.append(" ".join(make_sentence(vocabulary, rng) for _ in range(count)))
+        sentences -= count
+    return "\n\n".join(paragraphs)
+
+def make_near_duplicate(page: str, vocabulary: List[str], rng: random.Random) -> str:
+    """Copy of a page with one sentence rewritten, like repeated boilerplate in reports"""
+    sentences = page.split(". ")
+    sentences[rng.randrange(len(sentences))] = make_sentence(vocabulary, rng).rstrip(".")
+    return ". ".join(sentences)
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_pdf(path: str, pages: List[str], line_width: int = 90):
+    """Write a minimal text-only PDF (Helvetica, one content stream per page)"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    ]
+    page_refs = []
+    for text in pages:
+        lines = []
+        for paragraph in text.split("\n\n"):
+            words, line = paragraph.split(), ""
+            for word in words:
+                if line and len(line) + len(word) + 1 > line_width:
+                    lines.append(line)
+                    line = word
+                else:
+                    line = f"{line} {word}" if line else word
+            lines.extend([line, ""])
+        body = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({_pdf_escape(line)}) Tj T*" for line in lines) + " ET"
+        stream = body.encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+    kids = " ".join(f"{ref} 0 R" for ref in page_refs).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_refs)
+    
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(output)
+
+def generate_corpus(data_dir: str, documents: int, pdf_ratio: float = 0.3, pages_per_pdf: int = 5,
+                    sentences_per_page: int = 40, vocabulary_size: int = 5000,
+                    seed: int = 0, duplicate_page_ratio: float = 0.0) -> Tuple[List[str], List[str]]:
+    """Write a deterministic corpus of .txt and .pdf files; returns (filenames, sample sentences)
+    
+    duplicate_page_ratio is the share of PDF pages that are near-copies of the
+    page before them.
+    """
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(vocabulary_size, rng)
+    os.makedirs(data_dir, exist_ok=True)
+    filenames, samples = [], []
+    for number in range(documents):
+        if rng.random() < pdf_ratio:
+            pages = [make_page(vocabulary, rng, sentences_per_page)]
+            while len(pages) < pages_per_pdf:
+                if duplicate_page_ratio and rng.random() < duplicate_page_ratio:
+                    pages.append(make_near_duplicate(pages[-1], vocabulary, rng))
+                else:
+                    pages.append(make_page(vocabulary, rng, sentences_per_page))
+            filename = f"report_{number:05d}.pdf"
+            write_pdf(os.path.join(data_dir, filename), pages)
+        else:
+            pages = [make_page(vocabulary, rng, sentences_per_page)]
+            filename = f"note_{number:05d}.txt"
+            with open(os.path.join(data_dir, filename), "w", encoding="utf-8") as f:
+                f.write(pages[0])
+        filenames.append(filename)
+        samples.append(rng.choice(rng.choice(pages).split("\n\n")).split(". ")[0])
+    return filenames, samples
+
+def make_queries(samples: List[str], count: int, seed: int = 1) -> List[str]:
+    """Distinct queries built from words of sentences in the corpus"""
+    rng = random.Random(seed)
+    queries = []
+    for number in range(count):
+        words = rng.choice(samples).split()
+        start = rng.randrange(max(1, len(words) - 6))
+        queries.append(f"What does the report say about {' '.join(words[start:start + 6])}? (#{number})")
+    return queries
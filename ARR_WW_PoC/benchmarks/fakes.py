@@ -0,0 +1,143 @@
+"""
+Offline stand-ins for the embedding model and the Cerebras endpoint
+"""
+
+import re
+import json
+import itertools
+import time
+import random
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic feature-hashing embeddings
+
+    Texts sharing words get similar vectors, so retrieval results are
+    meaningful, and embedding costs microseconds instead of a model forward
+    pass.
+    """
+    
+    def __init__(self, dim: int = 768):
+        self.dim = dim
+    
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            digest = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[digest % self.dim] += 1.0 if (digest >> 32) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+ANSWER = "Based on the provided documents, the synthetic corpus describes this topic [1]. "
+
+class StubLLMServer:
+    """Local OpenAI-compatible /chat/completions endpoint with configurable latency
+
+    Non-streaming requests wait latency_ms (plus up to jitter_ms) and return a
+    fixed answer; streaming requests wait the same time before the first token
+    and then send `tokens` deltas (words of `answer`, as raw UTF-8), token_ms
+    apart. To inject faults, the n-th request waits latencies_ms[n] instead
+    and fails with status errors[n] (sending Retry-After if retry_after is
+    set), for as many requests as those lists cover.
+    """
+    
+    def __init__(self, latency_ms: float = 200, jitter_ms: float = 0, tokens: int = 40, token_ms: float = 0,
+                 answer: str = ANSWER, latencies_ms: Sequence[float] = (), errors: Sequence[int] = (),
+                 retry_after: Optional[str] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tokens = tokens
+        self.token_ms = token_ms
+        self.answer = answer
+        self.latencies_ms = list(latencies_ms)
+        self.errors = list(errors)
+        self.retry_after = retry_after
+        self.requests = 0
+        # Arrival time of each request (time.monotonic)
+        self.arrivals: List[float] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+    
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+    
+    def start(self) -> "StubLLMServer":
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+    
+    def _handler(self):
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with stub._lock:
+                    number = stub.requests
+                    stub.requests += 1
+                    stub.arrivals.append(time.monotonic())
+                latency_ms = stub.latencies_ms[number] if number < len(stub.latencies_ms) else stub.latency_ms
+                time.sleep((latency_ms + random.uniform(0, stub.jitter_ms)) / 1000)
+                
+                if number < len(stub.errors):
+                    encoded = json.dumps({"error": {"message": "injected failure"}}).encode("utf-8")
+                    self.send_response(stub.errors[number])
+                    if stub.retry_after is not None:
+                        self.send_header("Retry-After", stub.retry_after)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(encoded)))
+                    self.end_headers()
+                    self.wfile.write(encoded)
+                    return
+                
+                words = list(itertools.islice(itertools.cycle(stub.answer.split()), stub.tokens))
+                
+                if payload.get("stream"):
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.send_header("Connection", "close")
+                    self.end_headers()
+                    for word in words:
+                        chunk = {"choices": [{"delta": {"content": word + " "}}]}
+                        self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                        if stub.token_ms:
+                            time.sleep(stub.token_ms / 1000)
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.close_connection = True
+                    return
+                
+                body = json.dumps({"choices": [{"message": {"role": "assistant", "content": " ".join(words)}}]},
+                                  ensure_ascii=False)
+                encoded = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+        
+        return Handler
@@ -8,10 +8,28 @@ __version__ = "1.0.0"
 __author__ = "AI Assistant"
 __description__ = "RAG: Document Search using Retrieval-Augmented Generation"
 
+import importlib
+
 from .config import config
-from .vectorstore import VectorStoreManager
-from .rag_engine import RAGEngine
-from .ui import StreamlitUI
+
+# Heavy subsystems (LangChain, Chroma, torch, Streamlit) are imported on first
+# attribute access, so `import src` and the CLI only pay for what they use
+_LAZY_ATTRIBUTES = {
+    'VectorStoreManager': '.vectorstore',
+    'RAGEngine': '.rag_engine',
+    'StreamlitUI': '.ui',
+}
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
 
 __all__ = [
     'config',
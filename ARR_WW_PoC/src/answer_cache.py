@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+def chunk_set_key(chunk_ids: Sequence[str]) -> str:
+    """Order-independent key for a set of retrieved chunk IDs"""
+    return hashlib.sha1("\n".join(sorted(set(chunk_ids))).encode("utf-8")).hexdigest()
+
+class AnswerCache:
+    """Disk-backed semantic cache of generated answers
+    
+    An answer is reused when a new query retrieves exactly the same set of
+    chunks and its embedding is within `similarity` (cosine) of the cached
+    query. Entries live in SQLite; an in-memory map from chunk set to the
+    normalized query embeddings cached for it makes a lookup one dict probe
+    on a miss and a few dot products on a candidate. Entries expire after
+    ttl_seconds, the least recently used are evicted past max_entries, and
+    everything is dropped when the generation (LLM, embedding model and index
+    fingerprint) changes.
+    """
+    
+    def __init__(self, path: str, similarity: float = 0.95, ttl_seconds: float = 86400,
+                 max_entries: int = 10000):
+        self.path = path
+        self.similarity = similarity
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.generation = None
+        # chunk set key -> list of (row id, normalized embedding, expiry)
+        self._by_chunks: Dict[str, List] = {}
+        self._count = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # WAL keeps each put/hit commit cheap; losing the last few entries on a crash is harmless
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY,
+                chunk_key TEXT NOT NULL,
+                query TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                answer TEXT NOT NULL,
+                sources TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used);
+        """)
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        self.generation = row[0] if row else None
+        self._load()
+    
+    def _load(self):
+        """Rebuild the in-memory lookup from the database, dropping expired rows"""
+        now = time.time()
+        self._db.execute("DELETE FROM answers WHERE created < ?", (now - self.ttl_seconds,))
+        self._db.commit()
+        self._by_chunks = {}
+        self._count = 0
+        for row_id, chunk_key, embedding, created in self._db.execute(
+                "SELECT id, chunk_key, embedding, created FROM answers"):
+            vector = np.frombuffer(embedding, dtype=np.float32)
+            self._by_chunks.setdefault(chunk_key, []).append((row_id, vector, created + self.ttl_seconds))
+            self._count += 1
+    
+    def check_generation(self, generation: str):
+        """Drop every entry if the model or index changed since they were stored"""
+        with self._lock:
+            if generation == self.generation:
+                return
+            self._db.execute("DELETE FROM answers")
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('generation', ?)", (generation,))
+            self._db.commit()
+            self._by_chunks = {}
+            self._count = 0
+            self.generation = generation
+    
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def get(self, embedding, chunk_ids: Sequence[str]) -> Optional[Dict[str, Any]]:
+        """Return {"answer", "sources", "query", "similarity"} for a matching entry, or None"""
+        key = chunk_set_key(chunk_ids)
+        with self._lock:
+            candidates = self._by_chunks.get(key)
+            if not candidates:
+                self.misses += 1
+                return None
+            query = self._normalize(embedding)
+            now = time.time()
+            best, best_similarity = None, self.similarity
+            for row_id, vector, expires in candidates:
+                if expires < now:
+                    continue
+                similarity = float(vector @ query)
+                if similarity >= best_similarity:
+                    best, best_similarity = row_id, similarity
+            if best is None:
+                self.misses += 1
+                return None
+            row = self._db.execute("SELECT query, answer, sources FROM answers WHERE id = ?", (best,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE answers SET last_used = ? WHERE id = ?", (now, best))
+            self._db.commit()
+            self.hits += 1
+            return {"query": row[0], "answer": row[1], "sources": json.loads(row[2]),
+                    "similarity": best_similarity}
+    
+    def put(self, query: str, embedding, chunk_ids: Sequence[str], answer: str, sources: List[str]):
+        """Store a generated answer, evicting the least recently used entries over max_entries"""
+        key = chunk_set_key(chunk_ids)
+        vector = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO answers (chunk_key, query, embedding, answer, sources, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, query, vector.tobytes(), answer, json.dumps(sources), now, now)
+            )
+            self._by_chunks.setdefault(key, []).append((cursor.lastrowid, vector, now + self.ttl_seconds))
+            self._count += 1
+            if self._count > self.max_entries:
+                self._evict(self._count - self.max_entries + self.max_entries // 10)
+            self._db.commit()
+    
+    def _evict(self, count: int):
+        """Drop the `count` least recently used entries; caller holds the lock"""
+        rows = [row_id for (row_id,) in self._db.execute(
+            "SELECT id FROM answers ORDER BY last_used LIMIT ?", (count,))]
+        self._db.executemany("DELETE FROM answers WHERE id = ?", [(row_id,) for row_id in rows])
+        evicted = set(rows)
+        for key in list(self._by_chunks):
+            remaining = [entry for entry in self._by_chunks[key] if entry[0] not in evicted]
+            if remaining:
+                self._by_chunks[key] = remaining
+            else:
+                del self._by_chunks[key]
+        self._count -= len(rows)
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": self._count
+        }
+    
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,275 @@
+import json
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+
+from aiohttp import web
+
+from .config import config
+from .metrics import metrics
+from .query_cache import normalize_query
+from .sessions import SessionManager
+
+class AdmissionController:
+    """Caps concurrent queries and the queue behind them
+    
+    Requests beyond max_concurrency wait in the queue; once max_queue are
+    waiting, new requests are rejected so callers can back off.
+    """
+    
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_concurrency + max_queue
+        self.pending = 0
+        self.rejected = 0
+        self._slots = asyncio.Semaphore(max_concurrency)
+    
+    def try_admit(self) -> bool:
+        """Reserve a place for a request, or return False if the queue is full"""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            return False
+        self.pending += 1
+        return True
+    
+    async def run(self, coroutine):
+        """Run an admitted request once a slot is free"""
+        try:
+            async with self._slots:
+                return await coroutine
+        finally:
+            self.pending -= 1
+    
+    def stats(self) -> Dict[str, int]:
+        active = min(self.pending, self.max_concurrency)
+        return {"active": active, "queued": self.pending - active, "rejected": self.rejected}
+
+class StreamBroadcast:
+    """Fans one streamed answer out to every request coalesced onto it
+    
+    Subscribers that join late first replay the events sent so far.
+    """
+    
+    def __init__(self):
+        self.events = []
+        self.done = False
+        self._changed = asyncio.Event()
+    
+    def publish(self, event: Dict[str, Any]):
+        self.events.append(event)
+        self._wake()
+    
+    def close(self):
+        self.done = True
+        self._wake()
+    
+    def _wake(self):
+        # Swap in a fresh event so no subscriber can miss a wake-up
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+    
+    async def subscribe(self):
+        position = 0
+        while True:
+            changed = self._changed
+            while position < len(self.events):
+                yield self.events[position]
+                position += 1
+            if self.done:
+                return
+            await changed.wait()
+
+class RAGApiServer:
+    """Async HTTP API over a shared RAGEngine
+    
+    Identical in-flight queries (after normalization) are coalesced onto one
+    retrieval and one LLM call, for both the JSON and the streaming endpoint.
+    Requests with a "session_id" are answered with that session's recent
+    history and only coalesce with requests of the same session.
+    """
+    
+    def __init__(self, rag_engine=None,
+                 max_concurrency: int = config.API_MAX_CONCURRENCY,
+                 max_queue: int = config.API_MAX_QUEUE):
+        self.rag_engine = rag_engine
+        self.sessions: Optional[SessionManager] = None
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.admission: Optional[AdmissionController] = None
+        self.load_error: Optional[str] = None
+        self.coalesced = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._inflight_streams: Dict[str, StreamBroadcast] = {}
+        self._stream_executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="api-stream")
+    
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/healthz", self.health)
+        app.router.add_get("/readyz", self.ready)
+        app.router.add_get("/metrics", self.prometheus_metrics)
+        app.router.add_post("/query", self.query)
+        app.router.add_post("/query/stream", self.query_stream)
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+    
+    async def _on_startup(self, app: web.Application):
+        self.admission = AdmissionController(self.max_concurrency, self.max_queue)
+        if self.rag_engine is None:
+            # Load the index in the background so health checks answer at once
+            threading.Thread(target=self._load_engine, name="api-engine-loader", daemon=True).start()
+        else:
+            self.sessions = SessionManager(self.rag_engine)
+    
+    def _load_engine(self):
+        try:
+            from .resources import get_rag_engine, get_session_manager
+            self.sessions = get_session_manager()
+            self.rag_engine = get_rag_engine()
+        except Exception as e:
+            self.load_error = str(e)
+            print(f"❌ Error loading RAG engine: {e}")
+    
+    async def _on_cleanup(self, app: web.Application):
+        self._stream_executor.shutdown(wait=False)
+        if self.rag_engine is not None:
+            await self.rag_engine.async_llm_client.close()
+    
+    # Health and readiness
+    
+    async def health(self, request: web.Request) -> web.Response:
+        """Liveness: the process is up and serving"""
+        return web.json_response({"status": "ok"})
+    
+    async def ready(self, request: web.Request) -> web.Response:
+        """Readiness: the engine and its index are loaded"""
+        if self.load_error:
+            return web.json_response({"status": "error", "error": self.load_error}, status=503)
+        if self.rag_engine is None:
+            return web.json_response({"status": "loading"}, status=503)
+        index = self.rag_engine.vector_store_manager.index_status()
+        body = {
+            "status": "ready" if index["loaded"] else "no_index",
+            "index": index,
+            "queries": {**self.admission.stats(), "coalesced": self.coalesced},
+            "sessions": self.sessions.stats(),
+            "ingest": self.rag_engine.get_ingest_status()
+        }
+        return web.json_response(body, status=200 if index["loaded"] else 503)
+    
+    async def prometheus_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=metrics.to_prometheus(), content_type="text/plain")
+    
+    # Queries
+    
+    async def _read_query(self, request: web.Request) -> Tuple[str, Optional[str]]:
+        """Parse the body into (query, session_id)"""
+        try:
+            body = await request.json()
+        except (ValueError, UnicodeDecodeError):
+            raise web.HTTPBadRequest(text=json.dumps({"error": "Body must be JSON"}), content_type="application/json")
+        query = body.get("query") if isinstance(body, dict) else None
+        if not isinstance(query, str) or not query.strip():
+            raise web.HTTPBadRequest(text=json.dumps({"error": "Missing 'query'"}), content_type="application/json")
+        session_id = body.get("session_id")
+        if session_id is not None and not isinstance(session_id, str):
+            raise web.HTTPBadRequest(text=json.dumps({"error": "'session_id' must be a string"}),
+                                     content_type="application/json")
+        if self.rag_engine is None:
+            raise web.HTTPServiceUnavailable(
+                text=json.dumps({"error": "Index is still loading"}), content_type="application/json",
+                headers={"Retry-After": str(config.API_RETRY_AFTER_SECONDS)}
+            )
+        return query.strip(), session_id
+    
+    def _too_many_requests(self) -> web.HTTPTooManyRequests:
+        return web.HTTPTooManyRequests(
+            text=json.dumps({"error": "Server busy, retry later"}), content_type="application/json",
+            headers={"Retry-After": str(config.API_RETRY_AFTER_SECONDS)}
+        )
+    
+    @staticmethod
+    def _coalescing_key(query: str, session_id: Optional[str]) -> str:
+        key = normalize_query(query)
+        return f"{session_id}\x00{key}" if session_id else key
+    
+    async def query(self, request: web.Request) -> web.Response:
+        """Answer a query as one JSON response"""
+        query, session_id = await self._read_query(request)
+        key = self._coalescing_key(query, session_id)
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            if not self.admission.try_admit():
+                raise self._too_many_requests()
+            if session_id:
+                answer = self.sessions.aprocess_query(session_id, query)
+            else:
+                answer = self.rag_engine.aprocess_query(query)
+            task = asyncio.ensure_future(self.admission.run(answer))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one client disconnecting does not cancel the shared answer
+        result = await asyncio.shield(task)
+        return web.json_response(result)
+    
+    async def query_stream(self, request: web.Request) -> web.StreamResponse:
+        """Answer a query as server-sent events: "delta" events, then one "done" event"""
+        query, session_id = await self._read_query(request)
+        key = self._coalescing_key(query, session_id)
+        broadcast = self._inflight_streams.get(key)
+        if broadcast is not None:
+            self.coalesced += 1
+        else:
+            if not self.admission.try_admit():
+                raise self._too_many_requests()
+            broadcast = StreamBroadcast()
+            self._inflight_streams[key] = broadcast
+            asyncio.ensure_future(self.admission.run(self._produce_stream(key, query, session_id, broadcast)))
+        
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache"
+        })
+        await response.prepare(request)
+        try:
+            async for event in broadcast.subscribe():
+                await response.write(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode("utf-8"))
+        except ConnectionResetError:
+            pass
+        return response
+    
+    async def _produce_stream(self, key: str, query: str, session_id: Optional[str], broadcast: StreamBroadcast):
+        """Run the blocking streaming query in a worker thread, publishing its events"""
+        loop = asyncio.get_running_loop()
+        
+        def pump():
+            if session_id:
+                events = self.sessions.stream_query(session_id, query)
+            else:
+                events = self.rag_engine.stream_query(query)
+            try:
+                for event in events:
+                    loop.call_soon_threadsafe(broadcast.publish, event)
+            finally:
+                # Releases the LLM slot even if publishing fails mid-stream
+                events.close()
+        
+        try:
+            await loop.run_in_executor(self._stream_executor, pump)
+        except Exception as e:
+            broadcast.publish({"type": "done", "success": False, "answer": f"Error processing query: {str(e)}",
+                               "sources": [], "documents_retrieved": 0, "query": query, "timings": {}})
+        finally:
+            self._inflight_streams.pop(key, None)
+            # Runs after every event queued by pump() has been published
+            loop.call_soon(broadcast.close)
+
+def run_api_server(host: str = config.API_HOST, port: int = config.API_PORT):
+    """Serve the RAG API until interrupted"""
+    server = RAGApiServer()
+    print(f"🌐 Serving RAG API on http://{host}:{port} "
+          f"(max {server.max_concurrency} concurrent, {server.max_queue} queued)")
+    web.run_app(server.create_app(), host=host, port=port, print=None)
@@ -0,0 +1,127 @@
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, Iterator, List, Optional, Set
+
+from .config import config
+
+def read_queries(input_path: str) -> Iterator[Dict[str, Any]]:
+    """Read {"id": ..., "query": ...} records from a JSONL file
+    
+    Lines without an "id" use their line number; "question" is accepted as an
+    alias for "query", and a line holding just a JSON string is the query.
+    """
+    with open(input_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                print(f"⚠️  Skipping invalid JSON on line {line_number}: {e}")
+                continue
+            if isinstance(record, str):
+                record = {'query': record}
+            elif not isinstance(record, dict):
+                print(f"⚠️  Skipping line {line_number}: expected a JSON object or string, "
+                      f"got {type(record).__name__}")
+                continue
+            query = record.get('query') or record.get('question')
+            if not isinstance(query, str) or not query.strip():
+                print(f"⚠️  Skipping line {line_number}: no query")
+                continue
+            yield {'id': str(record.get('id', line_number)), 'query': query}
+
+def completed_ids(output_path: str) -> Set[str]:
+    """Collect IDs already answered successfully, dropping a partly written last line"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            # The previous run stopped mid-write
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[:data.rfind(b"\n") + 1]
+    for line in data.decode('utf-8').splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(record, dict) and record.get('success'):
+            done.add(str(record.get('id')))
+    return done
+
+def _chunks(items: List, size: int) -> Iterator[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def run_batch(input_path: str, output_path: str, workers: Optional[int] = None, rag_engine=None) -> Dict[str, Any]:
+    """Answer every query in input_path, appending JSONL results to output_path
+    
+    Queries are embedded in batches of config.BATCH_EMBED_SIZE, answered by a
+    pool of worker threads and written as soon as each completes. Queries
+    already answered successfully in output_path are skipped, so an
+    interrupted run can be resumed; failed ones are retried.
+    """
+    workers = workers or config.BATCH_WORKERS
+    records = list(read_queries(input_path))
+    done = completed_ids(output_path)
+    todo = [record for record in records if record['id'] not in done]
+    print(f"📋 {len(records)} queries, {len(records) - len(todo)} already answered, {len(todo)} to run")
+    
+    stats = {"total": len(records), "skipped": len(records) - len(todo), "succeeded": 0, "failed": 0}
+    if not todo:
+        return stats
+    
+    if rag_engine is None:
+        from .rag_engine import RAGEngine
+        rag_engine = RAGEngine()
+    
+    latencies = []
+    start = time.perf_counter()
+    
+    def run(record: Dict[str, Any], embedding: List[float]) -> Dict[str, Any]:
+        result = rag_engine.process_query(record['query'], embedding=embedding)
+        return {"id": record['id'], **result}
+    
+    with open(output_path, 'a', encoding='utf-8') as output, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag-batch") as executor:
+        
+        def write(futures):
+            for future in futures:
+                result = future.result()
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                stats["succeeded" if result['success'] else "failed"] += 1
+                if 'total' in result['timings']:
+                    latencies.append(result['timings']['total'])
+            output.flush()
+            finished = stats["succeeded"] + stats["failed"]
+            if finished and finished % 100 < len(futures):
+                elapsed = time.perf_counter() - start
+                print(f"  {finished}/{len(todo)} done ({finished / elapsed:.1f} queries/s)")
+        
+        # Keep a bounded number of queries in flight so memory stays flat
+        pending = set()
+        for chunk in _chunks(todo, config.BATCH_EMBED_SIZE):
+            embeddings = rag_engine.embed_queries([record['query'] for record in chunk])
+            for record, embedding in zip(chunk, embeddings):
+                if len(pending) >= workers * 2:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    write(finished)
+                pending.add(executor.submit(run, record, embedding))
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            write(finished)
+    
+    elapsed = time.perf_counter() - start
+    ran = stats["succeeded"] + stats["failed"]
+    stats["seconds"] = round(elapsed, 3)
+    stats["queries_per_second"] = round(ran / elapsed, 2) if elapsed else 0.0
+    if latencies:
+        latencies.sort()
+        stats["p50_ms"] = latencies[len(latencies) // 2]
+        stats["p95_ms"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return stats
@@ -10,25 +10,168 @@ class Config:
     CEREBRAS_API_KEY = os.getenv("CEREBRAS_API_KEY")
     
     # Cerebras API endpoint
-    CEREBRAS_API_BASE = "https://api.cerebras.ai/v1"
+    CEREBRAS_API_BASE = os.getenv("CEREBRAS_API_BASE", "https://api.cerebras.ai/v1")
+    
+    # LLM HTTP client configuration
+    LLM_MAX_TOKENS = 2000
+    LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+    LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    LLM_BACKOFF_BASE = 0.5
+    LLM_BACKOFF_MAX = 8.0
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    # Requests started per second across the process (0 = unlimited)
+    LLM_RATE_LIMIT_PER_SECOND = float(os.getenv("LLM_RATE_LIMIT_PER_SECOND", "0"))
+    # Send a duplicate request if no answer arrives within this many seconds (0 = off)
+    LLM_HEDGE_AFTER_SECONDS = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "0"))
+    
+    # Async query processing
+    ASYNC_QUERY_CONCURRENCY = int(os.getenv("ASYNC_QUERY_CONCURRENCY", "8"))
+    ASYNC_RETRIEVAL_WORKERS = int(os.getenv("ASYNC_RETRIEVAL_WORKERS", "4"))
+    
+    # Batch query mode (main.py --mode batch)
+    BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "8"))
+    # Queries embedded per batched model call
+    BATCH_EMBED_SIZE = 256
+    
+    # Chat sessions sharing one engine: messages kept per session (ring
+    # buffer), the size each is truncated to, history tokens sent with each
+    # prompt, and eviction of idle / least recently active sessions
+    SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "20"))
+    SESSION_MAX_TURN_TOKENS = 512
+    SESSION_HISTORY_TOKENS = int(os.getenv("SESSION_HISTORY_TOKENS", "1000"))
+    SESSION_IDLE_SECONDS = int(os.getenv("SESSION_IDLE_SECONDS", "1800"))
+    SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+    
+    # HTTP API server (main.py --mode api)
+    API_HOST = os.getenv("API_HOST", "0.0.0.0")
+    API_PORT = int(os.getenv("API_PORT", "8000"))
+    # Queries answered at once; up to API_MAX_QUEUE more wait, the rest get 429
+    API_MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", "16"))
+    API_MAX_QUEUE = int(os.getenv("API_MAX_QUEUE", "64"))
+    API_RETRY_AFTER_SECONDS = 1
+    
+    # Per-stage latency metrics
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_MAX_SAMPLES = 2048
     
     # Model configuration
     MODEL_NAME = "llama-3.3-70b"
     EMBEDDING_MODEL = "sentence-transformers/all-mpnet-base-v2"
+    # Embedding runtime: "torch" (sentence-transformers), or the model exported
+    # to ONNX and run on onnxruntime, as float32 ("onnx") or int8 ("onnx-int8")
+    EMBEDDING_RUNTIME = os.getenv("EMBEDDING_RUNTIME", "torch").lower()
+    EMBEDDING_ONNX_DIR = "./onnx_models"
+    EMBEDDING_ONNX_THREADS = int(os.getenv("EMBEDDING_ONNX_THREADS", "0"))
+    # Exports whose embeddings fall below this cosine to the reference are not used
+    EMBEDDING_ONNX_MIN_COSINE = 0.98
+    # Concurrent query embeddings arriving within this window share one forward
+    # pass, up to EMBEDDING_BATCH_MAX_SIZE (1 disables micro-batching)
+    EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "2"))
+    EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "64"))
     
     # Vector store configuration
     CHROMA_PERSIST_DIR = "./chroma_db"
     CHROMA_COLLECTION_NAME = "document_embeddings"
+    # Vector search backend: "chroma", or "numpy" to search a memory-mapped
+    # export of the collection (for read-only deployments)
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+    NUMPY_INDEX_DIR = os.path.join(CHROMA_PERSIST_DIR, "numpy_index")
+    # "none" scans the float16 vectors; "int8" scans quantized vectors and
+    # rescores the best candidates against the float16 ones
+    NUMPY_INDEX_QUANTIZATION = os.getenv("NUMPY_INDEX_QUANTIZATION", "none").lower()
+    NUMPY_INDEX_RESCORE_MULTIPLIER = 4
+    # Single-file index snapshot for bringing up replicas; when SNAPSHOT_PATH
+    # points at an existing bundle it is served instead of Chroma
+    SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "")
+    SNAPSHOT_DEFAULT_PATH = "./snapshots/index.ragsnap"
+    # Loading always checks the header checksum and file size; this also
+    # checks every section's checksum (reads the whole bundle once)
+    SNAPSHOT_VERIFY = os.getenv("SNAPSHOT_VERIFY", "false").lower() == "true"
+    
+    # Document ingestion configuration
+    DATA_DIR = "./data"
+    SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+    MANIFEST_PATH = os.path.join(CHROMA_PERSIST_DIR, "index_manifest.json")
+    UPSERT_BATCH_SIZE = 500
+    # Worker processes used to parse and split files (1 = load serially)
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+    SYNC_ON_STARTUP = os.getenv("SYNC_ON_STARTUP", "true").lower() == "true"
+    # Watch DATA_DIR and index changes in a background thread, publishing each
+    # ingest to searches in one swap (replaces the blocking startup sync)
+    INGEST_WATCH_ENABLED = os.getenv("INGEST_WATCH_ENABLED", "false").lower() == "true"
+    INGEST_POLL_SECONDS = float(os.getenv("INGEST_POLL_SECONDS", "5"))
+    # Near-duplicate chunk elimination: a chunk whose estimated (MinHash)
+    # Jaccard similarity to a stored chunk is at least DEDUP_THRESHOLD is not
+    # embedded again; the stored chunk lists every source/page in its
+    # "citations" metadata. Off by default: enabling it or changing these
+    # settings rebuilds the index.
+    DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "false").lower() == "true"
+    DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))
+    DEDUP_NUM_PERM = 128
+    DEDUP_INDEX_PATH = os.path.join(CHROMA_PERSIST_DIR, "dedup.sqlite3")
+    
+    # Embedding cache configuration
+    EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_DIR = "./embedding_cache"
+    EMBEDDING_CACHE_MAX_ENTRIES = 200000
+    EMBEDDING_CACHE_DTYPE = "float16"
     
     # Text processing configuration
+    # Chunking mode: "characters" sizes chunks in characters (CHUNK_SIZE /
+    # CHUNK_OVERLAP); "tokens" sizes them in embedding-model tokens
+    # (CHUNK_SIZE_TOKENS / CHUNK_OVERLAP_TOKENS) so none exceed its limit
+    CHUNKING_MODE = os.getenv("CHUNKING_MODE", "characters").lower()
     CHUNK_SIZE = 1000
     CHUNK_OVERLAP = 200
+    CHUNK_SIZE_TOKENS = int(os.getenv("CHUNK_SIZE_TOKENS", "320"))
+    CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+    # Input limit of the embedding model (mpnet truncates beyond 384 tokens)
+    EMBEDDING_MAX_TOKENS = 384
     
     # RAG configuration
+    # Token budget for the retrieved context sent to the LLM
     MAX_CONTEXT_LENGTH = 4000
     TEMPERATURE = 0.1
     RETRIEVAL_COUNT = 5
     
+    # Retrieval mode: "dense" (vector only), "hybrid" (BM25 + vector) or
+    # "mmr" (vector candidates re-ranked by maximal marginal relevance). The
+    # BM25 index is only built and loaded in hybrid mode.
+    RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense").lower()
+    LEXICAL_INDEX_PATH = os.path.join(CHROMA_PERSIST_DIR, "lexical_index.npz")
+    # Candidates fetched from each retriever per requested result before fusion
+    HYBRID_CANDIDATE_MULTIPLIER = 4
+    # Reciprocal rank fusion constant; larger values flatten rank differences
+    RRF_K = 60
+    # MMR: candidates fetched with their embeddings, chunks kept, and the
+    # relevance/diversity trade-off (1.0 = pure relevance)
+    MMR_FETCH_K = int(os.getenv("MMR_FETCH_K", "40"))
+    MMR_RESULT_COUNT = int(os.getenv("MMR_RESULT_COUNT", "3"))
+    MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.5"))
+    
+    # Context packing configuration
+    CONTEXT_PACKING_ENABLED = os.getenv("CONTEXT_PACKING_ENABLED", "true").lower() == "true"
+    CONTEXT_TOKENIZER_ENCODING = "cl100k_base"
+    # Share of a chunk's word shingles found in a better-ranked chunk above
+    # which it counts as a near-duplicate
+    NEAR_DUPLICATE_THRESHOLD = 0.9
+    # Minimum shared characters before chunks of the same page are merged
+    MIN_MERGE_OVERLAP = 20
+    
+    # Query cache configuration (query embeddings and retrieved chunk IDs)
+    QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "true").lower() == "true"
+    QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    QUERY_CACHE_TTL_SECONDS = 3600
+    
+    # Answer cache configuration (generated answers, persisted across restarts)
+    ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_PATH = "./answer_cache/answers.sqlite3"
+    # Minimum cosine similarity to a cached query that retrieved the same chunks
+    ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+    ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "50000"))
+    
     @classmethod
     def validate_config(cls):
         """Validate that all required configuration is present"""
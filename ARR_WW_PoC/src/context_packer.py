@@ -0,0 +1,135 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+from .config import config
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Load the tiktoken encoding once, or None if it is unavailable"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(config.CONTEXT_TOKENIZER_ENCODING)
+    except Exception as e:
+        print(f"⚠️  Tokenizer unavailable ({e}), estimating tokens from characters")
+        return None
+
+def count_tokens(text: str) -> int:
+    """Count tokens with the configured tokenizer"""
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to at most max_tokens tokens"""
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+def _suffix_prefix_overlap(a: str, b: str, min_overlap: int) -> int:
+    """Length of the longest suffix of a that is a prefix of b (0 if < min_overlap)"""
+    if len(a) < min_overlap or len(b) < min_overlap:
+        return 0
+    probe = b[:min_overlap]
+    pos = a.find(probe, max(0, len(a) - len(b)))
+    while pos != -1:
+        if b.startswith(a[pos:]):
+            return len(a) - pos
+        pos = a.find(probe, pos + 1)
+    return 0
+
+def _shingles(text: str, size: int = 3) -> Set[Tuple[str, ...]]:
+    words = text.lower().split()
+    if len(words) <= size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def _containment(a: Set, b: Set) -> float:
+    """Fraction of a's shingles that also appear in b"""
+    if not a:
+        return 1.0
+    return len(a & b) / len(a)
+
+class ContextPacker:
+    """Assembles retrieved chunks into a token-budgeted, de-duplicated context
+
+    Overlapping or adjacent chunks from the same source and page are merged,
+    near-duplicates are dropped, and blocks are added in rank order until the
+    token budget is spent. Blocks are renumbered 1..n so citations match the
+    returned source list.
+    """
+    
+    SOURCE_PREFIX_TOKENS = 6  # "Source [n]: " plus separator
+    
+    def __init__(self,
+                 max_tokens: int = config.MAX_CONTEXT_LENGTH,
+                 duplicate_threshold: float = config.NEAR_DUPLICATE_THRESHOLD,
+                 min_overlap: int = config.MIN_MERGE_OVERLAP,
+                 min_block_tokens: int = 32):
+        self.max_tokens = max_tokens
+        self.duplicate_threshold = duplicate_threshold
+        self.min_overlap = min_overlap
+        self.min_block_tokens = min_block_tokens
+    
+    def _merge(self, existing: str, new: str) -> Optional[str]:
+        """Merge two chunks of the same page if they contain or overlap each other"""
+        if new in existing:
+            return existing
+        if existing in new:
+            return new
+        overlap = _suffix_prefix_overlap(existing, new, self.min_overlap)
+        if overlap:
+            return existing + new[overlap:]
+        overlap = _suffix_prefix_overlap(new, existing, self.min_overlap)
+        if overlap:
+            return new + existing[overlap:]
+        return None
+    
+    def pack(self, documents: List[Dict]) -> List[Dict]:
+        """Pack retrieved documents (in rank order) into the context budget"""
+        # Merge overlapping chunks of the same source/page into one block,
+        # keeping the rank of its best chunk
+        blocks: List[Dict] = []
+        for doc in documents:
+            for block in blocks:
+                if (block['source'], block['page']) != (doc['source'], doc['page']):
+                    continue
+                merged = self._merge(block['content'], doc['content'])
+                if merged is not None:
+                    block['content'] = merged
+                    block['citations'] += [citation for citation in doc.get('citations', [])
+                                           if citation not in block['citations']]
+                    break
+            else:
+                blocks.append({'content': doc['content'], 'source': doc['source'], 'page': doc['page'],
+                               'citations': list(doc.get('citations', []))})
+        
+        # Drop blocks mostly covered by a better-ranked one, e.g. the same
+        # passage from another edition
+        kept: List[Dict] = []
+        kept_shingles: List[Set] = []
+        for block in blocks:
+            shingles = _shingles(block['content'])
+            if any(_containment(shingles, other) >= self.duplicate_threshold for other in kept_shingles):
+                continue
+            kept.append(block)
+            kept_shingles.append(shingles)
+        
+        # Fill the token budget in rank order
+        packed: List[Dict] = []
+        remaining = self.max_tokens
+        for block in kept:
+            available = remaining - self.SOURCE_PREFIX_TOKENS
+            if available < self.min_block_tokens:
+                break
+            tokens = count_tokens(block['content'])
+            content = block['content']
+            if tokens > available:
+                content = truncate_to_tokens(content, available)
+                tokens = available
+            remaining -= tokens + self.SOURCE_PREFIX_TOKENS
+            packed.append({**block, 'content': content, 'index': len(packed) + 1})
+        
+        return packed
@@ -0,0 +1,274 @@
+import os
+import json
+import zlib
+import sqlite3
+import hashlib
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+# Odd 64-bit constants combining the hashes of a shingle's words by position
+SHINGLE_MULTIPLIERS = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9,
+                                0xD6E8FEB86659FD93, 0xFF51AFD7ED558CCD], dtype=np.uint64)
+
+def lsh_parameters(threshold: float, num_perm: int, recall: float = 0.95) -> Tuple[int, int]:
+    """Bands and rows per band for LSH over num_perm MinHash values
+    
+    A pair with Jaccard similarity s shares at least one band bucket with
+    probability 1 - (1 - s^rows)^bands. Candidates are verified against their
+    signatures, so a false positive costs one comparison while a false
+    negative is a missed duplicate: this takes the most rows per band (the
+    fewest candidates) that still find a pair at threshold with probability
+    `recall`.
+    """
+    for rows in range(num_perm, 0, -1):
+        bands = num_perm // rows
+        if 1.0 - (1.0 - threshold ** rows) ** bands >= recall:
+            return bands, rows
+    return num_perm, 1
+
+def citation_metadata(citations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Metadata of a stored chunk standing for a group: its first citation as
+    source/page, and every citation as a JSON list"""
+    first = citations[0]
+    return {
+        "source": first["source"],
+        "page": first.get("page"),
+        "citations": json.dumps(citations, separators=(",", ":"))
+    }
+
+def parse_citations(metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Every source/page a stored chunk appears in (only its own without dedup)"""
+    encoded = metadata.get("citations")
+    if encoded:
+        try:
+            return json.loads(encoded)
+        except ValueError:
+            pass
+    citation = {"source": metadata.get("source", "Unknown")}
+    if metadata.get("page") is not None:
+        citation["page"] = metadata["page"]
+    return [citation]
+
+class ChunkDeduplicator:
+    """Collapses near-duplicate chunks at ingest with MinHash signatures and LSH
+    
+    Every ingested chunk joins a group. The first chunk of a group is the one
+    embedded and stored, under its own ID; later chunks whose estimated
+    Jaccard similarity (over word 3-shingles) to it is at least `threshold`
+    only add their source/page to the group's citations. Signatures, LSH band
+    buckets and memberships live in SQLite, so memory stays bounded by its
+    page cache however many chunks are indexed.
+    """
+    
+    SHINGLE_SIZE = 3
+    
+    def __init__(self, path: str, threshold: float = 0.9, num_perm: int = 128,
+                 max_candidates: int = 32, seed: int = 1):
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.max_candidates = max_candidates
+        self.bands, self.rows = lsh_parameters(threshold, num_perm)
+        # Multiply-shift hash family, one (odd a, b) pair per permutation:
+        # h(x) = (a * x + b) >> 32 over 64-bit words
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(0, 2**64, size=num_perm, dtype=np.uint64, endpoint=False) | np.uint64(1)
+        self._b = rng.integers(0, 2**64, size=num_perm, dtype=np.uint64, endpoint=False)
+        # Groups whose citations changed since their chunk was last written
+        self.dirty: Set[str] = set()
+        self.saved_chunks = 0
+        self.saved_bytes = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        # Page cache capped at 64 MB, however large the index grows
+        self._db.execute("PRAGMA cache_size=-65536")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS groups (
+                group_id TEXT PRIMARY KEY,
+                signature BLOB,
+                bytes INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS members (
+                chunk_id TEXT PRIMARY KEY,
+                group_id TEXT NOT NULL,
+                source TEXT,
+                page,
+                bytes INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS members_group ON members (group_id);
+            CREATE TABLE IF NOT EXISTS bands (
+                key INTEGER NOT NULL,
+                group_id TEXT NOT NULL,
+                PRIMARY KEY (key, group_id)
+            ) WITHOUT ROWID;
+        """)
+    
+    @property
+    def signature(self) -> str:
+        """Describe the dedup settings; the index is rebuilt when they change"""
+        return f"minhash:{self.num_perm}x{self.SHINGLE_SIZE}@{self.threshold}"
+    
+    def minhash(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature of a text's word shingles (None if it is too short to compare)"""
+        words = text.lower().split()
+        size = self.SHINGLE_SIZE
+        if len(words) < size:
+            return None
+        # Hash each word once and combine consecutive word hashes into 32-bit
+        # shingle hashes; repeated shingles do not change the minimum
+        word_hashes = np.fromiter((zlib.crc32(word.encode("utf-8")) for word in words),
+                                  dtype=np.uint64, count=len(words))
+        count = len(words) - size + 1
+        hashes = np.zeros(count, dtype=np.uint64)
+        for offset, multiplier in enumerate(SHINGLE_MULTIPLIERS[:size]):
+            hashes += word_hashes[offset:offset + count] * multiplier
+        hashes >>= np.uint64(32)
+        hashed = (hashes[:, None] * self._a + self._b) >> np.uint64(32)
+        return hashed.min(axis=0).astype(np.uint32)
+    
+    def _band_keys(self, signature: np.ndarray) -> List[int]:
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(band.to_bytes(2, "little") + rows.tobytes(), digest_size=8).digest()
+            keys.append(int.from_bytes(digest, "little", signed=True))
+        return keys
+    
+    def _best_match(self, signature: np.ndarray, keys: List[int]) -> Optional[str]:
+        """Most similar group sharing a band bucket, if it clears the threshold"""
+        rows = self._db.execute(
+            f"SELECT group_id, signature FROM groups WHERE group_id IN "
+            f"(SELECT group_id FROM bands WHERE key IN ({','.join('?' * len(keys))})) LIMIT ?",
+            (*keys, self.max_candidates)
+        ).fetchall()
+        best, best_similarity = None, self.threshold
+        for group_id, stored in rows:
+            similarity = float(np.mean(np.frombuffer(stored, dtype=np.uint32) == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = group_id, similarity
+        return best
+    
+    def has_group(self, chunk_id: str) -> bool:
+        """Whether a chunk is stored as the representative of a group"""
+        return self._db.execute("SELECT 1 FROM groups WHERE group_id = ?", (chunk_id,)).fetchone() is not None
+    
+    def assign(self, chunk_id: str, text: str, source: Optional[str], page: Any = None) -> str:
+        """Add a chunk and return its group's ID; it needs storing only if that is its own ID"""
+        row = self._db.execute("SELECT group_id FROM members WHERE chunk_id = ?", (chunk_id,)).fetchone()
+        if row:
+            return row[0]
+        size = len(text.encode("utf-8"))
+        group_id = None
+        signature = self.minhash(text)
+        if self.has_group(chunk_id):
+            # Same ID as a stored chunk (same source, page and text), e.g. a file
+            # re-added while the copies it was collapsed with are still indexed
+            group_id = chunk_id
+            if signature is not None:
+                self._db.executemany("INSERT OR IGNORE INTO bands VALUES (?, ?)",
+                                     [(key, chunk_id) for key in self._band_keys(signature)])
+        elif signature is not None:
+            keys = self._band_keys(signature)
+            group_id = self._best_match(signature, keys)
+            if group_id is None:
+                self._db.executemany("INSERT OR IGNORE INTO bands VALUES (?, ?)", [(key, chunk_id) for key in keys])
+        if group_id is None:
+            group_id = chunk_id
+            self._db.execute("INSERT INTO groups VALUES (?, ?, ?)",
+                             (chunk_id, signature.tobytes() if signature is not None else None, size))
+        elif group_id != chunk_id:
+            self.dirty.add(group_id)
+            self.saved_chunks += 1
+            self.saved_bytes += size
+        self._db.execute("INSERT INTO members VALUES (?, ?, ?, ?, ?)", (chunk_id, group_id, source, page, size))
+        return group_id
+    
+    def remove(self, chunk_ids: Sequence[str]) -> List[str]:
+        """Forget chunks; returns the IDs to delete from the store
+        
+        That is the groups left without members, plus any IDs this index
+        never saw (chunks stored before dedup was enabled). A group whose
+        stored chunk is removed while other members remain keeps standing for
+        them, but no new chunk joins it, so edited text is never collapsed
+        into the text it replaced.
+        """
+        deleted = []
+        for chunk_id in chunk_ids:
+            row = self._db.execute("SELECT group_id FROM members WHERE chunk_id = ?", (chunk_id,)).fetchone()
+            if row is None:
+                if not self.has_group(chunk_id):
+                    deleted.append(chunk_id)
+                continue
+            group_id = row[0]
+            self._db.execute("DELETE FROM members WHERE chunk_id = ?", (chunk_id,))
+            if self._db.execute("SELECT 1 FROM members WHERE group_id = ? LIMIT 1", (group_id,)).fetchone():
+                self.dirty.add(group_id)
+                if group_id == chunk_id:
+                    self._drop_bands(group_id)
+                continue
+            self._drop_bands(group_id)
+            self._db.execute("DELETE FROM groups WHERE group_id = ?", (group_id,))
+            self.dirty.discard(group_id)
+            deleted.append(group_id)
+        return deleted
+    
+    def _drop_bands(self, group_id: str):
+        """Stop matching new chunks against a group"""
+        stored = self._db.execute("SELECT signature FROM groups WHERE group_id = ?", (group_id,)).fetchone()
+        if stored and stored[0] is not None:
+            keys = self._band_keys(np.frombuffer(stored[0], dtype=np.uint32))
+            self._db.executemany("DELETE FROM bands WHERE key = ? AND group_id = ?",
+                                 [(key, group_id) for key in keys])
+    
+    def citations(self, group_ids: Sequence[str], batch_size: int = 500) -> Dict[str, List[Dict[str, Any]]]:
+        """Distinct source/page citations of each group, in the order they were added"""
+        citations: Dict[str, List[Dict[str, Any]]] = {}
+        seen = set()
+        group_ids = list(group_ids)
+        for start in range(0, len(group_ids), batch_size):
+            batch = group_ids[start:start + batch_size]
+            rows = self._db.execute(
+                f"SELECT group_id, source, page FROM members WHERE group_id IN ({','.join('?' * len(batch))}) "
+                f"ORDER BY rowid", batch
+            )
+            for group_id, source, page in rows:
+                if (group_id, source, page) in seen:
+                    continue
+                seen.add((group_id, source, page))
+                citation = {"source": source}
+                if page is not None:
+                    citation["page"] = page
+                citations.setdefault(group_id, []).append(citation)
+        return citations
+    
+    def commit(self):
+        self._db.commit()
+    
+    def reset(self):
+        """Forget every chunk, e.g. when the index is rebuilt"""
+        self._db.executescript("DELETE FROM bands; DELETE FROM members; DELETE FROM groups;")
+        self._db.commit()
+        self.dirty.clear()
+    
+    def reset_stats(self):
+        self.saved_chunks = 0
+        self.saved_bytes = 0
+    
+    def stats(self) -> Dict[str, int]:
+        """Chunks collapsed since the last reset_stats, and index-wide totals"""
+        groups, group_bytes = self._db.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM groups").fetchone()
+        members, member_bytes = self._db.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM members").fetchone()
+        return {
+            "saved_chunks": self.saved_chunks,
+            "saved_bytes": self.saved_bytes,
+            "stored_chunks": groups,
+            "total_saved_chunks": max(0, members - groups),
+            "total_saved_bytes": max(0, member_bytes - group_bytes)
+        }
+    
+    def close(self):
+        self._db.commit()
+        self._db.close()
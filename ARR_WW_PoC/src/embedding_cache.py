@@ -0,0 +1,242 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so formatting-only changes still hit the cache"""
+    return " ".join(text.split())
+
+def text_hash(text: str) -> str:
+    """Hash the normalized text of a chunk"""
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()[:32]
+
+class EmbeddingCache:
+    """Size-bounded on-disk cache of embeddings keyed by model and chunk text hash
+    
+    Vectors live in one memory-mapped matrix (one row per slot) and an
+    append-only log maps text hashes to slots: each flush appends a line per
+    entry stored or used since the last one, and the log is rewritten only
+    once it has grown to several times the entry count. Entries are kept in
+    least recently used order, and when the cache is full the oldest slots
+    are reused. Each slot also records the hash it holds, checked on every
+    read, so a log left stale by a crash mid-flush or by another process
+    sharing the directory yields misses, not wrong vectors.
+    """
+    
+    LAYOUT = 3
+    
+    def __init__(self, cache_dir: str, model_name: str, max_entries: int, dtype: str = "float16"):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+        model_key = hashlib.sha256(model_name.encode('utf-8')).hexdigest()[:16]
+        self.directory = os.path.join(cache_dir, model_key)
+        self.index_path = os.path.join(self.directory, "index.log")
+        self.vectors_path = os.path.join(self.directory, "vectors.bin")
+        self.keys_path = os.path.join(self.directory, "keys.bin")
+        
+        self.dim: Optional[int] = None
+        # Text hash -> slot, least recently used first
+        self.entries: "OrderedDict[str, int]" = OrderedDict()
+        # Entries stored or used since the last flush, in the same order
+        self._dirty: "OrderedDict[str, int]" = OrderedDict()
+        self._log_lines = 0
+        # Set when the log on disk is missing, foreign or torn
+        self._rewrite_log = True
+        self.vectors = None
+        self.slot_keys = None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._load()
+    
+    def _header(self) -> str:
+        return json.dumps({'model': self.model_name, 'dtype': self.dtype.name, 'max_entries': self.max_entries,
+                           'layout': self.LAYOUT, 'dim': self.dim})
+    
+    def _load(self):
+        """Replay the index log and map the vector file, if present"""
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.loads(f.readline())
+                if (data.get('model') != self.model_name or data.get('dtype') != self.dtype.name
+                        or data.get('max_entries') != self.max_entries or data.get('layout') != self.LAYOUT):
+                    # Layout changed, start over
+                    return
+                self.dim = data['dim']
+                holders: Dict[int, str] = {}
+                torn = False
+                for line in f:
+                    parts = line.split()
+                    if len(parts) != 2 or not line.endswith("\n"):
+                        # Torn by a crash mid-append
+                        torn = True
+                        continue
+                    key, slot = parts[0], int(parts[1])
+                    # A slot handed to a new key evicted its previous holder
+                    previous = holders.get(slot)
+                    if previous is not None and previous != key and self.entries.get(previous) == slot:
+                        del self.entries[previous]
+                    holders[slot] = key
+                    self.entries[key] = slot
+                    self.entries.move_to_end(key)
+                    self._log_lines += 1
+            if sorted(self.entries.values()) != list(range(len(self.entries))):
+                raise ValueError("index log lost entries")
+            self._open_vectors('r+')
+            self._rewrite_log = torn
+        except Exception as e:
+            print(f"⚠️  Ignoring unreadable embedding cache: {e}")
+            self.dim, self.entries, self._log_lines = None, OrderedDict(), 0
+            self.vectors = self.slot_keys = None
+    
+    def _open_vectors(self, mode: str):
+        """Memory-map the vector matrix and the hash held by each slot"""
+        os.makedirs(self.directory, exist_ok=True)
+        self.vectors = np.memmap(self.vectors_path, dtype=self.dtype, mode=mode,
+                                 shape=(self.max_entries, self.dim))
+        self.slot_keys = np.memmap(self.keys_path, dtype="S16", mode=mode, shape=(self.max_entries,))
+    
+    @staticmethod
+    def _slot_key(key: str) -> bytes:
+        return bytes.fromhex(key)[:16]
+    
+    def _touch(self, key: str, slot: int):
+        """Mark an entry most recently used; caller holds the lock"""
+        self.entries.move_to_end(key)
+        self._dirty.pop(key, None)
+        self._dirty[key] = slot
+    
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Return cached vectors for the given text hashes"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                slot = self.entries.get(key)
+                if slot is None:
+                    continue
+                if self.slot_keys[slot] != self._slot_key(key):
+                    # The slot was rewritten after the log was saved; keep
+                    # the entry (slots stay 0..n-1) but make it the next victim
+                    self.entries.move_to_end(key, last=False)
+                    continue
+                self._touch(key, slot)
+                found[key] = self.vectors[slot].astype(np.float32).tolist()
+        return found
+    
+    def record(self, hits: int, misses: int):
+        """Count cache hits and misses"""
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+    
+    def put_many(self, items: Dict[str, List[float]]):
+        """Store vectors, evicting least recently used entries when full"""
+        if not items:
+            return
+        with self._lock:
+            if self.vectors is None:
+                self.dim = len(next(iter(items.values())))
+                self._open_vectors('w+')
+            
+            new_keys = [key for key in items if key not in self.entries]
+            free_slots = self._free_slots(len(new_keys))
+            for key in new_keys[:len(free_slots)]:
+                self.entries[key] = free_slots.pop()
+            
+            for key, vector in items.items():
+                slot = self.entries.get(key)
+                if slot is None:
+                    continue
+                self._touch(key, slot)
+                # Invalidate the slot while its vector is rewritten
+                self.slot_keys[slot] = b""
+                self.vectors[slot] = np.asarray(vector, dtype=self.dtype)
+                self.slot_keys[slot] = self._slot_key(key)
+    
+    def _free_slots(self, count: int) -> List[int]:
+        """Find unused slots, evicting the least recently used entries if needed"""
+        # Evicted slots are reused straight away, so occupied slots are always 0..n-1
+        size = len(self.entries)
+        free = list(range(size, min(self.max_entries, size + count)))
+        for _ in range(min(count - len(free), len(self.entries))):
+            key, slot = self.entries.popitem(last=False)
+            self._dirty.pop(key, None)
+            free.append(slot)
+        free.reverse()
+        return free
+    
+    def flush(self):
+        """Persist the vector matrix and append the index changes to the log"""
+        with self._lock:
+            if self.vectors is None:
+                return
+            self.vectors.flush()
+            self.slot_keys.flush()
+            if self._rewrite_log or self._log_lines > 4 * len(self.entries) + 1024:
+                # Rewrite the log with one line per live entry
+                tmp_path = f"{self.index_path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(self._header() + "\n")
+                    f.writelines(f"{key} {slot}\n" for key, slot in self.entries.items())
+                os.replace(tmp_path, self.index_path)
+                self._log_lines = len(self.entries)
+                self._rewrite_log = False
+            elif self._dirty:
+                with open(self.index_path, 'a', encoding='utf-8') as f:
+                    f.writelines(f"{key} {slot}\n" for key, slot in self._dirty.items())
+                self._log_lines += len(self._dirty)
+            self._dirty.clear()
+    
+    def reset_stats(self):
+        """Reset hit/miss counters"""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+    
+    def stats(self) -> Dict[str, int]:
+        """Get hit/miss counts and current size"""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only runs the model for texts missing from the cache"""
+    
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, reusing cached vectors where possible"""
+        keys = [text_hash(text) for text in texts]
+        found = self.cache.get_many(keys)
+        
+        # Embed each missing text once, even if it repeats within the batch
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        
+        misses = sum(1 for key in keys if key in missing)
+        self.cache.record(len(keys) - misses, misses)
+        
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(computed)
+            # Round through the cache dtype so cold and warm builds match
+            for key, vector in computed.items():
+                found[key] = np.asarray(vector, dtype=self.cache.dtype).astype(np.float32).tolist()
+        
+        return [found[key] for key in keys]
+    
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query with the underlying model"""
+        return self.embeddings.embed_query(text)
@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .config import config
+
+# Sentences the ONNX export is checked against the reference model with
+VERIFY_TEXTS = [
+    "What are the main findings of the climate adaptation report?",
+    "Glacier retreat in the Himalaya increases the risk of glacial lake outburst floods.",
+    "Monsoon rainfall variability affects agriculture and hydropower generation.",
+    "Table 3 lists emission factors for each energy source.",
+    "The watershed management policy was revised in 2011.",
+    "NEC-2011/3",
+    "How does sediment runoff change after forest loss?",
+    "Biodiversity indicators declined across all monitored sites between 2000 and 2015, "
+    "with the steepest losses recorded in wetland habitats downstream of new dams."
+]
+
+ONNX_VARIANTS = {"onnx": "model.onnx", "onnx-int8": "model.int8.onnx"}
+
+class MicroBatchingEmbeddings(Embeddings):
+    """Runs concurrent embed_query calls through the model as micro-batches
+    
+    A single worker thread takes the first waiting query, collects any that
+    arrive within window_ms (up to max_batch) and embeds them in one forward
+    pass. Queries arriving while a batch runs are batched next, so under load
+    batches fill without waiting. Document batches go straight to the model.
+    """
+    
+    def __init__(self, embeddings: Embeddings,
+                 window_ms: float = config.EMBEDDING_BATCH_WINDOW_MS,
+                 max_batch: int = config.EMBEDDING_BATCH_MAX_SIZE):
+        self.embeddings = embeddings
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.batches = 0
+        self.queries = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+    
+    def embed_query(self, text: str) -> List[float]:
+        future = Future()
+        self._queue.put((text, future))
+        return future.result()
+    
+    def _collect(self) -> list:
+        """Wait for one request, then gather more until the window closes or the batch is full"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                vectors = self.embeddings.embed_documents([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.queries += len(batch)
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+    
+    def stats(self) -> Dict[str, float]:
+        return {
+            "queries": self.queries,
+            "batches": self.batches,
+            "mean_batch": self.queries / self.batches if self.batches else 0.0
+        }
+
+class OnnxEmbeddings(Embeddings):
+    """Sentence embeddings from an exported ONNX transformer on onnxruntime (CPU)
+    
+    Reproduces the sentence-transformers pipeline of the mpnet model: mean
+    pooling over the attention mask followed by L2 normalization. Texts are
+    sorted by length before batching so little compute goes into padding.
+    """
+    
+    def __init__(self, model_dir: str, model_file: str, max_length: int = 384,
+                 batch_size: int = 32, threads: int = config.EMBEDDING_ONNX_THREADS):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file), options, providers=["CPUExecutionProvider"]
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_length = max_length
+        self.batch_size = batch_size
+    
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_length,
+                                 return_tensors="np")
+        mask = encoded["attention_mask"].astype(np.int64)
+        hidden = self.session.run(None, {
+            "input_ids": encoded["input_ids"].astype(np.int64),
+            "attention_mask": mask
+        })[0]
+        weights = mask[..., None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            rows = order[start:start + self.batch_size]
+            for row, vector in zip(rows, self._embed_batch([texts[i] for i in rows])):
+                vectors[row] = vector.tolist()
+        return vectors
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+def cosine_agreement(reference: Embeddings, candidate: Embeddings, texts: List[str]) -> Dict[str, float]:
+    """Mean and minimum cosine similarity between two models' embeddings of texts"""
+    a = np.asarray(reference.embed_documents(texts), dtype=np.float32)
+    b = np.asarray(candidate.embed_documents(texts), dtype=np.float32)
+    cosines = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    return {"mean": float(cosines.mean()), "min": float(cosines.min())}
+
+def onnx_model_dir(model_name: str = config.EMBEDDING_MODEL) -> str:
+    return os.path.join(config.EMBEDDING_ONNX_DIR, model_name.replace("/", "__"))
+
+def export_onnx_model(model_name: str = config.EMBEDDING_MODEL, reference: Optional[Embeddings] = None) -> Dict:
+    """Export the transformer to ONNX, add a dynamically int8-quantized copy, and verify both
+    
+    The cosine agreement of each variant with the reference model is written
+    to verification.json next to the models.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    
+    output_dir = onnx_model_dir(model_name)
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"📦 Exporting {model_name} to ONNX in {output_dir}...")
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    tokenizer.save_pretrained(output_dir)
+    model = AutoModel.from_pretrained(model_name).eval()
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    axes = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            model, (sample["input_ids"], sample["attention_mask"]),
+            os.path.join(output_dir, ONNX_VARIANTS["onnx"]),
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={"input_ids": axes, "attention_mask": axes, "last_hidden_state": axes},
+            opset_version=14
+        )
+    quantize_dynamic(
+        os.path.join(output_dir, ONNX_VARIANTS["onnx"]),
+        os.path.join(output_dir, ONNX_VARIANTS["onnx-int8"]),
+        weight_type=QuantType.QInt8
+    )
+    
+    if reference is None:
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        reference = HuggingFaceEmbeddings(model_name=model_name)
+    verification = {"model": model_name, "min_cosine": config.EMBEDDING_ONNX_MIN_COSINE}
+    for variant, model_file in ONNX_VARIANTS.items():
+        agreement = cosine_agreement(reference, OnnxEmbeddings(output_dir, model_file), VERIFY_TEXTS)
+        verification[variant] = {**agreement, "passed": agreement["min"] >= config.EMBEDDING_ONNX_MIN_COSINE}
+        print(f"  {variant}: cosine vs reference mean {agreement['mean']:.5f}, min {agreement['min']:.5f}")
+    with open(os.path.join(output_dir, "verification.json"), "w") as f:
+        json.dump(verification, f, indent=2)
+    return verification
+
+def load_onnx_embeddings(variant: str, model_name: str = config.EMBEDDING_MODEL) -> OnnxEmbeddings:
+    """Load an exported ONNX variant, exporting it first if needed
+    
+    Raises ValueError if the variant disagrees with the reference model.
+    """
+    model_dir = onnx_model_dir(model_name)
+    verification_path = os.path.join(model_dir, "verification.json")
+    if os.path.exists(verification_path):
+        with open(verification_path) as f:
+            verification = json.load(f)
+    else:
+        verification = export_onnx_model(model_name)
+    if not verification[variant]["passed"]:
+        raise ValueError(f"{variant} export agrees with the reference model only to cosine "
+                         f"{verification[variant]['min']:.4f}")
+    return OnnxEmbeddings(model_dir, ONNX_VARIANTS[variant])
+
+def load_embedding_model(runtime: str = config.EMBEDDING_RUNTIME) -> Tuple[Embeddings, str]:
+    """Load the embedding model on the configured runtime, behind the micro-batcher
+    
+    Returns the model and the runtime it actually runs on, which is "torch"
+    if an ONNX runtime was configured but could not be loaded.
+    """
+    model = None
+    if runtime in ONNX_VARIANTS:
+        try:
+            model = load_onnx_embeddings(runtime)
+            print(f"✅ Embedding with {runtime} runtime")
+        except Exception as e:
+            print(f"⚠️  {runtime} embedding runtime unavailable ({e}), using PyTorch")
+    if model is None:
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        model = HuggingFaceEmbeddings(model_name=config.EMBEDDING_MODEL)
+        runtime = "torch"
+    if config.EMBEDDING_BATCH_MAX_SIZE > 1:
+        model = MicroBatchingEmbeddings(model)
+    return model, runtime
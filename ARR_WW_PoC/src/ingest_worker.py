@@ -0,0 +1,178 @@
+import os
+import time
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from .config import config
+from .lexical_index import LexicalIndex
+from .numpy_index import NumpyVectorIndex
+
+class IngestWorker:
+    """Watches the data directory and indexes changes in a background thread
+    
+    The directory is polled for new, changed and removed files (by size and
+    modification time). Once a change has been stable for one poll interval,
+    a private write-side VectorStoreManager syncs it into Chroma and the
+    lexical index. With VECTOR_BACKEND "numpy", the sync's NumPy export and
+    the lexical index are loaded as fresh read-only copies and published to
+    the serving manager in one swap, so searches never see a half-ingested
+    index. With Chroma, searches read the collection the writer updates, so
+    new chunks appear batch by batch; publishing only swaps in the writer's
+    collection and a fresh lexical index, costing nothing per chunk. Files that fail to ingest stay pending
+    and are retried when they change, or after a backoff that doubles with
+    each failed attempt.
+    """
+    
+    MAX_RETRY_SECONDS = 600.0
+    
+    def __init__(self, vector_store_manager, data_dir: str = config.DATA_DIR,
+                 poll_seconds: float = config.INGEST_POLL_SECONDS):
+        self.vector_store_manager = vector_store_manager
+        self.data_dir = data_dir
+        self.poll_seconds = poll_seconds
+        self.writer = None
+        self.ingesting = False
+        self.publishes = 0
+        self.last_stats: Dict[str, Any] = {}
+        self.last_error: Optional[str] = None
+        # Files whose current state differs from the published index
+        self.pending: Dict[str, str] = {}
+        # Files whose last ingest failed: error, attempts, signature and when to retry
+        self.failed: Dict[str, Dict[str, Any]] = {}
+        self._indexed: Optional[Dict[str, Tuple[int, int]]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ingest-worker", daemon=True)
+            self._thread.start()
+            print(f"👀 Watching {self.data_dir} for new or changed documents")
+    
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+    
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """(modification time, size) of every supported file in the data directory"""
+        files = {}
+        if not os.path.isdir(self.data_dir):
+            return files
+        for entry in os.scandir(self.data_dir):
+            if entry.is_file() and entry.name.endswith(config.SUPPORTED_EXTENSIONS):
+                stat = entry.stat()
+                files[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return files
+    
+    def _diff(self, files: Dict[str, Tuple[int, int]]) -> Dict[str, str]:
+        indexed = self._indexed or {}
+        changes = {name: "removed" for name in indexed if name not in files}
+        for name, signature in files.items():
+            if name not in indexed:
+                changes[name] = "new"
+            elif indexed[name] != signature:
+                changes[name] = "changed"
+        return changes
+    
+    def _due(self, files: Dict[str, Tuple[int, int]]) -> bool:
+        """Whether any pending change is not a failed file still backing off"""
+        now = time.monotonic()
+        for name in self.pending:
+            failure = self.failed.get(name)
+            if failure is None or failure["signature"] != files.get(name) or now >= failure["retry_at"]:
+                return True
+        return False
+    
+    def _run(self):
+        previous = None
+        while not self._stop.is_set():
+            try:
+                files = self._scan()
+                if self._indexed is None:
+                    # First pass: sync whatever changed while the process was down
+                    self._ingest(files)
+                else:
+                    self.pending = self._diff(files)
+                    # Only ingest once the directory is unchanged between two
+                    # polls, so files still being copied are not picked up
+                    if self.pending and files == previous and self._due(files):
+                        self._ingest(files)
+                previous = files
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"❌ Background ingest failed: {e}")
+            self._stop.wait(self.poll_seconds)
+    
+    def _ingest(self, files: Dict[str, Tuple[int, int]]):
+        """Sync the data directory on the write side and publish the result"""
+        self.ingesting = True
+        try:
+            if self.writer is None:
+                from .vectorstore import VectorStoreManager
+                self.writer = VectorStoreManager()
+            stats = self.writer.sync_documents(self.data_dir)
+            changed = stats["added_chunks"] or stats["deleted_chunks"] or stats["dedup_chunks"]
+            if changed or not self.publishes:
+                self._publish()
+            # Leave failed files out, so they still differ from the index and are retried
+            errors = stats.get("failed_files", {})
+            self._indexed = {name: signature for name, signature in files.items() if name not in errors}
+            self.pending = self._diff(files)
+            self._record_failures(errors, files)
+            self.last_stats = {key: value for key, value in stats.items() if key != "embedding_cache"}
+            self.last_error = None
+            if errors:
+                self.last_error = f"Failed to ingest {len(errors)} file(s): {', '.join(sorted(errors))}"
+        finally:
+            self.ingesting = False
+    
+    def _record_failures(self, errors: Dict[str, str], files: Dict[str, Tuple[int, int]]):
+        """Track failed files and schedule their next retry"""
+        now = time.monotonic()
+        failed = {}
+        for name, error in errors.items():
+            previous = self.failed.get(name)
+            attempts = previous["attempts"] + 1 if previous else 1
+            delay = min(self.poll_seconds * 2 ** attempts, self.MAX_RETRY_SECONDS)
+            failed[name] = {"error": error, "attempts": attempts,
+                            "signature": files.get(name), "retry_at": now + delay}
+            print(f"⚠️  Could not ingest {name} (attempt {attempts}), retrying in {delay:.0f}s: {error}")
+        self.failed = failed
+    
+    def _publish(self):
+        """Export the write side's state and swap it into the serving manager"""
+        writer = self.writer
+        lexical_index = None
+        if config.RETRIEVAL_MODE == "hybrid":
+            lexical_index = LexicalIndex.load(config.LEXICAL_INDEX_PATH)
+        if config.VECTOR_BACKEND != "numpy":
+            # Chroma serves searches itself; no export, whatever the corpus size
+            self.vector_store_manager.publish(None, lexical_index, vector_store=writer.vector_store)
+            count = writer.vector_store._collection.count()
+        else:
+            # sync_documents has exported the NumPy index; fresh read-only
+            # copies, so later ingests never touch what searches use
+            if not NumpyVectorIndex.exists(config.NUMPY_INDEX_DIR):
+                return
+            numpy_index = NumpyVectorIndex(config.NUMPY_INDEX_DIR, config.NUMPY_INDEX_RESCORE_MULTIPLIER)
+            self.vector_store_manager.publish(numpy_index, lexical_index)
+            count = len(numpy_index)
+        self.publishes += 1
+        print(f"📣 Published index with {count} chunks")
+    
+    def status(self) -> Dict[str, Any]:
+        """Ingest queue depth, activity and last publish time, for the UI, CLI and API"""
+        last_publish = self.vector_store_manager.last_publish
+        return {
+            "queue_depth": len(self.pending),
+            "pending_files": dict(self.pending),
+            "failed_files": {name: {"error": failure["error"], "attempts": failure["attempts"]}
+                             for name, failure in self.failed.items()},
+            "ingesting": self.ingesting,
+            "publishes": self.publishes,
+            "last_publish": last_publish,
+            "last_publish_age_seconds": round(time.time() - last_publish, 1) if last_publish else None,
+            "last_stats": self.last_stats,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,371 @@
+import os
+import re
+import array
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; keeps report numbers like 'NEC-2011/3' intact"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+def _unique(values: np.ndarray) -> np.ndarray:
+    """Sorted distinct values; cheaper than np.unique on the small arrays of a search"""
+    values = np.sort(values)
+    if len(values) > 1:
+        values = values[np.concatenate(([True], values[1:] != values[:-1]))]
+    return values
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse ranked ID lists with reciprocal rank fusion, best first"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+class LexicalIndex:
+    """Compact BM25 inverted index over chunk texts
+
+    Postings are kept per term as parallel uint32 (doc number) and uint16
+    (term frequency) arrays, so a lookup only touches the postings of the
+    query terms. New postings are buffered in lists and merged into the
+    arrays lazily, so batched adds stay linear in the text indexed. Deleted
+    chunks are tombstoned and compacted away once they make up a large share
+    of the index. Persisted as a single .npz file, or as sections of an
+    index snapshot.
+    
+    Each term also keeps its postings' impact order (BM25 term weight,
+    highest first), so a search scores the best postings of each term first
+    and skips the ones that can no longer reach the top k.
+    """
+    
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75, max_df_ratio: float = 0.5):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        # Terms in more than this share of chunks carry almost no BM25 weight
+        # and are skipped to keep lookups fast
+        self.max_df_ratio = max_df_ratio
+        # Queries with fewer postings than this are scored in full, which
+        # beats pruning's per-round overhead
+        self.exhaustive_postings = 32768
+        self.doc_ids: List[str] = []
+        self.doc_numbers: Dict[str, int] = {}
+        # Growable buffers, viewed as numpy arrays without copying
+        self._lengths = array.array('I')
+        self._deleted = bytearray()
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._pending: Dict[str, Tuple[List[int], List[int]]] = {}
+        # Term -> (posting positions by descending impact, average chunk
+        # length the impacts were computed with); rebuilt when postings change
+        self.orders: Dict[str, Tuple[np.ndarray, float]] = {}
+        # Digest of the chunk set the index was built from (see IndexManifest.digest)
+        self.fingerprint: Optional[str] = None
+        self.live_count = 0
+        self.total_length = 0
+        self._lock = threading.RLock()
+    
+    def __len__(self) -> int:
+        return self.live_count
+    
+    @property
+    def doc_lengths(self) -> np.ndarray:
+        return np.frombuffer(self._lengths, dtype=np.uint32)
+    
+    @property
+    def deleted(self) -> np.ndarray:
+        return np.frombuffer(self._deleted, dtype=bool)
+    
+    def add(self, ids: Sequence[str], texts: Sequence[str]):
+        """Index chunks, replacing any existing chunk with the same ID"""
+        with self._lock:
+            self.remove([chunk_id for chunk_id in ids if chunk_id in self.doc_numbers])
+            lengths = []
+            for chunk_id, text in zip(ids, texts):
+                number = len(self.doc_ids)
+                self.doc_ids.append(chunk_id)
+                self.doc_numbers[chunk_id] = number
+                tokens = tokenize(text)
+                lengths.append(len(tokens))
+                for term, tf in Counter(tokens).items():
+                    docs, tfs = self._pending.setdefault(term, ([], []))
+                    docs.append(number)
+                    tfs.append(min(tf, 65535))
+            
+            self._lengths.extend(lengths)
+            self._deleted.extend(bytes(len(lengths)))
+            self.live_count += len(lengths)
+            self.total_length += int(sum(lengths))
+    
+    def remove(self, ids: Sequence[str]):
+        """Tombstone chunks by ID"""
+        with self._lock:
+            for chunk_id in ids:
+                number = self.doc_numbers.pop(chunk_id, None)
+                if number is None:
+                    continue
+                self._deleted[number] = 1
+                self.live_count -= 1
+                self.total_length -= self._lengths[number]
+            if len(self.doc_ids) > 1000 and self.live_count < 0.8 * len(self.doc_ids):
+                self._compact()
+    
+    def _get_postings(self, term: str):
+        """Get a term's postings, merging any buffered additions first"""
+        pending = self._pending.pop(term, None)
+        if pending is not None:
+            new_docs = np.asarray(pending[0], dtype=np.uint32)
+            new_tfs = np.asarray(pending[1], dtype=np.uint16)
+            old = self.postings.get(term)
+            if old is not None:
+                new_docs = np.concatenate([old[0], new_docs])
+                new_tfs = np.concatenate([old[1], new_tfs])
+            self.postings[term] = (new_docs, new_tfs)
+            self.orders.pop(term, None)
+        return self.postings.get(term)
+    
+    def _flush_pending(self):
+        """Merge all buffered postings into the arrays"""
+        for term in list(self._pending):
+            self._get_postings(term)
+    
+    def _compact(self):
+        """Drop tombstoned chunks and renumber the rest"""
+        self._flush_pending()
+        keep = ~self.deleted
+        remap = np.cumsum(keep, dtype=np.int64) - 1
+        postings = {}
+        orders = {}
+        for term, (docs, tfs) in self.postings.items():
+            mask = keep[docs]
+            if mask.any():
+                postings[term] = (remap[docs[mask]].astype(np.uint32), tfs[mask])
+                if term in self.orders:
+                    # Dropping postings keeps the order of the rest
+                    order, order_avg = self.orders[term]
+                    positions = np.cumsum(mask, dtype=np.int64) - 1
+                    orders[term] = (positions[order[mask[order]]].astype(np.uint32), order_avg)
+        self.postings = postings
+        self.orders = orders
+        self.doc_ids = [chunk_id for chunk_id, alive in zip(self.doc_ids, keep) if alive]
+        self.doc_numbers = {chunk_id: number for number, chunk_id in enumerate(self.doc_ids)}
+        self._lengths = array.array('I', self.doc_lengths[keep].tobytes())
+        self._deleted = bytearray(len(self.doc_ids))
+    
+    def _weights(self, tfs: np.ndarray, docs: np.ndarray, avg_length: float) -> np.ndarray:
+        """BM25 term weight of postings, before idf"""
+        tf = tfs.astype(np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / avg_length)
+        return tf * (self.k1 + 1) / (tf + norm)
+    
+    def _impact_order(self, term: str, avg_length: float) -> Tuple[np.ndarray, float]:
+        """A term's posting positions by descending weight, computed on first use"""
+        entry = self.orders.get(term)
+        if entry is None:
+            docs, tfs = self.postings[term]
+            order = np.argsort(-self._weights(tfs, docs, avg_length), kind="stable").astype(np.uint32)
+            entry = self.orders[term] = (order, avg_length)
+        return entry
+    
+    def _bound(self, term, position: int, avg_length: float) -> float:
+        """Upper bound on the score of a term's postings from position on, in impact order"""
+        idf, docs, tfs, order, order_avg = term
+        if position >= len(order):
+            return 0.0
+        # A weight grows with the average chunk length by at most the ratio
+        # to the average the order was computed with; the slack covers float32
+        # rounding in the order
+        posting = int(order[position])
+        tf = int(tfs[posting])
+        norm = self.k1 * (1 - self.b + self.b * self._lengths[int(docs[posting])] / order_avg)
+        return idf * max(1.0, avg_length / order_avg) * tf * (self.k1 + 1) / (tf + norm) * 1.00001
+    
+    def _cutoff(self, term, start: int, limit: float, avg_length: float) -> int:
+        """First position from start on whose bound is at most limit (binary search over the impact order)"""
+        low, high = start, len(term[3])
+        while low < high:
+            middle = (low + high) // 2
+            if self._bound(term, middle, avg_length) > limit:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+    
+    def _score(self, terms, docs: np.ndarray, avg_length: float) -> np.ndarray:
+        """Exact BM25 scores of chunks over all query terms"""
+        scores = np.zeros(len(docs), dtype=np.float64)
+        for idf, term_docs, tfs, _, _ in terms:
+            # Postings are in chunk order
+            found = np.minimum(np.searchsorted(term_docs, docs), len(term_docs) - 1)
+            hit = term_docs[found] == docs
+            scores[hit] += idf * self._weights(tfs[found[hit]], docs[hit], avg_length)
+        return scores
+    
+    def search(self, query: str, k: int = 5, prefix: int = 256) -> List[Tuple[str, float]]:
+        """Return the top-k chunk IDs by BM25 score
+        
+        The first `prefix` postings of each query term in impact order are
+        scored exactly, which gives a k-th best score to beat. Then, in
+        doubling blocks, only the terms whose remaining bounds could lift a
+        chunk past it (MaxScore) are scanned, and only as far down their
+        impact order as their bound plus the other terms' can beat it, until
+        no unseen chunk can make the top k.
+        """
+        with self._lock:
+            if not self.live_count:
+                return []
+            n = self.live_count
+            avg_length = self.total_length / n if n else 1.0
+            found = []
+            for term in set(tokenize(query)):
+                entry = self._get_postings(term)
+                if entry is None:
+                    continue
+                docs, tfs = entry
+                df = len(docs)
+                if len(self.doc_ids) > 100 and df > self.max_df_ratio * len(self.doc_ids):
+                    continue
+                idf = float(np.log(1.0 + (n - df + 0.5) / (df + 0.5)))
+                found.append((term, idf, docs, tfs))
+            if not found:
+                return []
+            
+            # Tombstones only need filtering while there are any
+            deleted = self.deleted if self.live_count < len(self.doc_ids) else None
+            prefix = max(prefix, 2 * k)
+            if sum(len(docs) for _, _, docs, _ in found) <= self.exhaustive_postings:
+                docs, inverse = np.unique(np.concatenate([docs for _, _, docs, _ in found]), return_inverse=True)
+                weights = [idf * self._weights(tfs, docs, avg_length) for _, idf, docs, tfs in found]
+                scores = np.bincount(inverse.ravel(), weights=np.concatenate(weights))
+                if deleted is not None:
+                    alive = ~deleted[docs]
+                    docs, scores = docs[alive], scores[alive]
+                return self._top(docs, scores, k)
+            
+            terms = [(idf, docs, tfs, *self._impact_order(term, avg_length)) for term, idf, docs, tfs in found]
+            block = prefix
+            positions = [min(prefix, len(term[3])) for term in terms]
+            found = [term[1][term[3][:prefix]] for term in terms]
+            docs = np.zeros(0, dtype=np.uint32)
+            scores = np.zeros(0, dtype=np.float64)
+            while found:
+                new = _unique(np.concatenate(found))
+                if deleted is not None:
+                    new = new[~deleted[new]]
+                if len(docs):
+                    seen = np.minimum(np.searchsorted(docs, new), len(docs) - 1)
+                    new = new[docs[seen] != new]
+                if len(new):
+                    docs = np.concatenate([docs, new])
+                    scores = np.concatenate([scores, self._score(terms, new, avg_length)])
+                    order = np.argsort(docs)
+                    docs, scores = docs[order], scores[order]
+                
+                bounds = [self._bound(term, position, avg_length) for term, position in zip(terms, positions)]
+                remaining = sum(bounds)
+                threshold = np.partition(scores, -k)[-k] if len(docs) >= k else 0.0
+                if remaining <= threshold:
+                    break
+                # Terms whose bounds add up to at most the threshold cannot
+                # lift an unseen chunk into the top k without an essential one
+                found, total = [], 0.0
+                for i in sorted(range(len(terms)), key=lambda i: bounds[i]):
+                    total += bounds[i]
+                    if total <= threshold:
+                        continue
+                    term = terms[i]
+                    end = self._cutoff(term, positions[i], threshold - (remaining - bounds[i]), avg_length)
+                    end = min(end, positions[i] + block)
+                    if end > positions[i]:
+                        found.append(term[1][term[3][positions[i]:end]])
+                        positions[i] = end
+                block *= 2
+            return self._top(docs, scores, k)
+    
+    def _top(self, docs: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        """The k best-scoring chunks, best first"""
+        if len(docs) > k:
+            top = np.argpartition(-scores, k)[:k]
+            docs, scores = docs[top], scores[top]
+        order = np.argsort(-scores)
+        return [(self.doc_ids[docs[i]], float(scores[i])) for i in order]
+    
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """The compacted index as flat arrays: sorted terms, posting offsets, postings, IDs and lengths"""
+        with self._lock:
+            self._compact()
+            terms = sorted(self.postings)
+            lengths = np.array([len(self.postings[term][0]) for term in terms], dtype=np.int64)
+            offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+            empty32, empty16 = np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.uint16)
+            avg_length = self.total_length / self.live_count if self.live_count else 1.0
+            orders = [self._impact_order(term, avg_length) for term in terms]
+            return {
+                "terms": np.array(terms, dtype=str),
+                "offsets": offsets,
+                "docs": np.concatenate([self.postings[t][0] for t in terms]) if terms else empty32,
+                "tfs": np.concatenate([self.postings[t][1] for t in terms]) if terms else empty16,
+                "orders": np.concatenate([order for order, _ in orders]) if terms else empty32,
+                "order_avgs": np.array([order_avg for _, order_avg in orders], dtype=np.float64),
+                "doc_ids": np.array(self.doc_ids, dtype=str),
+                "doc_lengths": self.doc_lengths.copy(),
+                "fingerprint": np.array(self.fingerprint or "", dtype=str)
+            }
+    
+    @classmethod
+    def from_arrays(cls, path: str, arrays) -> "LexicalIndex":
+        """Build an index over arrays from to_arrays(); postings stay views into them"""
+        index = cls(path)
+        terms = arrays["terms"].tolist()
+        offsets = arrays["offsets"].tolist()
+        # Plain ndarray views: slicing a memmap costs far more per term
+        docs = np.asarray(arrays["docs"])
+        tfs = np.asarray(arrays["tfs"])
+        index.doc_ids = arrays["doc_ids"].tolist()
+        index._lengths = array.array('I', arrays["doc_lengths"].astype(np.uint32).tobytes())
+        index.postings = {
+            term: (docs[offsets[i]:offsets[i + 1]], tfs[offsets[i]:offsets[i + 1]])
+            for i, term in enumerate(terms)
+        }
+        # Indexes saved before impact orders were stored compute them on first use
+        if "orders" in arrays:
+            orders = np.asarray(arrays["orders"])
+            order_avgs = arrays["order_avgs"].tolist()
+            index.orders = {
+                term: (orders[offsets[i]:offsets[i + 1]], order_avgs[i])
+                for i, term in enumerate(terms)
+            }
+        if "fingerprint" in arrays:
+            index.fingerprint = str(arrays["fingerprint"]) or None
+        index.doc_numbers = {chunk_id: number for number, chunk_id in enumerate(index.doc_ids)}
+        index._deleted = bytearray(len(index.doc_ids))
+        index.live_count = len(index.doc_ids)
+        index.total_length = int(index.doc_lengths.sum())
+        return index
+    
+    def save(self):
+        """Persist the index as one .npz file"""
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp.npz"
+            np.savez(tmp_path, **self.to_arrays())
+            os.replace(tmp_path, self.path)
+    
+    @classmethod
+    def load(cls, path: str) -> "LexicalIndex":
+        """Load a persisted index, or return an empty one"""
+        if not os.path.exists(path):
+            return cls(path)
+        with np.load(path) as data:
+            return cls.from_arrays(path, {name: data[name] for name in data.files})
+    
+    def exists(self) -> bool:
+        """Check whether the index has been persisted before"""
+        return os.path.exists(self.path)
@@ -0,0 +1,389 @@
+import json
+import time
+import random
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, List, Iterator, Iterable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import config
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class LLMClientError(Exception):
+    """Raised when the LLM endpoint cannot produce a completion"""
+
+def iter_sse_data(lines: Iterable[str]) -> Iterator[str]:
+    """Yield the data payload of each server-sent event from a stream of lines"""
+    data_lines = []
+    for line in lines:
+        if not line:
+            # A blank line terminates the current event
+            if data_lines:
+                yield "\n".join(data_lines)
+                data_lines = []
+            continue
+        if line.startswith(":"):
+            continue
+        field, _, value = line.partition(":")
+        if field == "data":
+            data_lines.append(value[1:] if value.startswith(" ") else value)
+    if data_lines:
+        yield "\n".join(data_lines)
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class RateLimiter:
+    """Token bucket limiting how many requests start per second"""
+    
+    def __init__(self, rate_per_second: float, burst: Optional[int] = None):
+        self.rate = rate_per_second
+        self.capacity = burst or max(1, int(rate_per_second))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def reserve(self) -> float:
+        """Take a token and return how long to wait before starting the request"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+    
+    def acquire(self):
+        """Block until a request may start"""
+        time.sleep(self.reserve())
+
+async def acquire_async(lock, poll_interval: float = 0.001, max_poll_interval: float = 0.05):
+    """Acquire a threading lock or semaphore from a coroutine without blocking the event loop
+    
+    Polls with non-blocking acquires, backing off between them, so waiters
+    hold no executor threads and can be cancelled at any point without
+    leaking the lock.
+    """
+    delay = poll_interval
+    while not lock.acquire(blocking=False):
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, max_poll_interval)
+
+class RequestBudget:
+    """Concurrency cap and request rate limit for one LLM endpoint
+    
+    Share one budget between the sync and async clients of an endpoint so
+    their combined traffic stays within the configured limits.
+    """
+    
+    def __init__(self, max_concurrency: int = config.LLM_MAX_CONCURRENCY,
+                 rate_limit_per_second: float = config.LLM_RATE_LIMIT_PER_SECOND):
+        self.max_concurrency = max_concurrency
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.rate_limiter = RateLimiter(rate_limit_per_second) if rate_limit_per_second > 0 else None
+    
+    async def acquire_async(self):
+        """Wait for a concurrency slot without blocking the event loop"""
+        await acquire_async(self.slots)
+    
+    def release(self):
+        self.slots.release()
+
+def backoff_delay(attempt: int, retry_after: Optional[float], base: float, cap: float) -> float:
+    """Full-jitter exponential backoff, never shorter than Retry-After"""
+    if retry_after is not None:
+        return retry_after + random.uniform(0, base)
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+def build_payload(model: str, messages: List[Dict], stream: bool, **overrides) -> Dict[str, Any]:
+    """Build a chat completions request body"""
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": config.TEMPERATURE,
+        "max_tokens": config.LLM_MAX_TOKENS,
+        "stream": stream
+    }
+    payload.update(overrides)
+    return payload
+
+class LLMClient:
+    """Pooled keep-alive client for an OpenAI-compatible chat completions API
+    
+    Adds connect/read timeouts, retries with jittered exponential backoff that
+    honour Retry-After, a cap on in-flight requests and an optional request
+    rate limit (see RequestBudget), and optional hedged requests.
+    """
+    
+    def __init__(self,
+                 api_base: str = config.CEREBRAS_API_BASE,
+                 api_key: Optional[str] = config.CEREBRAS_API_KEY,
+                 model: str = config.MODEL_NAME,
+                 connect_timeout: float = config.LLM_CONNECT_TIMEOUT,
+                 read_timeout: float = config.LLM_READ_TIMEOUT,
+                 max_retries: int = config.LLM_MAX_RETRIES,
+                 backoff_base: float = config.LLM_BACKOFF_BASE,
+                 backoff_max: float = config.LLM_BACKOFF_MAX,
+                 max_concurrency: int = config.LLM_MAX_CONCURRENCY,
+                 rate_limit_per_second: float = config.LLM_RATE_LIMIT_PER_SECOND,
+                 hedge_after_seconds: float = config.LLM_HEDGE_AFTER_SECONDS,
+                 budget: Optional[RequestBudget] = None):
+        self.url = f"{api_base}/chat/completions"
+        self.api_key = api_key
+        self.model = model
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after_seconds = hedge_after_seconds
+        # Shared with AsyncLLMClient when passed in; max_concurrency and
+        # rate_limit_per_second only apply to a budget of its own
+        self.budget = budget or RequestBudget(max_concurrency, rate_limit_per_second)
+        max_concurrency = self.budget.max_concurrency
+        
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        
+        self._slots = self.budget.slots
+        self._rate_limiter = self.budget.rate_limiter
+        self._hedge_executor = (
+            ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm-hedge")
+            if hedge_after_seconds > 0 else None
+        )
+    
+    def _headers(self, stream: bool) -> Dict[str, str]:
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        if stream:
+            headers["Accept"] = "text/event-stream"
+        return headers
+    
+    def _post(self, payload: Dict[str, Any], stream: bool) -> requests.Response:
+        """POST with retries; the caller must hold a concurrency slot"""
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if self._rate_limiter:
+                self._rate_limiter.acquire()
+            retry_after = None
+            try:
+                response = self.session.post(
+                    self.url, headers=self._headers(stream), json=payload,
+                    timeout=self.timeout, stream=stream
+                )
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    response.raise_for_status()
+                    return response
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                last_error = requests.exceptions.HTTPError(
+                    f"{response.status_code} Server Error for url: {self.url}", response=response
+                )
+                response.close()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                last_error = e
+            if attempt < self.max_retries:
+                time.sleep(backoff_delay(attempt, retry_after, self.backoff_base, self.backoff_max))
+        raise last_error
+    
+    def _complete(self, payload: Dict[str, Any], acquired: bool = False) -> str:
+        """Run one non-streaming completion under a concurrency slot, taken here unless `acquired`"""
+        if not acquired:
+            self._slots.acquire()
+        try:
+            response = self._post(payload, stream=False)
+        finally:
+            self._slots.release()
+        try:
+            return response.json()["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, ValueError) as e:
+            raise LLMClientError(f"Unexpected response format: {str(e)}")
+    
+    def _release_if_cancelled(self, future):
+        """Give back the slot of a hedge that was cancelled before it ran"""
+        if future.cancelled():
+            self._slots.release()
+    
+    def chat(self, messages: List[Dict], **overrides) -> str:
+        """Get a chat completion, hedging slow requests when enabled"""
+        payload = build_payload(self.model, messages, stream=False, **overrides)
+        if not self._hedge_executor:
+            return self._complete(payload)
+        
+        primary = self._hedge_executor.submit(self._complete, payload)
+        done, _ = wait([primary], timeout=self.hedge_after_seconds)
+        if done:
+            return primary.result()
+        
+        # Only hedge if it does not exceed the concurrency cap; the slot taken
+        # here is the one the hedge runs under
+        if not self._slots.acquire(blocking=False):
+            return primary.result()
+        try:
+            hedge = self._hedge_executor.submit(self._complete, payload, True)
+        except RuntimeError:
+            self._slots.release()
+            raise
+        hedge.add_done_callback(self._release_if_cancelled)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # Drop the loser if it is still queued; a request already
+                    # in flight finishes in the background and is discarded
+                    for loser in pending:
+                        loser.cancel()
+                    return future.result()
+                error = future.exception()
+        raise error
+    
+    def stream_chat(self, messages: List[Dict], **overrides) -> Iterator[str]:
+        """Stream a chat completion, yielding answer deltas
+        
+        The concurrency slot is held until the stream ends; close() the
+        generator when stopping early so it is released right away.
+        """
+        payload = build_payload(self.model, messages, stream=True, **overrides)
+        self._slots.acquire()
+        try:
+            with self._post(payload, stream=True) as response:
+                # text/event-stream is always UTF-8, but without a charset
+                # requests would decode it as ISO-8859-1
+                response.encoding = "utf-8"
+                for data in iter_sse_data(response.iter_lines(decode_unicode=True)):
+                    if data == "[DONE]":
+                        break
+                    try:
+                        choices = json.loads(data).get("choices") or []
+                    except ValueError as e:
+                        raise LLMClientError(f"Unexpected response format: {str(e)}")
+                    delta = choices[0].get("delta", {}).get("content") if choices else None
+                    if delta:
+                        yield delta
+        finally:
+            # Also runs on GeneratorExit when the consumer closes the stream
+            self._slots.release()
+    
+    def close(self):
+        """Close pooled connections"""
+        if self._hedge_executor:
+            self._hedge_executor.shutdown(wait=False)
+        self.session.close()
+
+class AsyncLLMClient:
+    """asyncio counterpart of LLMClient built on aiohttp
+    
+    Shares LLMClient's timeout and retry settings; pass it LLMClient's budget
+    to share its concurrency cap and rate limit too. The session is bound to
+    the running event loop and recreated if the client is used from a new
+    loop.
+    """
+    
+    def __init__(self,
+                 api_base: str = config.CEREBRAS_API_BASE,
+                 api_key: Optional[str] = config.CEREBRAS_API_KEY,
+                 model: str = config.MODEL_NAME,
+                 connect_timeout: float = config.LLM_CONNECT_TIMEOUT,
+                 read_timeout: float = config.LLM_READ_TIMEOUT,
+                 max_retries: int = config.LLM_MAX_RETRIES,
+                 backoff_base: float = config.LLM_BACKOFF_BASE,
+                 backoff_max: float = config.LLM_BACKOFF_MAX,
+                 max_concurrency: int = config.LLM_MAX_CONCURRENCY,
+                 rate_limit_per_second: float = config.LLM_RATE_LIMIT_PER_SECOND,
+                 budget: Optional[RequestBudget] = None):
+        self.url = f"{api_base}/chat/completions"
+        self.api_key = api_key
+        self.model = model
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.budget = budget or RequestBudget(max_concurrency, rate_limit_per_second)
+        self._rate_limiter = self.budget.rate_limiter
+        self._loop = None
+        self._session = None
+    
+    def _ensure_session(self) -> "aiohttp.ClientSession":
+        """Get the session for the running loop, creating it if needed"""
+        # aiohttp is only imported once the async API is actually used
+        import aiohttp
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._loop = loop
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.budget.max_concurrency),
+                timeout=aiohttp.ClientTimeout(sock_connect=self.connect_timeout, sock_read=self.read_timeout),
+                headers={"Authorization": f"Bearer {self.api_key}"}
+            )
+        return self._session
+    
+    async def chat(self, messages: List[Dict], **overrides) -> str:
+        """Get a chat completion"""
+        import aiohttp
+        session = self._ensure_session()
+        payload = build_payload(self.model, messages, stream=False, **overrides)
+        await self.budget.acquire_async()
+        try:
+            for attempt in range(self.max_retries + 1):
+                if self._rate_limiter:
+                    await asyncio.sleep(self._rate_limiter.reserve())
+                retry_after = None
+                try:
+                    async with session.post(self.url, json=payload) as response:
+                        if response.status not in RETRYABLE_STATUS_CODES or attempt == self.max_retries:
+                            response.raise_for_status()
+                            result = await response.json(content_type=None)
+                            try:
+                                return result["choices"][0]["message"]["content"]
+                            except (KeyError, IndexError, TypeError) as e:
+                                raise LLMClientError(f"Unexpected response format: {str(e)}")
+                        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                    if attempt == self.max_retries:
+                        raise
+                await asyncio.sleep(backoff_delay(attempt, retry_after, self.backoff_base, self.backoff_max))
+        finally:
+            self.budget.release()
+    
+    async def close(self):
+        """Close pooled connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def close_sync(self, timeout: float = 5.0):
+        """Close pooled connections from synchronous code, wherever the session's loop is"""
+        session, loop = self._session, self._loop
+        if session is None or session.closed:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is not None and (loop is running or loop.is_closed()):
+            running.create_task(session.close())
+        elif loop.is_closed():
+            # The sockets went with the loop; release what the session holds
+            asyncio.run(session.close())
+        elif loop.is_running():
+            asyncio.run_coroutine_threadsafe(session.close(), loop).result(timeout)
+        else:
+            loop.run_until_complete(session.close())
@@ -15,20 +15,42 @@ def main():
     parser = argparse.ArgumentParser(description="RAG Document Search System")
     parser.add_argument(
         '--mode', 
-        choices=['cli', 'web'], 
+        choices=['cli', 'web', 'reindex', 'batch', 'api', 'export-snapshot', 'load-snapshot'], 
         default='web',
-        help='Run in CLI mode or web UI mode (default: web)'
+        help='Run in CLI mode, web UI mode, re-index the data directory, answer a JSONL file of queries, '
+             'serve the HTTP API, or write / check an index snapshot (default: web)'
     )
+    parser.add_argument('--input', help='Batch mode: JSONL file of {"id": ..., "query": ...} records')
+    parser.add_argument('--output', help='Batch mode: JSONL file results are appended to')
+    parser.add_argument('--workers', type=int, help='Batch mode: concurrent queries (default: BATCH_WORKERS)')
+    parser.add_argument('--host', help='API mode: interface to bind (default: API_HOST)')
+    parser.add_argument('--port', type=int, help='API mode: port to listen on (default: API_PORT)')
+    parser.add_argument('--snapshot', help='Snapshot modes: bundle path (default: SNAPSHOT_PATH or ./snapshots/index.ragsnap)')
     
     args = parser.parse_args()
+    if args.mode == 'batch' and not (args.input and args.output):
+        parser.error("--mode batch requires --input and --output")
     
     try:
+        if args.mode == 'reindex':
+            # Indexing runs locally and does not need the Cerebras API key
+            reindex_documents()
+            return
+        if args.mode in ('export-snapshot', 'load-snapshot'):
+            snapshot_command(args.mode, args.snapshot)
+            return
+        
         # Validate configuration first
         from src.config import config
         config.validate_config()
         
         if args.mode == 'cli':
             command_line_interface()
+        elif args.mode == 'batch':
+            batch_queries(args.input, args.output, args.workers)
+        elif args.mode == 'api':
+            from src.api_server import run_api_server
+            run_api_server(args.host or config.API_HOST, args.port or config.API_PORT)
         else:
             # Import and run Streamlit UI
             from src.ui import StreamlitUI
@@ -47,6 +69,77 @@ def main():
         print(f"❌ Unexpected Error: {e}")
         sys.exit(1)
 
+def reindex_documents():
+    """Index new or changed documents and drop removed ones"""
+    print("🔄 RAG Document Search - Re-indexing")
+    print("=" * 50)
+    
+    from src.vectorstore import VectorStoreManager
+    
+    vector_store_manager = VectorStoreManager()
+    stats = vector_store_manager.sync_documents()
+    print(f"\n✅ Re-index complete: {stats['added_chunks']} chunks embedded, {stats['deleted_chunks']} chunks removed")
+
+def snapshot_command(mode: str, path: str = None):
+    """Write the index to a snapshot bundle, or open and verify one"""
+    print("📦 RAG Document Search - Index Snapshot")
+    print("=" * 50)
+    
+    import time
+    from src.config import config
+    from src.vectorstore import VectorStoreManager
+    
+    path = path or config.SNAPSHOT_PATH or config.SNAPSHOT_DEFAULT_PATH
+    vector_store_manager = VectorStoreManager()
+    start = time.perf_counter()
+    if mode == 'export-snapshot':
+        header = vector_store_manager.export_snapshot(path)
+        size = os.path.getsize(path)
+        print(f"\n✅ Snapshot written: {header['count']} chunks x {header['dim']} dims, "
+              f"{size / 2**20:.1f} MB in {time.perf_counter() - start:.1f}s")
+    else:
+        index = vector_store_manager.load_snapshot(path, verify=True)
+        print(f"\n✅ Snapshot OK: {len(index)} chunks built with {index.header['embedding_model']} "
+              f"on {index.header['created']}, checksums verified in {time.perf_counter() - start:.2f}s")
+
+def batch_queries(input_path: str, output_path: str, workers: int = None):
+    """Answer every query in a JSONL file, writing results as they complete"""
+    print("📦 RAG Document Search - Batch Mode")
+    print("=" * 50)
+    
+    from src.batch import run_batch
+    
+    stats = run_batch(input_path, output_path, workers)
+    print(f"\n✅ Batch complete: {stats['succeeded']} succeeded, {stats['failed']} failed, "
+          f"{stats['skipped']} skipped (already answered)")
+    if 'seconds' in stats:
+        print(f"⏱️  {stats['seconds']}s, {stats['queries_per_second']} queries/s", end="")
+        if 'p50_ms' in stats:
+            print(f", latency p50 {stats['p50_ms']:.0f} ms / p95 {stats['p95_ms']:.0f} ms", end="")
+        print()
+
+def print_ingest_status(status: dict):
+    """Print the background ingest queue and last publish time"""
+    if not status:
+        print("Background ingest is off (set INGEST_WATCH_ENABLED=true)")
+        return
+    state = "ingesting" if status['ingesting'] else "idle"
+    print(f"📥 Ingest queue: {status['queue_depth']} files ({state})")
+    for filename, change in status['pending_files'].items():
+        failure = status['failed_files'].get(filename)
+        if failure:
+            print(f"  • {filename} ({change}, failed {failure['attempts']}x: {failure['error']})")
+        else:
+            print(f"  • {filename} ({change})")
+    if status['last_publish']:
+        import time
+        published = time.strftime('%H:%M:%S', time.localtime(status['last_publish']))
+        print(f"📣 Last publish: {published} ({status['last_publish_age_seconds']:.0f}s ago)")
+    else:
+        print("📣 Nothing published yet")
+    if status['last_error']:
+        print(f"❌ Last error: {status['last_error']}")
+
 def command_line_interface():
     """Run the system in command line mode"""
     print("🔍 RAG Document Search - CLI Mode")
@@ -58,6 +151,8 @@ def command_line_interface():
         rag_engine = RAGEngine()
         
         print("\n✅ System ready! Type your questions below (or 'quit' to exit):")
+        if rag_engine.ingest_worker:
+            print("👀 Watching the data directory; type 'status' for background ingest progress")
         print("-" * 50)
         
         while True:
@@ -67,18 +162,30 @@ def command_line_interface():
                 print("Goodbye! 👋")
                 break
             
+            if query.lower() == 'status':
+                print_ingest_status(rag_engine.get_ingest_status())
+                continue
+            
             if not query:
                 continue
             
             print("🔄 Processing...")
-            result = rag_engine.process_query(query)
+            print("\n🤖 Answer: ", end="", flush=True)
+            result = None
+            for event in rag_engine.stream_query(query):
+                if event["type"] == "delta":
+                    print(event["content"], end="", flush=True)
+                else:
+                    result = event
+            print()
             
             if result["success"]:
-                print(f"\n🤖 Answer: {result['answer']}")
                 if result['sources']:
                     print(f"\n📚 Sources:")
                     for source in result['sources']:
                         print(f"  • {source}")
+                if result.get('cached'):
+                    print("♻️  Answered from the answer cache")
                 print("-" * 50)
             else:
                 print(f"\n❌ Error: {result['answer']}")
@@ -0,0 +1,92 @@
+import os
+import json
+import hashlib
+from typing import Dict, List, Optional, Any
+
+class IndexManifest:
+    """Persisted record of indexed files, their content hashes and chunk IDs"""
+    
+    VERSION = 1
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+        # Chunking settings the recorded chunk IDs were produced with
+        self.splitter: Optional[str] = None
+        # Near-duplicate settings the index was built with (None: no dedup)
+        self.dedup: Optional[str] = None
+    
+    @classmethod
+    def load(cls, path: str) -> "IndexManifest":
+        """Load the manifest from disk, or return an empty one if none exists"""
+        manifest = cls(path)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == cls.VERSION:
+                manifest.files = data.get('files', {})
+                manifest.splitter = data.get('splitter')
+                manifest.dedup = data.get('dedup')
+        return manifest
+    
+    def exists(self) -> bool:
+        """Check whether the manifest has been persisted before"""
+        return os.path.exists(self.path)
+    
+    def save(self):
+        """Atomically write the manifest to disk"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.VERSION, 'splitter': self.splitter, 'dedup': self.dedup,
+                       'files': self.files}, f)
+        os.replace(tmp_path, self.path)
+    
+    def get_file(self, filename: str) -> Optional[Dict[str, Any]]:
+        """Get the manifest entry for a file"""
+        return self.files.get(filename)
+    
+    def set_file(self, filename: str, content_hash: str, chunk_ids: List[str],
+                 size: Optional[int] = None, mtime_ns: Optional[int] = None):
+        """Record the content hash, chunk IDs and (optionally) size and mtime of an indexed file"""
+        self.files[filename] = {
+            'hash': content_hash,
+            'chunk_ids': list(chunk_ids),
+            'size': size,
+            'mtime_ns': mtime_ns
+        }
+    
+    def stat_matches(self, filename: str, size: int, mtime_ns: int) -> bool:
+        """Whether a file still has the size and modification time it was indexed with"""
+        entry = self.files.get(filename)
+        return bool(entry) and entry.get('size') == size and entry.get('mtime_ns') == mtime_ns
+    
+    def remove_file(self, filename: str) -> List[str]:
+        """Forget a file and return the chunk IDs it owned"""
+        entry = self.files.pop(filename, None)
+        return entry['chunk_ids'] if entry else []
+    
+    @staticmethod
+    def digest(path: str) -> str:
+        """SHA-1 of a persisted manifest, or "none" if there is none"""
+        try:
+            with open(path, "rb") as f:
+                return hashlib.sha1(f.read()).hexdigest()
+        except OSError:
+            return "none"
+    
+    @staticmethod
+    def hash_file(file_path: str, block_size: int = 1 << 20) -> str:
+        """Compute the SHA-256 content hash of a file"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+def make_chunk_id(source: str, page: Any, content: str, occurrence: int = 0) -> str:
+    """Build a stable chunk ID from its source, page and text"""
+    key = f"{source}\x00{page}\x00{occurrence}\x00{content}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
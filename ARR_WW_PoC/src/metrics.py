@@ -0,0 +1,135 @@
+import json
+import time
+import threading
+from collections import deque
+from typing import Dict, Any, Optional
+
+from .config import config
+
+class Histogram:
+    """Latency samples over a sliding window, plus lifetime count and sum"""
+    
+    def __init__(self, max_samples: int):
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.total = 0.0
+    
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+    
+    def percentile(self, p: float) -> float:
+        """Nearest-rank percentile of the windowed samples, in seconds"""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        rank = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))
+        return ordered[rank]
+
+class _Span:
+    """Times one stage and records it on exit"""
+    
+    __slots__ = ("metrics", "name", "timings", "start")
+    
+    def __init__(self, metrics: "Metrics", name: str, timings: Optional[Dict[str, float]]):
+        self.metrics = metrics
+        self.name = name
+        self.timings = timings
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        self.metrics.observe(self.name, elapsed)
+        if self.timings is not None:
+            self.timings[self.name] = round(elapsed * 1000, 3)
+        return False
+
+class _NullSpan:
+    """Shared no-op span used when metrics are disabled"""
+    
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class Metrics:
+    """Per-stage latency spans aggregated into p50/p95/p99 histograms"""
+    
+    QUANTILES = (50, 95, 99)
+    
+    def __init__(self, enabled: bool = True, max_samples: int = 2048):
+        self.enabled = enabled
+        self.max_samples = max_samples
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+    
+    def span(self, name: str, timings: Optional[Dict[str, float]] = None):
+        """Time a stage; its duration in ms is also written to timings[name]"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, timings)
+    
+    def observe(self, name: str, seconds: float):
+        """Record a duration measured elsewhere (e.g. in a worker process)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self.max_samples)
+            histogram.observe(seconds)
+    
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Get count, mean and percentiles (ms) for every stage"""
+        with self._lock:
+            result = {}
+            for name, histogram in sorted(self._histograms.items()):
+                stats = {
+                    "count": histogram.count,
+                    "mean_ms": round(histogram.total / histogram.count * 1000, 3) if histogram.count else 0.0
+                }
+                for q in self.QUANTILES:
+                    stats[f"p{q}_ms"] = round(histogram.percentile(q) * 1000, 3)
+                result[name] = stats
+            return result
+    
+    def to_prometheus(self) -> str:
+        """Render all stages in the Prometheus text exposition format"""
+        lines = [
+            "# HELP rag_stage_duration_seconds Duration of RAG pipeline stages",
+            "# TYPE rag_stage_duration_seconds summary"
+        ]
+        with self._lock:
+            for name, histogram in sorted(self._histograms.items()):
+                for q in self.QUANTILES:
+                    lines.append(
+                        f'rag_stage_duration_seconds{{stage="{name}",quantile="{q / 100}"}} '
+                        f'{histogram.percentile(q):.6f}'
+                    )
+                lines.append(f'rag_stage_duration_seconds_sum{{stage="{name}"}} {histogram.total:.6f}')
+                lines.append(f'rag_stage_duration_seconds_count{{stage="{name}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+    
+    def to_json_lines(self) -> str:
+        """Render one JSON object per stage"""
+        timestamp = time.time()
+        return "".join(
+            json.dumps({"stage": name, "timestamp": timestamp, **stats}) + "\n"
+            for name, stats in self.summary().items()
+        )
+    
+    def reset(self):
+        """Drop all recorded samples"""
+        with self._lock:
+            self._histograms.clear()
+
+metrics = Metrics(config.METRICS_ENABLED, config.METRICS_MAX_SAMPLES)
@@ -0,0 +1,40 @@
+from typing import List
+
+import numpy as np
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def maximal_marginal_relevance(query_embedding, candidate_embeddings, k: int = 5,
+                               lambda_mult: float = 0.5) -> List[int]:
+    """Pick k candidates balancing relevance to the query against redundancy
+    
+    Each step takes the candidate maximizing
+    lambda_mult * sim(query, c) - (1 - lambda_mult) * max sim(c, selected),
+    with cosine similarities. The similarity of every candidate to the
+    selected set is kept as a running maximum, so a step is one
+    matrix-vector product instead of a pairwise matrix. Returns candidate
+    positions in selection order.
+    """
+    candidates = _normalize(np.asarray(candidate_embeddings, dtype=np.float32))
+    if candidates.ndim != 2 or not len(candidates) or k <= 0:
+        return []
+    query = _normalize(np.asarray(query_embedding, dtype=np.float32).reshape(-1))
+    
+    relevance = candidates @ query
+    redundancy = np.full(len(candidates), -np.inf, dtype=np.float32)
+    available = np.ones(len(candidates), dtype=bool)
+    selected = []
+    for _ in range(min(k, len(candidates))):
+        if selected:
+            scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        else:
+            scores = relevance.copy()
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, candidates @ candidates[best], out=redundancy)
+    return selected
@@ -0,0 +1,283 @@
+import os
+import json
+import shutil
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+QUANTIZATION_MODES = ("none", "int8")
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 scalar quantization; returns (codes, scales)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Column indices of the k highest scores in each row, best first"""
+    if scores.shape[1] > k:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1)
+
+# Bumped when the directory layout changes; older exports are rebuilt
+NUMPY_INDEX_FORMAT_VERSION = 2
+
+def _bytes_file(path: str) -> np.ndarray:
+    """Memory-map a raw byte file read-only (mmap cannot map an empty file)"""
+    return np.memmap(path, dtype=np.uint8, mode="r") if os.path.getsize(path) else np.zeros(0, dtype=np.uint8)
+
+class NumpyIndexWriter:
+    """Streams chunks into a new index directory, then publishes it in one step"""
+    
+    def __init__(self, path: str, count: int, dim: int, quantization: str = "none"):
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode: {quantization}")
+        self.path = path
+        self.count = count
+        self.dim = dim
+        self.quantization = quantization
+        self.tmp_path = f"{path}.tmp"
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+        
+        self.vectors = self._memmap("vectors.f16", np.float16, (count, dim))
+        self.norms = self._memmap("norms.f32", np.float32, (count,))
+        self.codes = self._memmap("vectors.i8", np.int8, (count, dim)) if quantization == "int8" else None
+        self.scales = self._memmap("scales.f32", np.float32, (count,)) if quantization == "int8" else None
+        self.code_norms = self._memmap("code_norms.f32", np.float32, (count,)) if quantization == "int8" else None
+        self.texts = open(os.path.join(self.tmp_path, "texts.bin"), "wb")
+        self.offsets = [0]
+        self.metadata = open(os.path.join(self.tmp_path, "metadata.bin"), "wb")
+        self.metadata_offsets = [0]
+        self.ids: List[str] = []
+    
+    def _memmap(self, name: str, dtype, shape) -> np.ndarray:
+        return np.lib.format.open_memmap(
+            os.path.join(self.tmp_path, name + ".npy"), mode="w+", dtype=dtype, shape=shape
+        )
+    
+    def add(self, ids: Sequence[str], embeddings, documents: Sequence[str], metadatas: Sequence[Optional[Dict]]):
+        """Append a batch of chunks"""
+        start = len(self.ids)
+        end = start + len(ids)
+        if end > self.count:
+            raise ValueError("More chunks than the index was sized for")
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        stored = vectors.astype(np.float16)
+        self.vectors[start:end] = stored
+        # Norms of the stored (rounded) vectors keep L2 ranking exact for them
+        self.norms[start:end] = np.einsum("ij,ij->i", stored, stored, dtype=np.float32)
+        if self.codes is not None:
+            codes, scales = quantize_int8(vectors)
+            self.codes[start:end], self.scales[start:end] = codes, scales
+            # Squared norms of the dequantized vectors, for the int8 scan
+            self.code_norms[start:end] = np.square(scales) * np.einsum("ij,ij->i", codes, codes, dtype=np.float32)
+        for text in documents:
+            encoded = (text or "").encode("utf-8")
+            self.texts.write(encoded)
+            self.offsets.append(self.offsets[-1] + len(encoded))
+        for metadata in metadatas:
+            encoded = json.dumps(metadata or {}, separators=(",", ":")).encode("utf-8")
+            self.metadata.write(encoded)
+            self.metadata_offsets.append(self.metadata_offsets[-1] + len(encoded))
+        self.ids.extend(ids)
+    
+    def commit(self):
+        """Flush everything and atomically replace the index directory"""
+        if len(self.ids) != self.count:
+            raise ValueError(f"Expected {self.count} chunks, got {len(self.ids)}")
+        self.texts.close()
+        self.metadata.close()
+        for array in (self.vectors, self.norms, self.codes, self.scales, self.code_norms):
+            if array is not None:
+                array.flush()
+        ids = np.asarray([chunk_id.encode("utf-8") for chunk_id in self.ids], dtype=bytes)
+        if not len(ids):
+            ids = np.zeros(0, dtype="S1")
+        # Sorted IDs with their rows let readers find chunks by binary search
+        order = np.argsort(ids, kind="stable").astype(np.int64)
+        arrays = {
+            "offsets": np.asarray(self.offsets, dtype=np.int64),
+            "ids": ids,
+            "sorted_ids": ids[order],
+            "sorted_rows": order,
+            "metadata_offsets": np.asarray(self.metadata_offsets, dtype=np.int64)
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(self.tmp_path, name + ".npy"), array)
+        with open(os.path.join(self.tmp_path, "index.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "format_version": NUMPY_INDEX_FORMAT_VERSION,
+                "count": self.count,
+                "dim": self.dim,
+                "quantization": self.quantization
+            }, f)
+        
+        old_path = f"{self.path}.old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(self.path):
+            os.rename(self.path, old_path)
+        os.rename(self.tmp_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+    
+    def abort(self):
+        """Discard the partially written index"""
+        self.texts.close()
+        self.metadata.close()
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+class NumpyVectorIndex:
+    """Read-only exact vector index over memory-mapped float16 embeddings
+
+    Embeddings are one contiguous (n, dim) float16 matrix opened read-only with
+    mmap, so every worker process shares the same page-cache copy. So are
+    chunk IDs (found by binary search over a sorted copy), texts and JSON
+    metadata, which are decoded only when a chunk is returned. Search is a
+    blocked, batched matrix product followed by argpartition top-k, ranked by
+    L2 distance like Chroma's default space. With int8 quantization the int8
+    matrix is scanned instead and the best candidates are rescored against the
+    float16 rows.
+    """
+    
+    BLOCK_ROWS = 4096  # rows converted to float32 at a time; keeps the block in cache
+    
+    def __init__(self, path: str, rescore_multiplier: int = 4):
+        self.path = path
+        self.rescore_multiplier = rescore_multiplier
+        with open(os.path.join(path, "index.json"), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.dim = data["dim"]
+        self.quantization = data["quantization"]
+        self.count = data["count"]
+        
+        self.vectors = self._open("vectors.f16")
+        self.norms = self._open("norms.f32")
+        self.codes = self._open("vectors.i8") if self.quantization == "int8" else None
+        self.scales = self._open("scales.f32") if self.quantization == "int8" else None
+        self.code_norms = self._open("code_norms.f32") if self.quantization == "int8" else None
+        self.offsets = self._open("offsets")
+        self.texts = _bytes_file(os.path.join(path, "texts.bin"))
+        self.ids = self._open("ids")
+        self.sorted_ids = self._open("sorted_ids")
+        self.sorted_rows = self._open("sorted_rows")
+        self.metadata_offsets = self._open("metadata_offsets")
+        self.metadata = _bytes_file(os.path.join(path, "metadata.bin"))
+    
+    def _open(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, name + ".npy"), mmap_mode="r")
+    
+    @staticmethod
+    def exists(path: str) -> bool:
+        """Check whether an index in the current format has been written at path"""
+        try:
+            with open(os.path.join(path, "index.json"), "r", encoding="utf-8") as f:
+                return json.load(f).get("format_version") == NUMPY_INDEX_FORMAT_VERSION
+        except (OSError, ValueError):
+            return False
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def _chunk_id(self, row: int) -> str:
+        return self.ids[row].decode("utf-8")
+    
+    def _row(self, chunk_id: str) -> Optional[int]:
+        key = chunk_id.encode("utf-8")
+        if not self.count or len(key) > self.sorted_ids.dtype.itemsize:
+            return None
+        position = int(np.searchsorted(self.sorted_ids, key))
+        if position < self.count and self.sorted_ids[position] == key:
+            return int(self.sorted_rows[position])
+        return None
+    
+    def _metadata(self, row: int) -> Dict[str, Any]:
+        return json.loads(bytes(self.metadata[self.metadata_offsets[row]:self.metadata_offsets[row + 1]]))
+    
+    def _scan(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k rows per query over the full matrix; returns (rows, scores)"""
+        quantized = self.codes is not None
+        matrix = self.codes if quantized else self.vectors
+        norms = self.code_norms if quantized else self.norms
+        buffer = np.empty((min(self.BLOCK_ROWS, self.count), self.dim), dtype=np.float32)
+        best_rows, best_scores = [], []
+        for start in range(0, self.count, self.BLOCK_ROWS):
+            rows = matrix[start:start + self.BLOCK_ROWS]
+            block = buffer[:len(rows)]
+            np.copyto(block, rows)
+            # Rank by -||q - x||^2 = 2 q.x - ||x||^2 - ||q||^2 (constant per query)
+            scores = queries @ block.T
+            scores *= 2 * self.scales[start:start + len(rows)] if quantized else 2
+            scores -= norms[start:start + len(rows)]
+            top = _top_k(scores, k)
+            best_rows.append(top + start)
+            best_scores.append(np.take_along_axis(scores, top, axis=1))
+        rows = np.concatenate(best_rows, axis=1)
+        scores = np.concatenate(best_scores, axis=1)
+        top = _top_k(scores, k)
+        return np.take_along_axis(rows, top, axis=1), np.take_along_axis(scores, top, axis=1)
+    
+    def _rescore(self, queries: np.ndarray, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Re-rank int8 candidates with the float16 vectors"""
+        result_rows, result_scores = [], []
+        for query, candidates in zip(queries, rows):
+            order = np.sort(candidates)  # sorted reads are kinder to the page cache
+            vectors = np.asarray(self.vectors[order], dtype=np.float32)
+            scores = 2 * (vectors @ query) - self.norms[order]
+            top = _top_k(scores[None, :], k)[0]
+            result_rows.append(order[top])
+            result_scores.append(scores[top])
+        return np.stack(result_rows), np.stack(result_scores)
+    
+    def search_batch(self, queries, k: int = 5) -> List[List[Tuple[str, float]]]:
+        """Return the k nearest chunk IDs and L2 distances for each query"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if not self.count:
+            return [[] for _ in queries]
+        k = min(k, self.count)
+        if self.codes is not None:
+            rows, _ = self._scan(queries, min(self.count, k * self.rescore_multiplier))
+            rows, scores = self._rescore(queries, rows, k)
+        else:
+            rows, scores = self._scan(queries, k)
+        query_norms = np.einsum("ij,ij->i", queries, queries)
+        return [
+            [(self._chunk_id(row), float(query_norm - score)) for row, score in zip(query_rows, query_scores)]
+            for query_rows, query_scores, query_norm in zip(rows, scores, query_norms)
+        ]
+    
+    def search(self, query, k: int = 5) -> List[Tuple[str, float]]:
+        """Return the k nearest chunk IDs and L2 distances for one query"""
+        return self.search_batch([query], k)[0]
+    
+    def get_text(self, row: int) -> str:
+        return bytes(self.texts[self.offsets[row]:self.offsets[row + 1]]).decode("utf-8")
+    
+    def get(self, ids: Sequence[str]) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        """Look up the text and metadata of chunks by ID"""
+        found = {}
+        for chunk_id in ids:
+            row = self._row(chunk_id)
+            if row is not None:
+                found[chunk_id] = (self.get_text(row), self._metadata(row))
+        return found
+    
+    def get_vectors(self, ids: Sequence[str]) -> np.ndarray:
+        """Stored float16 embeddings of chunks by ID, as float32 rows in the order given"""
+        rows = []
+        for chunk_id in ids:
+            row = self._row(chunk_id)
+            if row is None:
+                raise KeyError(chunk_id)
+            rows.append(row)
+        return np.asarray(self.vectors[rows], dtype=np.float32).reshape(len(rows), self.dim)
+    
+    def iter_texts(self, batch_size: int = 500) -> Iterator[Tuple[List[str], List[str]]]:
+        """Yield (ids, texts) batches of every stored chunk"""
+        for start in range(0, self.count, batch_size):
+            rows = range(start, min(start + batch_size, self.count))
+            yield [self._chunk_id(row) for row in rows], [self.get_text(row) for row in rows]
@@ -0,0 +1,134 @@
+import sys
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+def normalize_query(query: str) -> str:
+    """Normalize a query so trivially different spellings share a cache entry"""
+    return " ".join(query.lower().split())
+
+def embedding_key(embedding: List[float]) -> str:
+    """Hash a query embedding into a compact cache key"""
+    return hashlib.sha1(np.asarray(embedding, dtype=np.float32).tobytes()).hexdigest()
+
+class LRUTTLCache:
+    """Thread-safe LRU cache with per-entry TTL and a byte budget"""
+    
+    def __init__(self, max_bytes: int, ttl_seconds: float, sizeof: Callable[[Any], int] = sys.getsizeof):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.sizeof = sizeof
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a value, or None if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, key: Hashable, value: Any):
+        """Store a value, evicting least recently used entries over budget"""
+        size = self.sizeof(value) + sys.getsizeof(key)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+    
+    def _remove(self, key: Hashable):
+        """Drop an entry; caller holds the lock"""
+        _, _, size = self._entries.pop(key)
+        self.current_bytes -= size
+    
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get hit rate, entry count and memory use"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes
+        }
+
+class QueryCache:
+    """Caches query embeddings and retrieved chunk IDs for repeated questions
+    
+    Retrieved IDs are keyed by the vector store version they were searched
+    at and are dropped as soon as the store reports a different version, so
+    a search that raced an index update never serves stale results; query
+    embeddings only depend on the model and survive store changes.
+    """
+    
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        # Split the budget between the two caches
+        self.embeddings = LRUTTLCache(
+            max_bytes // 2, ttl_seconds,
+            sizeof=lambda vector: vector.nbytes
+        )
+        self.results = LRUTTLCache(
+            max_bytes // 2, ttl_seconds,
+            sizeof=lambda ids: sys.getsizeof(ids) + sum(sys.getsizeof(i) for i in ids)
+        )
+        self.index_version = None
+        self._lock = threading.Lock()
+    
+    def check_version(self, index_version: Any):
+        """Invalidate cached results if the vector store has changed"""
+        with self._lock:
+            if index_version != self.index_version:
+                self.results.clear()
+                self.index_version = index_version
+    
+    def get_embedding(self, query: str) -> Optional[List[float]]:
+        """Get the cached embedding of a query"""
+        vector = self.embeddings.get(normalize_query(query))
+        return vector.tolist() if vector is not None else None
+    
+    def put_embedding(self, query: str, embedding: List[float]):
+        """Cache the embedding of a query"""
+        self.embeddings.put(normalize_query(query), np.asarray(embedding, dtype=np.float32))
+    
+    def get_results(self, embedding: List[float], k: int, index_version: Any) -> Optional[Tuple[str, ...]]:
+        """Get the chunk IDs previously retrieved for an embedding at this index version"""
+        return self.results.get((embedding_key(embedding), k, index_version))
+    
+    def put_results(self, embedding: List[float], k: int, chunk_ids: List[str], index_version: Any):
+        """Cache the chunk IDs retrieved for an embedding at the index version read before searching
+        
+        Dropped if the index has moved on since, as the search may have seen
+        either version.
+        """
+        with self._lock:
+            if index_version == self.index_version:
+                self.results.put((embedding_key(embedding), k, index_version), tuple(chunk_ids))
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get hit rates of both caches"""
+        return {"embeddings": self.embeddings.stats(), "results": self.results.stats()}
@@ -1,17 +1,58 @@
-from typing import Dict, Any, List
+import time
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Iterator, Optional, Tuple
 import requests
-import json
-from langchain.schema import Document
+from langchain_core.documents import Document
 
 from .config import config
 from .vectorstore import VectorStoreManager
+from .query_cache import QueryCache
+from .answer_cache import AnswerCache
+from .llm_client import LLMClient, AsyncLLMClient, LLMClientError
+from .metrics import metrics
+from .context_packer import ContextPacker
+from .ingest_worker import IngestWorker
+from .dedup import parse_citations
+from .resources import get_embedding_runtime
+
+NO_DOCUMENTS_ANSWER = "I couldn't find any relevant information in the documents to answer your question."
 
 class RAGEngine:
     """Standard RAG engine using direct Cerebras API"""
     
     def __init__(self):
         self.vector_store_manager = VectorStoreManager()
-        self.conversation_history = []
+        # Recent turns across all callers, for debugging; per-user history
+        # lives in sessions.SessionManager
+        self.conversation_history = deque(maxlen=config.SESSION_MAX_TURNS)
+        self.llm_client = LLMClient()
+        # One concurrency cap and rate limit for sync and async traffic
+        self.async_llm_client = AsyncLLMClient(budget=self.llm_client.budget)
+        self.context_packer = ContextPacker() if config.CONTEXT_PACKING_ENABLED else None
+        # Runs blocking retrieval (embedding + vector search) for the async API
+        self._retrieval_executor = ThreadPoolExecutor(
+            max_workers=config.ASYNC_RETRIEVAL_WORKERS,
+            thread_name_prefix="rag-retrieval"
+        )
+        self.query_cache = None
+        if config.QUERY_CACHE_ENABLED:
+            self.query_cache = QueryCache(config.QUERY_CACHE_MAX_BYTES, config.QUERY_CACHE_TTL_SECONDS)
+        self.answer_cache = None
+        if config.ANSWER_CACHE_ENABLED:
+            try:
+                self.answer_cache = AnswerCache(
+                    config.ANSWER_CACHE_PATH,
+                    similarity=config.ANSWER_CACHE_SIMILARITY,
+                    ttl_seconds=config.ANSWER_CACHE_TTL_SECONDS,
+                    max_entries=config.ANSWER_CACHE_MAX_ENTRIES
+                )
+            except Exception as e:
+                print(f"⚠️  Answer cache unavailable: {e}")
+        
+        # Background ingestion, started once the index is opened
+        self.ingest_worker = None
         
         # Initialize vector store
         self._initialize_vector_store()
@@ -20,117 +61,275 @@ class RAGEngine:
         """Initialize or load the vector store"""
         import os
         try:
+            if config.SNAPSHOT_PATH and os.path.exists(config.SNAPSHOT_PATH):
+                # Replicas serve a prebuilt snapshot read-only
+                self.vector_store_manager.load_snapshot(config.SNAPSHOT_PATH)
+                return
             if os.path.exists(config.CHROMA_PERSIST_DIR):
                 self.vector_store_manager.load_existing_vector_store()
                 print("✅ Loaded existing vector store")
+                if config.SYNC_ON_STARTUP and not config.INGEST_WATCH_ENABLED:
+                    self.reindex()
+            elif config.INGEST_WATCH_ENABLED:
+                print("📁 No vector store yet, indexing documents in the background...")
             else:
                 print("📁 Creating new vector store from documents...")
-                documents = self.vector_store_manager.load_documents()
-                if documents:
-                    self.vector_store_manager.create_vector_store(documents)
-                    print(f"✅ Vector store created with {len(documents)} documents")
+                stats = self.reindex()
+                if stats["added_files"]:
+                    print(f"✅ Vector store created with {stats['added_files']} documents")
                 else:
                     print("⚠️  No documents found in data directory")
         except Exception as e:
             print(f"❌ Error initializing vector store: {e}")
+        
+        if config.INGEST_WATCH_ENABLED:
+            # Picks up anything added while the process was down, then watches
+            self.ingest_worker = IngestWorker(self.vector_store_manager)
+            self.ingest_worker.start()
+    
+    def reindex(self) -> Dict[str, Any]:
+        """Index new or changed documents and drop removed ones"""
+        return self.vector_store_manager.sync_documents()
     
     def _call_cerebras_api(self, messages: List[Dict]) -> str:
-        """Make direct API call to Cerebras"""
+        """Make API call to Cerebras through the pooled LLM client"""
         try:
-            url = f"{config.CEREBRAS_API_BASE}/chat/completions"
-            
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {config.CEREBRAS_API_KEY}"
-            }
-            
-            data = {
-                "model": config.MODEL_NAME,
-                "messages": messages,
-                "temperature": config.TEMPERATURE,
-                "max_tokens": 2000,
-                "stream": False
-            }
-            
-            response = requests.post(url, headers=headers, json=data, timeout=60)
-            response.raise_for_status()
-            
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
-            
+            return self.llm_client.chat(messages)
         except requests.exceptions.RequestException as e:
             raise Exception(f"Cerebras API error: {str(e)}")
-        except KeyError as e:
+        except LLMClientError as e:
             raise Exception(f"Unexpected response format from Cerebras API: {str(e)}")
         except Exception as e:
             raise Exception(f"Error calling Cerebras API: {str(e)}")
     
-    def _retrieve_documents(self, query: str, k: int = 5) -> List[Dict]:
+    async def _acall_cerebras_api(self, messages: List[Dict]) -> str:
+        """Make an async API call to Cerebras"""
+        import aiohttp
+        try:
+            return await self.async_llm_client.chat(messages)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise Exception(f"Cerebras API error: {str(e)}")
+        except LLMClientError as e:
+            raise Exception(f"Unexpected response format from Cerebras API: {str(e)}")
+        except Exception as e:
+            raise Exception(f"Error calling Cerebras API: {str(e)}")
+    
+    def _stream_cerebras_api(self, messages: List[Dict]) -> Iterator[str]:
+        """Make a streaming API call to Cerebras, yielding answer deltas"""
+        try:
+            yield from self.llm_client.stream_chat(messages)
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Cerebras API error: {str(e)}")
+        except LLMClientError as e:
+            raise Exception(f"Unexpected response format from Cerebras API: {str(e)}")
+    
+    def _embed_query(self, query: str, timings: Optional[Dict[str, float]] = None) -> List[float]:
+        """Embed a query, reusing a cached embedding"""
+        with metrics.span("query_embedding", timings):
+            embedding = self.query_cache.get_embedding(query) if self.query_cache else None
+            if embedding is None:
+                embedding = self.vector_store_manager.embed_query(query)
+                if self.query_cache:
+                    self.query_cache.put_embedding(query, embedding)
+            return embedding
+    
+    def _search_documents(self, query: str, k: int, timings: Optional[Dict[str, float]] = None,
+                          embedding: Optional[List[float]] = None) -> List[Document]:
+        """Search the index (dense or hybrid), reusing cached query embeddings and results"""
+        manager = self.vector_store_manager
+        # Read once, before searching: results are cached under this version
+        # and dropped if the index has changed by the time they are stored
+        index_version = manager.index_version
+        if self.query_cache:
+            self.query_cache.check_version(index_version)
+        
+        if embedding is None:
+            embedding = self._embed_query(query, timings)
+        
+        with metrics.span("vector_search", timings):
+            chunk_ids = self.query_cache.get_results(embedding, k, index_version) if self.query_cache else None
+            if chunk_ids is not None:
+                return manager.get_documents_by_ids(chunk_ids)
+        
+            if config.RETRIEVAL_MODE == "hybrid":
+                hits = manager.hybrid_search_with_ids(query, embedding, k)
+            elif config.RETRIEVAL_MODE == "mmr":
+                hits = manager.mmr_search_with_ids(embedding, k, max(config.MMR_FETCH_K, k), config.MMR_LAMBDA)
+            else:
+                hits = manager.search_by_vector_with_ids(embedding, k)
+            if self.query_cache:
+                self.query_cache.put_results(embedding, k, [chunk_id for chunk_id, _ in hits], index_version)
+            return [doc for _, doc in hits]
+    
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed many queries in one batched model call, reusing cached embeddings"""
+        embeddings = [self.query_cache.get_embedding(query) if self.query_cache else None for query in queries]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            with metrics.span("query_embedding_batch"):
+                computed = self.vector_store_manager.embed_queries([queries[i] for i in missing])
+            for i, embedding in zip(missing, computed):
+                embeddings[i] = embedding
+                if self.query_cache:
+                    self.query_cache.put_embedding(queries[i], embedding)
+        return embeddings
+    
+    def get_ingest_status(self) -> Dict[str, Any]:
+        """Background ingest queue depth and last publish time, if the watcher runs"""
+        return self.ingest_worker.status() if self.ingest_worker else {}
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get query and answer cache hit rates"""
+        stats = self.query_cache.stats() if self.query_cache else {}
+        if self.answer_cache:
+            stats["answers"] = self.answer_cache.stats()
+        return stats
+    
+    def _retrieve_documents(self, query: str, k: int = 5, timings: Optional[Dict[str, float]] = None,
+                            embedding: Optional[List[float]] = None) -> List[Dict]:
         """Retrieve relevant documents for the query"""
+        if config.RETRIEVAL_MODE == "mmr":
+            # MMR drops redundant chunks, so fewer are needed for the same coverage
+            k = min(k, config.MMR_RESULT_COUNT)
         try:
-            documents = self.vector_store_manager.search_documents(query, k)
+            documents = self._search_documents(query, k, timings, embedding)
             results = []
             for i, doc in enumerate(documents):
                 results.append({
                     'content': doc.page_content,
                     'source': doc.metadata.get('source', 'Unknown'),
                     'page': doc.metadata.get('page', 'N/A'),
-                    'index': i + 1
+                    'index': i + 1,
+                    'chunk_id': doc.metadata.get('chunk_id'),
+                    # Every document the chunk appears in, if near-duplicates were collapsed
+                    'citations': parse_citations(doc.metadata)
                 })
             return results
         except Exception as e:
             print(f"Error retrieving documents: {e}")
             return []
     
-    def _generate_answer(self, query: str, documents: List[Dict]) -> Dict[str, Any]:
+    def _answer_cache_generation(self) -> str:
+        """Models and index content that cached answers were generated from"""
+        return (f"{config.MODEL_NAME}|{config.EMBEDDING_MODEL}@{get_embedding_runtime()}|"
+                f"{self.vector_store_manager.index_fingerprint()}")
+    
+    def _retrieve_and_lookup(self, query: str, timings: Dict[str, float], embedding: Optional[List[float]] = None,
+                             history: Optional[List[Dict[str, str]]] = None
+                             ) -> Tuple[List[Dict], Optional[List[float]], Optional[Dict[str, Any]]]:
+        """Retrieve documents and look up a cached answer for them
+        
+        Returns (documents, query embedding, cached answer or None). The
+        embedding is None when the answer cache does not apply: it is disabled,
+        the query carries conversation history (the answer depends on it) or
+        the retrieved chunks have no stable IDs.
+        """
+        if self.answer_cache is None or history:
+            return self._retrieve_documents(query, timings=timings, embedding=embedding), None, None
+        if embedding is None:
+            try:
+                embedding = self._embed_query(query, timings)
+            except Exception as e:
+                print(f"Error retrieving documents: {e}")
+                return [], None, None
+        documents = self._retrieve_documents(query, timings=timings, embedding=embedding)
+        chunk_ids = [doc['chunk_id'] for doc in documents]
+        if not documents or None in chunk_ids:
+            return documents, None, None
+        with metrics.span("answer_cache", timings):
+            self.answer_cache.check_generation(self._answer_cache_generation())
+            cached = self.answer_cache.get(embedding, chunk_ids)
+        return documents, embedding, cached
+    
+    def _store_answer(self, query: str, embedding: Optional[List[float]], documents: List[Dict],
+                      answer: str, sources: List[str]):
+        """Cache a generated answer; failed generations (no sources) are not stored"""
+        if embedding is None or not sources:
+            return
+        try:
+            self.answer_cache.put(query, embedding, [doc['chunk_id'] for doc in documents], answer, sources)
+        except Exception as e:
+            print(f"⚠️  Could not cache answer: {e}")
+    
+    @staticmethod
+    def _format_source(doc: Dict) -> str:
+        """Source list entry, naming the other documents a deduplicated chunk also appears in"""
+        line = f"[{doc['index']}] {doc['source']} (Page: {doc['page']})"
+        others = [f"{citation['source']} (Page: {citation.get('page', 'N/A')})"
+                  for citation in doc.get('citations') or []
+                  if (citation['source'], citation.get('page', 'N/A')) != (doc['source'], doc['page'])]
+        return f"{line}; also in {', '.join(others)}" if others else line
+    
+    def _build_messages(self, query: str, documents: List[Dict],
+                        history: Optional[List[Dict[str, str]]] = None) -> Tuple[List[Dict], List[str]]:
+        """Build the chat messages and source list for the retrieved documents
+        
+        history holds earlier turns of the conversation as chat messages; they
+        are placed between the system prompt and the question.
+        """
+        # Merge overlapping chunks, drop duplicates and fit the token budget;
+        # packed blocks are renumbered so citations match the source list
+        if self.context_packer:
+            documents = self.context_packer.pack(documents)
+        
+        # Prepare context from documents
+        context_parts = []
+        sources_info = []
+        
+        for doc in documents:
+            context_parts.append(f"Source [{doc['index']}]: {doc['content']}")
+            sources_info.append(self._format_source(doc))
+        
+        context = "\n\n".join(context_parts)
+        
+        # Prepare messages for Cerebras API
+        messages = [
+            {
+                "role": "system",
+                "content": """You are a helpful assistant that provides accurate answers based on the provided context.
+                Always base your answers strictly on the provided documents.
+                Cite your sources using the source numbers like [1], [2], etc. when referencing specific information.
+                If the context doesn't contain enough information to answer the question, say so clearly.
+                
+                Important guidelines:
+                - Be concise and factual
+                - Only use information from the provided sources
+                - Always cite your sources
+                - If you're unsure, say you don't know based on the available information"""
+            },
+            {
+                "role": "user",
+                "content": f"""Question: {query}
+
+                Relevant Context:
+                {context}
+
+                Please provide a comprehensive answer based on the context above. Include citations for all factual information.
+
+                Answer:"""
+            }
+        ]
+        if history:
+            messages[1:1] = history
+        
+        return messages, sources_info
+    
+    def _generate_answer(self, query: str, documents: List[Dict], timings: Optional[Dict[str, float]] = None,
+                         history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
         """Generate answer based on retrieved documents using Cerebras API"""
         try:
             if not documents:
                 return {
-                    "answer": "I couldn't find any relevant information in the documents to answer your question.",
+                    "answer": NO_DOCUMENTS_ANSWER,
                     "sources": []
                 }
             
-            # Prepare context from documents
-            context_parts = []
-            sources_info = []
-            
-            for doc in documents:
-                context_parts.append(f"Source [{doc['index']}]: {doc['content']}")
-                sources_info.append(f"[{doc['index']}] {doc['source']} (Page: {doc['page']})")
-            
-            context = "\n\n".join(context_parts)
-            
-            # Prepare messages for Cerebras API
-            messages = [
-                {
-                    "role": "system",
-                    "content": """You are a helpful assistant that provides accurate answers based on the provided context.
-                    Always base your answers strictly on the provided documents.
-                    Cite your sources using the source numbers like [1], [2], etc. when referencing specific information.
-                    If the context doesn't contain enough information to answer the question, say so clearly.
-                    
-                    Important guidelines:
-                    - Be concise and factual
-                    - Only use information from the provided sources
-                    - Always cite your sources
-                    - If you're unsure, say you don't know based on the available information"""
-                },
-                {
-                    "role": "user",
-                    "content": f"""Question: {query}
-
-                    Relevant Context:
-                    {context}
-
-                    Please provide a comprehensive answer based on the context above. Include citations for all factual information.
-
-                    Answer:"""
-                }
-            ]
+            with metrics.span("prompt_assembly", timings):
+                messages, sources_info = self._build_messages(query, documents, history)
             
             # Call Cerebras API directly
-            answer = self._call_cerebras_api(messages)
+            with metrics.span("llm", timings):
+                answer = self._call_cerebras_api(messages)
             
             return {
                 "answer": answer,
@@ -140,32 +339,117 @@ class RAGEngine:
         except Exception as e:
             return {
                 "answer": f"Error generating answer: {str(e)}",
-                "sources": []
+                "sources": [],
+                "error": str(e)
             }
     
-    def process_query(self, query: str) -> Dict[str, Any]:
-        """Process a user query using standard RAG workflow"""
+    async def _agenerate_answer(self, query: str, documents: List[Dict], timings: Optional[Dict[str, float]] = None,
+                                history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """Async counterpart of _generate_answer"""
         try:
-            # Add to conversation history
-            self.conversation_history.append(f"User: {query}")
+            if not documents:
+                return {
+                    "answer": NO_DOCUMENTS_ANSWER,
+                    "sources": []
+                }
             
-            # Step 1: Retrieve relevant documents
-            documents = self._retrieve_documents(query)
+            with metrics.span("prompt_assembly", timings):
+                messages, sources_info = self._build_messages(query, documents, history)
+            with metrics.span("llm", timings):
+                answer = await self._acall_cerebras_api(messages)
             
-            # Step 2: Generate answer based on retrieved documents
-            result = self._generate_answer(query, documents)
+            return {
+                "answer": answer,
+                "sources": sources_info
+            }
+        
+        except Exception as e:
+            return {
+                "answer": f"Error generating answer: {str(e)}",
+                "sources": [],
+                "error": str(e)
+            }
+    
+    def process_query(self, query: str, embedding: Optional[List[float]] = None,
+                      history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """Process a user query using standard RAG workflow
+        
+        A precomputed query embedding (see embed_queries) skips the embedding
+        step; history (earlier turns as chat messages) is sent with the prompt.
+        """
+        timings = {}
+        try:
+            with metrics.span("total", timings):
+                # Add to conversation history
+                self.conversation_history.append(f"User: {query}")
+            
+                # Step 1: Retrieve relevant documents
+                documents, embedding, result = self._retrieve_and_lookup(query, timings, embedding, history)
+                cached = result is not None
             
-            # Add response to history
-            self.conversation_history.append(f"Assistant: {result['answer']}")
+                # Step 2: Generate answer based on retrieved documents, unless cached
+                if not cached:
+                    result = self._generate_answer(query, documents, timings, history)
+                    self._store_answer(query, embedding, documents, result['answer'], result['sources'])
+            
+                # Add response to history
+                self.conversation_history.append(f"Assistant: {result['answer']}")
             
             return {
-                "success": True,
+                # A failed generation is reported, not cached, and retried by batch runs
+                "success": 'error' not in result,
                 "answer": result['answer'],
                 "sources": result['sources'],
                 "documents_retrieved": len(documents),
-                "query": query
+                "query": query,
+                "cached": cached,
+                "timings": timings
+            }
+            
+        except Exception as e:
+            error_msg = f"Error processing query: {str(e)}"
+            self.conversation_history.append(f"Error: {error_msg}")
+            return {
+                "success": False,
+                "answer": error_msg,
+                "sources": [],
+                "documents_retrieved": 0,
+                "query": query,
+                "cached": False,
+                "timings": timings
             }
+    
+    async def aprocess_query(self, query: str, history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """Async counterpart of process_query, returning the same result shape"""
+        timings = {}
+        try:
+            with metrics.span("total", timings):
+                self.conversation_history.append(f"User: {query}")
+            
+                # Step 1: Retrieve relevant documents off the event loop
+                loop = asyncio.get_running_loop()
+                documents, embedding, result = await loop.run_in_executor(
+                    self._retrieval_executor, self._retrieve_and_lookup, query, timings, None, history
+                )
+                cached = result is not None
             
+                # Step 2: Generate answer without blocking other queries, unless cached
+                if not cached:
+                    result = await self._agenerate_answer(query, documents, timings, history)
+                    self._store_answer(query, embedding, documents, result['answer'], result['sources'])
+            
+                self.conversation_history.append(f"Assistant: {result['answer']}")
+            
+            return {
+                "success": 'error' not in result,
+                "answer": result['answer'],
+                "sources": result['sources'],
+                "documents_retrieved": len(documents),
+                "query": query,
+                "cached": cached,
+                "timings": timings
+            }
+        
         except Exception as e:
             error_msg = f"Error processing query: {str(e)}"
             self.conversation_history.append(f"Error: {error_msg}")
@@ -174,12 +458,115 @@ class RAGEngine:
                 "answer": error_msg,
                 "sources": [],
                 "documents_retrieved": 0,
-                "query": query
+                "query": query,
+                "cached": False,
+                "timings": timings
+            }
+    
+    async def aprocess_many(self, queries: List[str], concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Process many queries concurrently, returning results in input order"""
+        semaphore = asyncio.Semaphore(concurrency or config.ASYNC_QUERY_CONCURRENCY)
+        
+        async def run(query: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.aprocess_query(query)
+        
+        return await asyncio.gather(*(run(query) for query in queries))
+    
+    def stream_query(self, query: str, history: Optional[List[Dict[str, str]]] = None) -> Iterator[Dict[str, Any]]:
+        """Process a user query, streaming the answer as it is generated
+        
+        Yields {"type": "delta", "content": ...} events while the answer is
+        generated, then one {"type": "done", ...} event with the same fields
+        process_query returns.
+        """
+        self.conversation_history.append(f"User: {query}")
+        documents = []
+        answer_parts = []
+        timings = {}
+        start = time.perf_counter()
+        try:
+            # Step 1: Retrieve relevant documents
+            documents, embedding, cached = self._retrieve_and_lookup(query, timings, history=history)
+            
+            # Step 2: Stream the answer based on retrieved documents
+            if cached:
+                sources = cached['sources']
+                answer_parts.append(cached['answer'])
+                yield {"type": "delta", "content": cached['answer']}
+            elif documents:
+                with metrics.span("prompt_assembly", timings):
+                    messages, sources = self._build_messages(query, documents, history)
+                with metrics.span("llm", timings):
+                    deltas = self._stream_cerebras_api(messages)
+                    try:
+                        for delta in deltas:
+                            if not answer_parts and metrics.enabled:
+                                first_token = time.perf_counter() - start
+                                metrics.observe("time_to_first_token", first_token)
+                                timings["time_to_first_token"] = round(first_token * 1000, 3)
+                            answer_parts.append(delta)
+                            yield {"type": "delta", "content": delta}
+                    finally:
+                        # Closing this stream early releases its LLM slot
+                        deltas.close()
+            else:
+                sources = []
+                answer_parts.append(NO_DOCUMENTS_ANSWER)
+                yield {"type": "delta", "content": NO_DOCUMENTS_ANSWER}
+            
+            answer = "".join(answer_parts)
+            if not cached:
+                self._store_answer(query, embedding, documents, answer, sources)
+            self.conversation_history.append(f"Assistant: {answer}")
+            self._record_total(timings, start)
+            yield {
+                "type": "done",
+                "success": True,
+                "answer": answer,
+                "sources": sources,
+                "documents_retrieved": len(documents),
+                "query": query,
+                "cached": cached is not None,
+                "timings": timings
             }
+        
+        except Exception as e:
+            error_msg = f"Error processing query: {str(e)}"
+            self.conversation_history.append(f"Error: {error_msg}")
+            self._record_total(timings, start)
+            yield {
+                "type": "done",
+                "success": False,
+                "answer": error_msg,
+                "sources": [],
+                "documents_retrieved": len(documents),
+                "query": query,
+                "cached": False,
+                "timings": timings
+            }
+    
+    def _record_total(self, timings: Dict[str, float], start: float):
+        """Record the end-to-end time of a streamed query"""
+        if metrics.enabled:
+            total = time.perf_counter() - start
+            metrics.observe("total", total)
+            timings["total"] = round(total * 1000, 3)
+    
+    def close(self):
+        """Release HTTP connections and worker threads"""
+        if self.ingest_worker:
+            self.ingest_worker.stop()
+        self.llm_client.close()
+        self.async_llm_client.close_sync()
+        self._retrieval_executor.shutdown(wait=False)
+        self.vector_store_manager.close()
+        if self.answer_cache:
+            self.answer_cache.close()
     
     def get_conversation_history(self) -> List[str]:
         """Get the conversation history"""
-        return self.conversation_history.copy()
+        return list(self.conversation_history)
 
 # For backward compatibility
 DocumentSearchAgent = RAGEngine
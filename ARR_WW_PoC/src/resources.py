@@ -0,0 +1,88 @@
+import threading
+
+from .config import config
+
+# Process-wide shared resources. Streamlit re-executes the app script on every
+# interaction, but imported modules (and these singletons) survive reruns and
+# are shared by every session.
+_lock = threading.RLock()
+_embedding_model = None
+_embedding_runtime = None
+_embedding_cache = None
+_rag_engine = None
+_session_manager = None
+
+def get_embedding_model():
+    """Get the shared embedding model (behind the micro-batching service), loading it once"""
+    global _embedding_model, _embedding_runtime
+    with _lock:
+        if _embedding_model is None:
+            from .embedding_service import load_embedding_model
+            _embedding_model, _embedding_runtime = load_embedding_model(config.EMBEDDING_RUNTIME)
+        return _embedding_model
+
+def get_embedding_runtime() -> str:
+    """Runtime the shared embedding model runs on, loading it first
+    
+    This, not config.EMBEDDING_RUNTIME, tags cached embeddings, cached
+    answers and snapshots: a configured ONNX runtime falls back to PyTorch
+    when it cannot be loaded.
+    """
+    with _lock:
+        get_embedding_model()
+        return _embedding_runtime
+
+def set_embedding_model(model, runtime: str = "torch"):
+    """Replace the shared embedding model, e.g. with a fake one for offline benchmarks"""
+    global _embedding_model, _embedding_runtime
+    with _lock:
+        _embedding_model = model
+        _embedding_runtime = runtime
+
+def get_embedding_cache():
+    """Get the shared on-disk embedding cache, or None if disabled"""
+    global _embedding_cache
+    with _lock:
+        if _embedding_cache is None and config.EMBEDDING_CACHE_ENABLED:
+            from .embedding_cache import EmbeddingCache
+            # ONNX vectors differ slightly from PyTorch ones, so keep them apart
+            model_name = config.EMBEDDING_MODEL
+            runtime = get_embedding_runtime()
+            if runtime != "torch":
+                model_name = f"{model_name}@{runtime}"
+            _embedding_cache = EmbeddingCache(
+                config.EMBEDDING_CACHE_DIR,
+                model_name,
+                max_entries=config.EMBEDDING_CACHE_MAX_ENTRIES,
+                dtype=config.EMBEDDING_CACHE_DTYPE
+            )
+        return _embedding_cache
+
+def get_rag_engine():
+    """Get the shared RAG engine (and with it the vector store), creating it once"""
+    global _rag_engine
+    with _lock:
+        if _rag_engine is None:
+            from .rag_engine import RAGEngine
+            _rag_engine = RAGEngine()
+        return _rag_engine
+
+def get_session_manager():
+    """Get the shared chat session manager, which answers through the shared engine"""
+    global _session_manager
+    with _lock:
+        if _session_manager is None:
+            from .sessions import SessionManager
+            _session_manager = SessionManager()
+        return _session_manager
+
+def reset_rag_engine():
+    """Drop the shared engine so the next get_rag_engine() reopens the index
+    
+    The embedding model stays loaded; use this after re-indexing.
+    """
+    global _rag_engine
+    with _lock:
+        if _rag_engine is not None:
+            _rag_engine.close()
+        _rag_engine = None
@@ -0,0 +1,177 @@
+import sys
+import time
+import uuid
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterator, List, Optional
+
+from .config import config
+from .context_packer import count_tokens, truncate_to_tokens
+from .llm_client import acquire_async
+
+class Turn:
+    """One stored chat message, with its token count computed once"""
+    
+    __slots__ = ("role", "content", "tokens")
+    
+    def __init__(self, role: str, content: str, tokens: int):
+        self.role = role
+        self.content = content
+        self.tokens = tokens
+
+class ChatSession:
+    """Per-user conversation state: a ring buffer of the most recent turns"""
+    
+    __slots__ = ("session_id", "turns", "last_active", "lock")
+    
+    def __init__(self, session_id: str, max_turns: int = config.SESSION_MAX_TURNS):
+        self.session_id = session_id
+        self.turns = deque(maxlen=max_turns)
+        self.last_active = time.monotonic()
+        # Serializes queries of one session so turns stay in order
+        self.lock = threading.Lock()
+    
+    def add_turn(self, role: str, content: str, max_tokens: int = config.SESSION_MAX_TURN_TOKENS):
+        """Store a message, truncating long ones so every turn has a bounded size"""
+        content = truncate_to_tokens(content, max_tokens)
+        self.turns.append(Turn(role, content, count_tokens(content)))
+    
+    def history(self, max_tokens: int = config.SESSION_HISTORY_TOKENS) -> List[Dict[str, str]]:
+        """The most recent turns that fit in max_tokens, oldest first, as chat messages"""
+        selected = []
+        budget = max_tokens
+        for turn in reversed(self.turns):
+            if turn.tokens > budget:
+                break
+            budget -= turn.tokens
+            selected.append({"role": turn.role, "content": turn.content})
+        selected.reverse()
+        return selected
+    
+    def memory_bytes(self) -> int:
+        """Approximate memory held by this session"""
+        size = (sys.getsizeof(self) + sys.getsizeof(self.session_id) + sys.getsizeof(self.turns)
+                + sys.getsizeof(self.lock))
+        for turn in self.turns:
+            size += sys.getsizeof(turn) + sys.getsizeof(turn.content)
+        return size
+
+class SessionManager:
+    """Many chat sessions over one shared RAGEngine
+    
+    The engine (index, embedding model, HTTP clients) is shared and only read;
+    without an explicit engine the process-wide one from resources is used,
+    so a reloaded index is picked up. Each session holds just its bounded
+    turn history. Sessions idle for longer
+    than idle_seconds are evicted, as are the least recently active ones once
+    max_sessions is reached, so memory stays flat however many users come and
+    go.
+    """
+    
+    def __init__(self, rag_engine=None,
+                 max_sessions: int = config.SESSION_MAX_SESSIONS,
+                 idle_seconds: float = config.SESSION_IDLE_SECONDS):
+        self._rag_engine = rag_engine
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.evicted = 0
+        # Ordered by last activity, least recent first
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @property
+    def rag_engine(self):
+        if self._rag_engine is not None:
+            return self._rag_engine
+        from .resources import get_rag_engine
+        return get_rag_engine()
+    
+    def get_session(self, session_id: Optional[str] = None) -> ChatSession:
+        """Get a session by ID, creating it (with a new ID if none is given)"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session = ChatSession(session_id or uuid.uuid4().hex)
+                self._sessions[session.session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.evicted += 1
+            else:
+                self._sessions.move_to_end(session.session_id)
+            session.last_active = now
+            return session
+    
+    def _evict(self, now: float):
+        """Drop idle sessions; caller holds the lock"""
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_active < self.idle_seconds:
+                break
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+    
+    def evict_idle(self) -> int:
+        """Drop sessions idle for longer than idle_seconds; returns how many"""
+        with self._lock:
+            before = self.evicted
+            self._evict(time.monotonic())
+            return self.evicted - before
+    
+    def end_session(self, session_id: str):
+        """Forget a session, e.g. when the user clears the chat"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+    
+    def _record(self, session: ChatSession, query: str, result: Dict[str, Any]):
+        session.add_turn("user", query)
+        if result["success"]:
+            session.add_turn("assistant", result["answer"])
+    
+    def process_query(self, session_id: str, query: str) -> Dict[str, Any]:
+        """Answer a query in the context of a session's recent history"""
+        session = self.get_session(session_id)
+        with session.lock:
+            result = self.rag_engine.process_query(query, history=session.history())
+            self._record(session, query, result)
+        return {**result, "session_id": session.session_id}
+    
+    async def aprocess_query(self, session_id: str, query: str) -> Dict[str, Any]:
+        """Async counterpart of process_query"""
+        session = self.get_session(session_id)
+        # The same lock as the sync paths, so queries of one session stay
+        # ordered however they arrive
+        await acquire_async(session.lock)
+        try:
+            result = await self.rag_engine.aprocess_query(query, history=session.history())
+            self._record(session, query, result)
+        finally:
+            session.lock.release()
+        return {**result, "session_id": session.session_id}
+    
+    def stream_query(self, session_id: str, query: str) -> Iterator[Dict[str, Any]]:
+        """Streaming counterpart of process_query; the "done" event carries the session ID"""
+        session = self.get_session(session_id)
+        with session.lock:
+            events = self.rag_engine.stream_query(query, history=session.history())
+            try:
+                for event in events:
+                    if event["type"] == "done":
+                        self._record(session, query, event)
+                        event = {**event, "session_id": session.session_id}
+                    yield event
+            finally:
+                events.close()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Session count, evictions and memory held by session state"""
+        with self._lock:
+            sizes = [session.memory_bytes() for session in self._sessions.values()]
+        return {
+            "sessions": len(sizes),
+            "evicted": self.evicted,
+            "bytes": sum(sizes),
+            "mean_session_bytes": sum(sizes) // len(sizes) if sizes else 0,
+            "max_session_bytes": max(sizes, default=0)
+        }
@@ -0,0 +1,270 @@
+import os
+import json
+import time
+import struct
+import hashlib
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from .config import config
+from .numpy_index import NumpyVectorIndex
+from .lexical_index import LexicalIndex
+
+# Fixed-size prefix: magic, format version, reserved, header offset, header
+# length, SHA-256 of the header. The JSON header (section table, model
+# fingerprint) is written after the sections, once their checksums are known.
+SNAPSHOT_MAGIC = b"RAGSNAP\x00"
+SNAPSHOT_FORMAT_VERSION = 1
+PREFIX = struct.Struct("<8sIIQQ32s")
+ALIGNMENT = 64
+
+class SnapshotError(Exception):
+    """Raised for malformed, corrupted or incompatible snapshot bundles"""
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+class SnapshotWriter:
+    """Streams chunks into a single snapshot bundle, then publishes it in one step
+    
+    Embeddings and squared norms go to preallocated regions and chunk text is
+    appended after them as batches arrive; ID, offset and metadata sections,
+    and a BM25 index of the texts (lexical_* sections), are written on
+    commit. Every section starts on a 64-byte boundary so the loader can view
+    it in place.
+    """
+    
+    def __init__(self, path: str, count: int, dim: int,
+                 embedding_model: str = config.EMBEDDING_MODEL,
+                 embedding_runtime: str = config.EMBEDDING_RUNTIME):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.count = count
+        self.dim = dim
+        self.embedding_model = embedding_model
+        self.embedding_runtime = embedding_runtime
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(self.tmp_path, "wb+")
+        self.file.write(b"\x00" * PREFIX.size)
+        
+        self.sections: Dict[str, Dict[str, Any]] = {}
+        self._digests = {}
+        self.vectors_offset = _align(PREFIX.size)
+        self.norms_offset = _align(self.vectors_offset + count * dim * 2)
+        self.texts_offset = _align(self.norms_offset + count * 4)
+        self._texts_length = 0
+        self._rows = 0
+        self.text_offsets = [0]
+        self.ids = []
+        self.metadata = []
+        self.metadata_offsets = [0]
+        self.lexical_index = LexicalIndex("")
+        for name in ("vectors", "norms", "texts"):
+            self._digests[name] = hashlib.sha256()
+    
+    def _write_at(self, name: str, offset: int, data: bytes):
+        self.file.seek(offset)
+        self.file.write(data)
+        self._digests[name].update(data)
+    
+    def add(self, ids: Sequence[str], embeddings, documents: Sequence[str], metadatas: Sequence[Optional[Dict]]):
+        """Append a batch of chunks"""
+        start = self._rows
+        if start + len(ids) > self.count:
+            raise ValueError("More chunks than the snapshot was sized for")
+        stored = np.asarray(embeddings, dtype=np.float32).astype(np.float16)
+        norms = np.einsum("ij,ij->i", stored, stored, dtype=np.float32)
+        self._write_at("vectors", self.vectors_offset + start * self.dim * 2, stored.tobytes())
+        self._write_at("norms", self.norms_offset + start * 4, norms.tobytes())
+        encoded_texts = []
+        for text in documents:
+            encoded = (text or "").encode("utf-8")
+            encoded_texts.append(encoded)
+            self.text_offsets.append(self.text_offsets[-1] + len(encoded))
+        texts = b"".join(encoded_texts)
+        self._write_at("texts", self.texts_offset + self._texts_length, texts)
+        self._texts_length += len(texts)
+        for metadata in metadatas:
+            encoded = json.dumps(metadata or {}, separators=(",", ":")).encode("utf-8")
+            self.metadata.append(encoded)
+            self.metadata_offsets.append(self.metadata_offsets[-1] + len(encoded))
+        self.lexical_index.add(ids, [text or "" for text in documents])
+        self.ids.extend(ids)
+        self._rows += len(ids)
+    
+    def _append_section(self, name: str, array: np.ndarray, offset: int) -> int:
+        """Write a section at offset; returns the offset after it"""
+        data = array.tobytes()
+        self.file.seek(offset)
+        self.file.write(data)
+        self._record(name, offset, array, hashlib.sha256(data).hexdigest())
+        return offset + len(data)
+    
+    def _record(self, name: str, offset: int, array_or_shape, digest: str, dtype=None):
+        if isinstance(array_or_shape, np.ndarray):
+            dtype, shape = array_or_shape.dtype, array_or_shape.shape
+        else:
+            shape = array_or_shape
+        length = int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+        self.sections[name] = {
+            "offset": offset, "length": length, "dtype": np.dtype(dtype).str,
+            "shape": list(shape), "sha256": digest
+        }
+    
+    def commit(self) -> Dict[str, Any]:
+        """Write the remaining sections and header, then atomically replace the bundle"""
+        if self._rows != self.count:
+            raise ValueError(f"Expected {self.count} chunks, got {self._rows}")
+        self._record("vectors", self.vectors_offset, (self.count, self.dim),
+                     self._digests["vectors"].hexdigest(), np.float16)
+        self._record("norms", self.norms_offset, (self.count,), self._digests["norms"].hexdigest(), np.float32)
+        self._record("texts", self.texts_offset, (self._texts_length,), self._digests["texts"].hexdigest(), np.uint8)
+        
+        ids = np.asarray([chunk_id.encode("utf-8") for chunk_id in self.ids], dtype=bytes)
+        if not len(ids):
+            ids = np.zeros(0, dtype="S1")
+        # Sorted IDs with their rows let the loader find chunks by binary search
+        order = np.argsort(ids, kind="stable").astype(np.int64)
+        offset = _align(self.texts_offset + self._texts_length)
+        end = self._append_section("text_offsets", np.asarray(self.text_offsets, dtype=np.int64), offset)
+        end = self._append_section("ids", ids, _align(end))
+        end = self._append_section("sorted_ids", ids[order], _align(end))
+        end = self._append_section("sorted_rows", order, _align(end))
+        end = self._append_section("metadata_offsets", np.asarray(self.metadata_offsets, dtype=np.int64), _align(end))
+        end = self._append_section("metadata", np.frombuffer(b"".join(self.metadata), dtype=np.uint8), _align(end))
+        for name, array in self.lexical_index.to_arrays().items():
+            end = self._append_section(f"lexical_{name}", array, _align(end))
+        
+        header = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "embedding_model": self.embedding_model,
+            "embedding_runtime": self.embedding_runtime,
+            "count": self.count,
+            "dim": self.dim,
+            "sections": self.sections
+        }
+        encoded = json.dumps(header).encode("utf-8")
+        header_offset = _align(end)
+        self.file.seek(header_offset)
+        self.file.write(encoded)
+        self.file.seek(0)
+        self.file.write(PREFIX.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, 0, header_offset, len(encoded),
+                                    hashlib.sha256(encoded).digest()))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+        return header
+    
+    def abort(self):
+        """Discard the partially written bundle"""
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+def read_snapshot_header(path: str) -> Dict[str, Any]:
+    """Read and validate the prefix and JSON header of a snapshot bundle"""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        prefix = f.read(PREFIX.size)
+        if len(prefix) < PREFIX.size:
+            raise SnapshotError(f"{path} is too short to be a snapshot")
+        magic, version, _, header_offset, header_length, header_digest = PREFIX.unpack(prefix)
+        if magic != SNAPSHOT_MAGIC:
+            raise SnapshotError(f"{path} is not an index snapshot")
+        if version != SNAPSHOT_FORMAT_VERSION:
+            raise SnapshotError(f"Snapshot format version {version} is not supported "
+                                f"(expected {SNAPSHOT_FORMAT_VERSION})")
+        if header_offset + header_length > size:
+            raise SnapshotError(f"{path} is truncated")
+        if header_offset + header_length < size:
+            raise SnapshotError(f"{path} is larger than the bundle it describes")
+        f.seek(header_offset)
+        encoded = f.read(header_length)
+    if hashlib.sha256(encoded).digest() != header_digest:
+        raise SnapshotError(f"Snapshot header checksum mismatch in {path}")
+    header = json.loads(encoded)
+    for name, section in header["sections"].items():
+        if section["offset"] + section["length"] > header_offset:
+            raise SnapshotError(f"Snapshot section {name} overruns the bundle")
+    return header
+
+class SnapshotIndex(NumpyVectorIndex):
+    """Read-only vector index served straight from a memory-mapped snapshot bundle
+    
+    Every section is a view into one read-only mmap of the file, so opening
+    a snapshot reads only its header: chunk metadata is decoded when a chunk
+    is returned and IDs are found by binary search over the sorted ID
+    section. Search is the same blocked float16 scan as NumpyVectorIndex.
+    Without verify, only the header checksum and the file size are checked;
+    verify hashes every section, reading the whole file.
+    """
+    
+    def __init__(self, path: str, embedding_model: str = config.EMBEDDING_MODEL, verify: bool = True,
+                 embedding_runtime: Optional[str] = None):
+        self.path = path
+        self.header = read_snapshot_header(path)
+        if self.header["embedding_model"] != embedding_model:
+            raise SnapshotError(
+                f"Snapshot was built with {self.header['embedding_model']}, "
+                f"but EMBEDDING_MODEL is {embedding_model}; refusing to load it"
+            )
+        # Query vectors from another runtime (e.g. int8 ONNX against a
+        # PyTorch-built bundle) drift from the stored ones; bundles written
+        # before the runtime was recorded were built with PyTorch
+        built_with = self.header.get("embedding_runtime", "torch")
+        if embedding_runtime is not None and built_with != embedding_runtime:
+            raise SnapshotError(
+                f"Snapshot was built with the {built_with} embedding runtime, "
+                f"but queries are embedded with {embedding_runtime}; refusing to load it"
+            )
+        self.buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        if verify:
+            self.verify()
+        self.count = self.header["count"]
+        self.dim = self.header["dim"]
+        self.quantization = "none"
+        self.rescore_multiplier = 1
+        self.codes = self.scales = self.code_norms = None
+        self.vectors = self._section("vectors")
+        self.norms = self._section("norms")
+        self.texts = self._section("texts")
+        self.offsets = self._section("text_offsets")
+        self.ids = self._section("ids")
+        self.sorted_ids = self._section("sorted_ids")
+        self.sorted_rows = self._section("sorted_rows")
+        self.metadata_offsets = self._section("metadata_offsets")
+        self.metadata = self._section("metadata")
+    
+    @property
+    def fingerprint(self) -> str:
+        """Digest of the bundle contents, taken from the header's section checksums"""
+        digests = "".join(section["sha256"] for _, section in sorted(self.header["sections"].items()))
+        return hashlib.sha1(digests.encode("ascii")).hexdigest()
+    
+    def _section(self, name: str) -> np.ndarray:
+        section = self.header["sections"][name]
+        data = self.buffer[section["offset"]:section["offset"] + section["length"]]
+        return data.view(np.dtype(section["dtype"])).reshape(section["shape"])
+    
+    def load_lexical_index(self, path: str) -> Optional[LexicalIndex]:
+        """The bundle's BM25 index, its postings viewing the mmap (None if the bundle has none)"""
+        names = [name[len("lexical_"):] for name in self.header["sections"] if name.startswith("lexical_")]
+        if not names:
+            return None
+        return LexicalIndex.from_arrays(path, {name: self._section(f"lexical_{name}") for name in names})
+    
+    def verify(self, block_size: int = 1 << 24):
+        """Check every section against its SHA-256; raises SnapshotError on mismatch"""
+        for name, section in self.header["sections"].items():
+            digest = hashlib.sha256()
+            end = section["offset"] + section["length"]
+            for start in range(section["offset"], end, block_size):
+                digest.update(self.buffer[start:min(start + block_size, end)])
+            if digest.hexdigest() != section["sha256"]:
+                raise SnapshotError(f"Snapshot section {name} is corrupted (checksum mismatch)")
+    
\ No newline at end of file
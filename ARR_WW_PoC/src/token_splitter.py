@@ -0,0 +1,113 @@
+import re
+from typing import List, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+
+# Strength of a break between two tokens; chunks end at the strongest break
+# available in the second half of the window
+MID_WORD, WORD, SENTENCE, LINE, PARAGRAPH = 0, 1, 2, 3, 4
+PARAGRAPH_PATTERN = re.compile(r"\n[^\S\n]*\n")
+SENTENCE_END_PATTERN = re.compile(r"[.!?:;]")
+
+class TokenTextSplitter:
+    """Splits text into chunks sized in tokens of the embedding model's tokenizer
+    
+    Each text is tokenized once with the Hugging Face fast tokenizer, and chunk
+    boundaries are chosen from the character offsets of its tokens: a chunk
+    takes at most chunk_size tokens and ends at the strongest break (paragraph,
+    line, sentence, then word) in the second half of that window. The next
+    chunk starts chunk_overlap tokens earlier, on a word boundary. Chunk text
+    is sliced from the original string, so nothing is re-tokenized.
+    """
+    
+    def __init__(self, model_name: str, chunk_size: int, chunk_overlap: int, max_tokens: int = 0):
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+        if not tokenizer.is_fast:
+            raise ValueError(f"{model_name} has no fast tokenizer; token offsets are required")
+        if max_tokens:
+            # The model adds special tokens (e.g. <s> and </s>) to every input
+            chunk_size = min(chunk_size, max_tokens - tokenizer.num_special_tokens_to_add())
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError(f"Chunk overlap ({chunk_overlap}) must be smaller than the chunk size ({chunk_size})")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        # The Rust tokenizer encodes batches in parallel and, unlike the
+        # transformers wrapper, does not warn about over-long inputs
+        self.tokenizer = tokenizer.backend_tokenizer
+        self.tokenizer.no_truncation()
+        self.tokenizer.no_padding()
+    
+    @staticmethod
+    def _break_scores(text: str, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Break strength before each token (index i = break between tokens i-1 and i)"""
+        scores = np.full(len(starts) + 1, PARAGRAPH, dtype=np.int8)
+        if len(starts) < 2:
+            return scores
+        gap_starts, gap_ends = ends[:-1], starts[1:]
+        inner = np.where(gap_ends > gap_starts, WORD, MID_WORD).astype(np.int8)
+        
+        def gaps_containing(positions: List[int]) -> np.ndarray:
+            positions = np.asarray(positions, dtype=np.int64)
+            return np.searchsorted(positions, gap_ends) > np.searchsorted(positions, gap_starts)
+        
+        sentence_ends = [match.start() for match in SENTENCE_END_PATTERN.finditer(text)]
+        if sentence_ends:
+            # Punctuation ending the previous token, followed by whitespace
+            ends_sentence = np.isin(gap_starts - 1, sentence_ends) & (inner == WORD)
+            inner[ends_sentence] = SENTENCE
+        newlines = [match.start() for match in re.finditer("\n", text)]
+        if newlines:
+            inner[gaps_containing(newlines)] = LINE
+        paragraphs = [match.start() for match in PARAGRAPH_PATTERN.finditer(text)]
+        if paragraphs:
+            inner[gaps_containing(paragraphs)] = PARAGRAPH
+        scores[1:-1] = inner
+        return scores
+    
+    def _split_offsets(self, text: str, offsets: Sequence) -> List[str]:
+        """Chunk one text given the (start, end) character offsets of its tokens"""
+        offsets = [offset for offset in offsets if offset[1] > offset[0]]
+        count = len(offsets)
+        if not count:
+            return []
+        starts = np.fromiter((offset[0] for offset in offsets), dtype=np.int64, count=count)
+        ends = np.fromiter((offset[1] for offset in offsets), dtype=np.int64, count=count)
+        scores = self._break_scores(text, starts, ends)
+        
+        chunks = []
+        start = 0
+        while start < count:
+            end = min(start + self.chunk_size, count)
+            if end < count:
+                # Latest of the strongest breaks in the second half of the window
+                low = start + max(1, self.chunk_size // 2)
+                window = scores[low:end + 1][::-1]
+                end -= int(np.argmax(window))
+            chunks.append(text[starts[start]:ends[end - 1]])
+            if end >= count:
+                break
+            next_start = end - self.chunk_overlap
+            if self.chunk_overlap:
+                # Start the overlap on a word boundary rather than mid-word
+                boundaries = np.flatnonzero(scores[next_start:end] >= WORD)
+                if len(boundaries):
+                    next_start += int(boundaries[0])
+            start = max(next_start, start + 1)
+        return chunks
+    
+    def split_text(self, text: str) -> List[str]:
+        encoding = self.tokenizer.encode(text, add_special_tokens=False)
+        return self._split_offsets(text, encoding.offsets)
+    
+    def split_documents(self, documents: Sequence[Document]) -> List[Document]:
+        """Split documents, tokenizing them in one batch; chunks keep their document's metadata"""
+        documents = list(documents)
+        texts = [document.page_content or "" for document in documents]
+        encodings = self.tokenizer.encode_batch(texts, add_special_tokens=False) if texts else []
+        chunks = []
+        for document, text, encoding in zip(documents, texts, encodings):
+            for chunk in self._split_offsets(text, encoding.offsets):
+                chunks.append(Document(page_content=chunk, metadata=dict(document.metadata)))
+        return chunks
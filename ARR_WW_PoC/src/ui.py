@@ -1,5 +1,6 @@
 import streamlit as st
 import os
+import time
 import sys
 
 # Add the parent directory to the path so we can import from src
@@ -11,6 +12,7 @@ class StreamlitUI:
     def __init__(self):
         self.setup_page()
         self.rag_engine = None
+        self.sessions = None
         
     def setup_page(self):
         """Configure the Streamlit page"""
@@ -29,16 +31,22 @@ class StreamlitUI:
         """)
     
     def initialize_system(self):
-        """Initialize the RAG engine"""
+        """Attach to the shared RAG engine, creating it on first use"""
         try:
             from src.config import config
-            from src.rag_engine import RAGEngine
+            from src.resources import get_rag_engine, get_session_manager
             
             # Validate config first
             config.validate_config()
             
+            # The engine is shared by all reruns and sessions; only the first
+            # call in the process pays for loading the model and index
             with st.spinner("Initializing RAG system..."):
-                self.rag_engine = RAGEngine()
+                self.rag_engine = get_rag_engine()
+                # Each browser session keeps only its recent turns; the engine is shared
+                self.sessions = get_session_manager()
+                if "session_id" not in st.session_state:
+                    st.session_state.session_id = self.sessions.get_session().session_id
                 st.success("✅ RAG system initialized successfully")
                 return True
                 
@@ -62,6 +70,28 @@ class StreamlitUI:
                     st.metric("Document Chunks", doc_count)
                 except Exception as e:
                     st.metric("Document Chunks", "Unknown")
+                
+                cache_stats = self.rag_engine.get_cache_stats()
+                if "results" in cache_stats:
+                    st.metric("Query Cache Hit Rate", f"{cache_stats['results']['hit_rate']:.0%}")
+                if "answers" in cache_stats:
+                    st.metric("Answer Cache Hit Rate", f"{cache_stats['answers']['hit_rate']:.0%}")
+            
+                session_stats = self.sessions.stats()
+                st.metric("Chat Sessions", session_stats["sessions"])
+                st.caption(f"History memory: {session_stats['mean_session_bytes'] / 1024:.1f} KB per session")
+            
+            ingest_status = self.rag_engine.get_ingest_status() if self.rag_engine else {}
+            if ingest_status:
+                st.metric("Ingest Queue", ingest_status["queue_depth"],
+                          help="New, changed or removed files not yet searchable")
+                if ingest_status["last_publish"]:
+                    published = time.strftime("%H:%M:%S", time.localtime(ingest_status["last_publish"]))
+                    st.caption(f"Index last published at {published}")
+                if ingest_status["ingesting"]:
+                    st.caption("⏳ Indexing new documents in the background...")
+            
+            self.display_latency_metrics()
             
             st.header("⚙️ Settings")
             st.info("Using Cerebras Llama-3.3-70b via direct API")
@@ -78,8 +108,38 @@ class StreamlitUI:
             if st.button("🔄 Clear Conversation"):
                 if "messages" in st.session_state:
                     st.session_state.messages = []
+                if "session_id" in st.session_state:
+                    self.sessions.end_session(st.session_state.pop("session_id"))
+                st.rerun()
+            
+            # Reload the shared engine, e.g. after running --mode reindex
+            if st.button("♻️ Reload Index"):
+                from src.resources import reset_rag_engine
+                reset_rag_engine()
                 st.rerun()
     
+    def display_latency_metrics(self):
+        """Display per-stage latency percentiles and export buttons"""
+        from src.metrics import metrics
+        
+        if not metrics.enabled:
+            return
+        
+        summary = metrics.summary()
+        if not summary:
+            return
+        
+        st.header("⏱️ Latency")
+        st.table([
+            {"Stage": name, "Count": stats["count"], "p50 (ms)": stats["p50_ms"],
+             "p95 (ms)": stats["p95_ms"], "p99 (ms)": stats["p99_ms"]}
+            for name, stats in summary.items()
+        ])
+        st.download_button("Export Prometheus", metrics.to_prometheus(),
+                           file_name="rag_metrics.prom", mime="text/plain")
+        st.download_button("Export JSON Lines", metrics.to_json_lines(),
+                           file_name="rag_metrics.jsonl", mime="application/json")
+    
     def display_chat_interface(self):
         """Display the main chat interface"""
         st.header("💬 Chat with Your Documents")
@@ -102,36 +162,54 @@ class StreamlitUI:
             with st.chat_message("user"):
                 st.markdown(prompt)
             
-            # Generate RAG response
+            # Generate RAG response, rendering tokens as they arrive
             with st.chat_message("assistant"):
-                with st.spinner("Searching documents and generating answer..."):
+                try:
+                    final = {}
+                    
+                    def answer_deltas():
+                        events = self.sessions.stream_query(st.session_state.session_id, prompt)
+                        try:
+                            for event in events:
+                                if event["type"] == "delta":
+                                    yield event["content"]
+                                else:
+                                    final.update(event)
+                        finally:
+                            # A rerun can abandon the stream; free its LLM slot
+                            events.close()
+                    
+                    placeholder = st.empty()
+                    deltas = answer_deltas()
                     try:
-                        result = self.rag_engine.process_query(prompt)
+                        with placeholder.container():
+                            st.write_stream(deltas)
+                    finally:
+                        deltas.close()
+                    result = final
+                    
+                    if result["success"]:
+                        # Display sources if available
+                        if result["sources"]:
+                            with st.expander("📚 Source References"):
+                                for source in result["sources"]:
+                                    st.write(f"• {source}")
                         
-                        if result["success"]:
-                            # Display answer
-                            st.markdown(result["answer"])
-                            
-                            # Display sources if available
-                            if result["sources"]:
-                                with st.expander("📚 Source References"):
-                                    for source in result["sources"]:
-                                        st.write(f"• {source}")
-                            
-                            # Add assistant response to chat history
-                            st.session_state.messages.append({
-                                "role": "assistant", 
-                                "content": result["answer"]
-                            })
-                        else:
-                            st.error(result["answer"])
-                    except Exception as e:
-                        error_msg = f"Error processing query: {str(e)}"
-                        st.error(error_msg)
+                        # Add assistant response to chat history
                         st.session_state.messages.append({
                             "role": "assistant", 
-                            "content": error_msg
+                            "content": result["answer"]
                         })
+                    else:
+                        placeholder.empty()
+                        st.error(result["answer"])
+                except Exception as e:
+                    error_msg = f"Error processing query: {str(e)}"
+                    st.error(error_msg)
+                    st.session_state.messages.append({
+                        "role": "assistant", 
+                        "content": error_msg
+                    })
     
     def run(self):
         """Run the Streamlit application"""
@@ -1,96 +1,955 @@
 import os
-from typing import List
-from langchain_community.document_loaders import PyPDFLoader, TextLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain.schema import Document
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, List, Dict, Any, Iterable, Iterator, Optional, Set, Tuple
+from langchain_core.documents import Document
 
 from .config import config
+from .manifest import IndexManifest, make_chunk_id
+from .embedding_cache import CachedEmbeddings
+from .resources import get_embedding_model, get_embedding_cache, get_embedding_runtime
+from .metrics import metrics
+from .lexical_index import LexicalIndex, reciprocal_rank_fusion
+from .numpy_index import NumpyIndexWriter, NumpyVectorIndex
+from .snapshot import SnapshotIndex, SnapshotWriter
+from .mmr import maximal_marginal_relevance
+from .dedup import ChunkDeduplicator, citation_metadata
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import Chroma
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+def build_text_splitter(chunk_size: int = config.CHUNK_SIZE,
+                        chunk_overlap: int = config.CHUNK_OVERLAP,
+                        mode: str = config.CHUNKING_MODE) -> "RecursiveCharacterTextSplitter":
+    """Build the text splitter used to chunk documents
+    
+    In "tokens" mode chunks are sized with the embedding model's tokenizer,
+    using CHUNK_SIZE_TOKENS / CHUNK_OVERLAP_TOKENS instead.
+    """
+    if mode == "tokens":
+        from .token_splitter import TokenTextSplitter
+        return TokenTextSplitter(
+            config.EMBEDDING_MODEL,
+            config.CHUNK_SIZE_TOKENS,
+            config.CHUNK_OVERLAP_TOKENS,
+            max_tokens=config.EMBEDDING_MAX_TOKENS
+        )
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+    )
+
+def text_splitter_signature(mode: str = config.CHUNKING_MODE) -> str:
+    """Describe the chunking settings; the index is re-chunked when they change"""
+    if mode == "tokens":
+        return f"tokens:{config.EMBEDDING_MODEL}:{config.CHUNK_SIZE_TOKENS}/{config.CHUNK_OVERLAP_TOKENS}"
+    return f"characters:{config.CHUNK_SIZE}/{config.CHUNK_OVERLAP}"
+
+def iter_file_pages(file_path: str, filename: str) -> Iterator[Document]:
+    """Stream the pages of a PDF or text file one at a time"""
+    from langchain_community.document_loaders import PyPDFLoader, TextLoader
+    if filename.endswith(".pdf"):
+        loader = PyPDFLoader(file_path)
+    elif filename.endswith(".txt"):
+        loader = TextLoader(file_path, encoding='utf-8')
+    else:
+        return
+    
+    for doc in loader.lazy_load():
+        # Add source metadata
+        doc.metadata['source'] = filename
+        yield doc
+
+def load_file(file_path: str, filename: str) -> List[Document]:
+    """Load a single PDF or text file"""
+    return list(iter_file_pages(file_path, filename))
+
+def _bounded_map(executor, function, tasks, window: int) -> Iterator:
+    """Like executor.map, in input order, but with at most `window` tasks in flight
+    
+    executor.map submits everything up front, so results of fast workers pile
+    up in memory while the consumer is still embedding earlier files.
+    """
+    futures = deque()
+    for task in tasks:
+        futures.append(executor.submit(function, task))
+        if len(futures) >= window:
+            yield futures.popleft().result()
+    while futures:
+        yield futures.popleft().result()
+
+# Per-process splitter, built once in each ingest worker
+_worker_text_splitter = None
+
+def _load_file_task(task: Tuple[str, str, bool]) -> Tuple[str, int, List[Document], Optional[str], float, float]:
+    """Load (and optionally split) one file; runs inside an ingest worker
+    
+    Returns the load and split durations so the parent can record them.
+    """
+    global _worker_text_splitter
+    file_path, filename, split = task
+    try:
+        start = time.perf_counter()
+        docs = load_file(file_path, filename)
+        loaded = time.perf_counter()
+        page_count = len(docs)
+        if split:
+            if _worker_text_splitter is None:
+                _worker_text_splitter = build_text_splitter()
+            docs = _worker_text_splitter.split_documents(docs)
+        return filename, page_count, docs, None, loaded - start, time.perf_counter() - loaded if split else 0.0
+    except Exception as e:
+        return filename, 0, [], str(e), 0.0, 0.0
 
 class VectorStoreManager:
     """Manages document loading, embedding, and vector storage"""
     
     def __init__(self):
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=config.EMBEDDING_MODEL
-        )
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=config.CHUNK_SIZE,
-            chunk_overlap=config.CHUNK_OVERLAP,
-            length_function=len,
-        )
+        # The embedding model, cache, splitter and Chroma client are created on
+        # first use, so opening an index or answering from cache stays cheap
+        self._embeddings = None
+        self.embedding_cache = None
+        self._text_splitter = None
+        self._deduplicator = None
         self.vector_store = None
+        # What searches read: the memory-mapped export searched instead of
+        # Chroma (VECTOR_BACKEND "numpy", snapshots) and the BM25 index over
+        # the same chunk IDs (hybrid retrieval only, loaded on first use). One tuple, so publish() swaps both at once and each
+        # search works on a consistent pair.
+        self._view: Tuple[Optional[NumpyVectorIndex], Optional[LexicalIndex]] = (None, None)
+        self._search_executor = None
+        # Bumped whenever the store contents change so caches can invalidate
+        self.index_version = 0
+        self.last_publish: Optional[float] = None
+        self._fingerprint = None
     
-    def load_documents(self, data_dir: str = "./data") -> List[Document]:
-        """Load documents from data directory"""
-        documents = []
+    @property
+    def numpy_index(self) -> Optional[NumpyVectorIndex]:
+        return self._view[0]
+    
+    @numpy_index.setter
+    def numpy_index(self, index: Optional[NumpyVectorIndex]):
+        self._view = (index, self._view[1])
+    
+    @property
+    def lexical_index(self) -> Optional[LexicalIndex]:
+        """The BM25 index, maintained and loaded only when hybrid retrieval is enabled"""
+        if self._view[1] is None and config.RETRIEVAL_MODE == "hybrid":
+            self.lexical_index = LexicalIndex.load(config.LEXICAL_INDEX_PATH)
+        return self._view[1]
+    
+    @lexical_index.setter
+    def lexical_index(self, index: Optional[LexicalIndex]):
+        self._view = (self._view[0], index)
+    
+    def publish(self, numpy_index: Optional[NumpyVectorIndex], lexical_index: Optional[LexicalIndex],
+                vector_store: Optional["Chroma"] = None):
+        """Atomically switch searches to a new read-only index pair
         
+        Searches already running keep the pair they started with; the old
+        memory maps stay valid until those searches drop them. Without a NumPy
+        index, searches read `vector_store` (Chroma) instead.
+        """
+        if vector_store is not None:
+            self.vector_store = vector_store
+        self._view = (numpy_index, lexical_index)
+        self.index_version += 1
+        self.last_publish = time.time()
+    
+    @property
+    def embeddings(self):
+        """Embedding model (behind the embedding cache), loaded on first use"""
+        if self._embeddings is None:
+            # The model and cache are process-wide, shared by every manager
+            embeddings = get_embedding_model()
+            self.embedding_cache = get_embedding_cache()
+            if self.embedding_cache:
+                embeddings = CachedEmbeddings(embeddings, self.embedding_cache)
+            self._embeddings = embeddings
+        return self._embeddings
+    
+    @property
+    def deduplicator(self) -> Optional[ChunkDeduplicator]:
+        """Near-duplicate index used at ingest, opened on first use (None if DEDUP_ENABLED is off)"""
+        if self._deduplicator is None and config.DEDUP_ENABLED:
+            self._deduplicator = ChunkDeduplicator(config.DEDUP_INDEX_PATH, config.DEDUP_THRESHOLD,
+                                                   config.DEDUP_NUM_PERM)
+        return self._deduplicator
+    
+    @property
+    def text_splitter(self):
+        if self._text_splitter is None:
+            self._text_splitter = build_text_splitter()
+        return self._text_splitter
+    
+    def iter_files(self, files: Dict[str, str], split: bool = False) -> Iterator[Tuple[str, List[Document]]]:
+        """Load (and optionally split) files, yielding results in input order
+        
+        With config.INGEST_WORKERS > 1 files are parsed in a process pool and
+        streamed back as they complete, still in input order, with at most
+        two files per worker held at a time.
+        """
+        tasks = [(file_path, filename, split) for filename, file_path in files.items()]
+        workers = min(config.INGEST_WORKERS, len(tasks))
+        
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                yield from self._report_loaded(_bounded_map(executor, _load_file_task, tasks, workers * 2))
+        else:
+            yield from self._report_loaded(map(_load_file_task, tasks))
+    
+    def _report_loaded(self, results) -> Iterator[Tuple[str, List[Document]]]:
+        """Print per-file load results and pass successfully loaded files on"""
+        for filename, page_count, docs, error, load_seconds, split_seconds in results:
+            if error is not None:
+                print(f"Error loading {filename}: {error}")
+                continue
+            metrics.observe("ingest_load", load_seconds)
+            if split_seconds:
+                metrics.observe("ingest_split", split_seconds)
+            if filename.endswith(".pdf"):
+                print(f"Loaded PDF: {filename} ({page_count} pages)")
+            else:
+                print(f"Loaded text: {filename}")
+            yield filename, docs
+    
+    def iter_file_chunks(self, files: Dict[str, str]) -> Iterator[Tuple[str, Iterator[Document]]]:
+        """Yield (filename, chunks) per file, each chunk carrying its chunk ID
+        
+        With one ingest worker pages stream from the loader and are split one
+        at a time, so only the current page is held in memory. With a process
+        pool each worker returns a whole split file.
+        """
+        if min(config.INGEST_WORKERS, len(files)) > 1:
+            for filename, chunks in self.iter_files(files, split=True):
+                self._assign_chunk_ids(chunks)
+                yield filename, iter(chunks)
+        else:
+            for filename, file_path in files.items():
+                yield filename, self._stream_file_chunks(file_path, filename)
+    
+    def _stream_file_chunks(self, file_path: str, filename: str) -> Iterator[Document]:
+        """Load, split and ID one file page by page"""
+        pages = iter_file_pages(file_path, filename)
+        page_count = 0
+        while True:
+            with metrics.span("ingest_load"):
+                page = next(pages, None)
+            if page is None:
+                break
+            page_count += 1
+            with metrics.span("ingest_split"):
+                chunks = self.text_splitter.split_documents([page])
+            # Chunk IDs are keyed by page, so assigning them per page matches a whole-file pass
+            self._assign_chunk_ids(chunks)
+            yield from chunks
+        if filename.endswith(".pdf"):
+            print(f"Loaded PDF: {filename} ({page_count} pages)")
+        else:
+            print(f"Loaded text: {filename}")
+    
+    def _list_files(self, data_dir: str) -> Dict[str, str]:
+        """Map supported filenames in the data directory to their paths"""
+        return {
+            filename: os.path.join(data_dir, filename)
+            for filename in sorted(os.listdir(data_dir))
+            if filename.endswith(config.SUPPORTED_EXTENSIONS)
+        }
+    
+    def iter_documents(self, data_dir: str = config.DATA_DIR) -> Iterator[Document]:
+        """Stream the pages of every document in the data directory"""
         if not os.path.exists(data_dir):
             os.makedirs(data_dir)
             print(f"Created data directory at {data_dir}")
-            return documents
+            return
         
-        for filename in os.listdir(data_dir):
-            file_path = os.path.join(data_dir, filename)
+        for filename, file_path in self._list_files(data_dir).items():
             try:
-                if filename.endswith(".pdf"):
-                    loader = PyPDFLoader(file_path)
-                    docs = loader.load()
-                    # Add source metadata
-                    for doc in docs:
-                        doc.metadata['source'] = filename
-                    documents.extend(docs)
-                    print(f"Loaded PDF: {filename} ({len(docs)} pages)")
-                elif filename.endswith(".txt"):
-                    loader = TextLoader(file_path, encoding='utf-8')
-                    docs = loader.load()
-                    # Add source metadata
-                    for doc in docs:
-                        doc.metadata['source'] = filename
-                    documents.extend(docs)
-                    print(f"Loaded text: {filename}")
+                yield from iter_file_pages(file_path, filename)
             except Exception as e:
                 print(f"Error loading {filename}: {str(e)}")
         
-        return documents
+    def load_documents(self, data_dir: str = config.DATA_DIR) -> List[Document]:
+        """Load documents from data directory (ingest streams them with iter_documents)"""
+        return list(self.iter_documents(data_dir))
     
-    def create_vector_store(self, documents: List[Document]) -> Chroma:
-        """Create and persist vector store from documents"""
-        if not documents:
-            raise ValueError("No documents to process")
-        
-        # Split documents into chunks
-        chunks = self.text_splitter.split_documents(documents)
-        print(f"Split {len(documents)} documents into {len(chunks)} chunks")
+    def _assign_chunk_ids(self, chunks: List[Document]) -> List[str]:
+        """Assign stable content-derived IDs to chunks"""
+        ids = []
+        seen = {}
+        for chunk in chunks:
+            key = (chunk.metadata.get('source'), chunk.metadata.get('page'), chunk.page_content)
+            occurrence = seen.get(key, 0)
+            seen[key] = occurrence + 1
+            chunk_id = make_chunk_id(key[0], key[1], key[2], occurrence)
+            chunk.metadata['chunk_id'] = chunk_id
+            ids.append(chunk_id)
+        return ids
+    
+    def create_vector_store(self, documents: Iterable[Document]) -> "Chroma":
+        """Create and persist vector store from documents
         
-        # Create vector store
-        self.vector_store = Chroma.from_documents(
-            documents=chunks,
-            embedding=self.embeddings,
-            persist_directory=config.CHROMA_PERSIST_DIR,
-            collection_name=config.CHROMA_COLLECTION_NAME
-        )
+        Documents may be a generator (see iter_documents); they are split one
+        at a time and embedded and upserted in batches of
+        config.UPSERT_BATCH_SIZE chunks.
+        """
+        self._open_vector_store()
+        document_count = 0
+        chunk_count = 0
+        batch = []
+        for document in documents:
+            document_count += 1
+            with metrics.span("ingest_split"):
+                chunks = self.text_splitter.split_documents([document])
+            self._assign_chunk_ids(chunks)
+            batch.extend(chunk for chunk in chunks if self._keep_chunk(chunk))
+            if self._batch_full(batch):
+                chunk_count += self._flush_chunk_batch(batch)
+                print(f"  📦 {document_count} documents, {chunk_count} chunks embedded")
+        chunk_count += self._flush_chunk_batch(batch)
+        if not document_count:
+            raise ValueError("No documents to process")
+        print(f"Split {document_count} documents into {chunk_count} chunks")
         
-        print(f"Vector store created with {len(chunks)} chunks")
+        if self.lexical_index is not None:
+            self.lexical_index.fingerprint = IndexManifest.digest(config.MANIFEST_PATH)
+            self.lexical_index.save()
+        if config.VECTOR_BACKEND == "numpy":
+            self.export_numpy_index()
+        print(f"Vector store created with {chunk_count} chunks")
+        self._report_dedup()
+        self._report_embedding_cache()
         return self.vector_store
     
-    def load_existing_vector_store(self) -> Chroma:
+    def _keep_chunk(self, chunk: Document) -> bool:
+        """Whether a new chunk must be embedded and stored
+        
+        With dedup enabled, a near-duplicate of a stored chunk is only added
+        to that chunk's citations.
+        """
+        if self.deduplicator is None:
+            return True
+        chunk_id = chunk.metadata['chunk_id']
+        group_id = self.deduplicator.assign(chunk_id, chunk.page_content,
+                                            chunk.metadata.get('source'), chunk.metadata.get('page'))
+        return group_id == chunk_id
+    
+    def _batch_full(self, batch: List[Document]) -> bool:
+        """Whether to flush: enough chunks to embed, or citation updates to write"""
+        if len(batch) >= config.UPSERT_BATCH_SIZE:
+            return True
+        return self.deduplicator is not None and len(self.deduplicator.dirty) >= config.UPSERT_BATCH_SIZE
+    
+    def _flush_chunk_batch(self, batch: List[Document]) -> int:
+        """Upsert a batch of chunks that already carry their IDs, then empty it"""
+        count = len(batch)
+        if count:
+            if self.deduplicator is not None:
+                self._apply_citations(batch)
+            self._upsert_chunks(batch, [chunk.metadata['chunk_id'] for chunk in batch])
+            batch.clear()
+        if self.deduplicator is not None:
+            self._update_citations()
+            self.deduplicator.commit()
+        return count
+    
+    def _apply_citations(self, chunks: List[Document]):
+        """Set the citations of new chunks from the duplicate groups they stand for"""
+        ids = [chunk.metadata['chunk_id'] for chunk in chunks]
+        citations = self.deduplicator.citations(ids)
+        for chunk_id, chunk in zip(ids, chunks):
+            self.deduplicator.dirty.discard(chunk_id)
+            if chunk_id in citations:
+                chunk.metadata.update(citation_metadata(citations[chunk_id]))
+                if chunk.metadata['page'] is None:
+                    del chunk.metadata['page']
+    
+    def _update_citations(self):
+        """Rewrite the citations of stored chunks whose duplicate groups changed"""
+        dirty = self.deduplicator.dirty
+        if not dirty:
+            return
+        collection = self.vector_store._collection
+        while dirty:
+            ids = [dirty.pop() for _ in range(min(len(dirty), config.UPSERT_BATCH_SIZE))]
+            citations = self.deduplicator.citations(ids)
+            # Chunks still waiting in an unflushed batch are not stored yet;
+            # they get their citations when they are
+            stored = collection.get(ids=ids, include=["metadatas"])
+            updates = [(chunk_id, {**(metadata or {}), **citation_metadata(citations[chunk_id])})
+                       for chunk_id, metadata in zip(stored["ids"], stored["metadatas"]) if chunk_id in citations]
+            if updates:
+                collection.update(ids=[chunk_id for chunk_id, _ in updates],
+                                  metadatas=[metadata for _, metadata in updates])
+        self.index_version += 1
+    
+    def load_existing_vector_store(self) -> "Chroma":
         """Load existing vector store from disk"""
+        if config.VECTOR_BACKEND == "numpy" and NumpyVectorIndex.exists(config.NUMPY_INDEX_DIR):
+            # Searches only need the memory-mapped export; Chroma is opened
+            # lazily if documents are re-indexed
+            self._open_numpy_index()
+            self._check_lexical_index()
+            print(f"Loaded NumPy vector index ({len(self.numpy_index)} chunks)")
+            return self.numpy_index
         if os.path.exists(config.CHROMA_PERSIST_DIR):
+            self._open_vector_store()
+            self.index_version += 1
+            self._check_lexical_index()
+            print("Loaded existing vector store")
+            return self.vector_store
+        else:
+            raise FileNotFoundError("No existing vector store found")
+    
+    def _open_vector_store(self) -> "Chroma":
+        """Open the persisted vector store, creating an empty one if needed"""
+        if not self.vector_store:
+            from langchain_community.vectorstores import Chroma
+            # Chunks and queries are embedded here and passed to the collection
+            # directly, so Chroma never needs the (slow to load) model
             self.vector_store = Chroma(
                 persist_directory=config.CHROMA_PERSIST_DIR,
-                embedding_function=self.embeddings,
+                embedding_function=None,
                 collection_name=config.CHROMA_COLLECTION_NAME
             )
-            print("Loaded existing vector store")
-            return self.vector_store
+        return self.vector_store
+    
+    def _upsert_chunks(self, chunks: List[Document], ids: List[str]):
+        """Embed and add chunks to the vector store in batches"""
+        batch_size = config.UPSERT_BATCH_SIZE
+        for start in range(0, len(chunks), batch_size):
+            batch = chunks[start:start + batch_size]
+            texts = [chunk.page_content for chunk in batch]
+            with metrics.span("ingest_embed"):
+                vectors = self.embeddings.embed_documents(texts)
+            with metrics.span("ingest_persist"):
+                self.vector_store._collection.upsert(
+                    ids=ids[start:start + batch_size],
+                    embeddings=vectors,
+                    documents=texts,
+                    metadatas=[chunk.metadata for chunk in batch]
+                )
+            if self.lexical_index is not None:
+                self.lexical_index.add(ids[start:start + batch_size], texts)
+        self.index_version += 1
+    
+    def _delete_chunks(self, ids: List[str], keep: Set[str] = frozenset()) -> List[str]:
+        """Delete chunks from the vector store in batches; returns the IDs deleted
+        
+        With dedup enabled, a stored chunk is only deleted with the last
+        member of its duplicate group; until then its citations are updated.
+        IDs in `keep` leave the deduplicator but stay stored.
+        """
+        if self.deduplicator is not None:
+            ids = [chunk_id for chunk_id in self.deduplicator.remove(ids) if chunk_id not in keep]
+            self._update_citations()
+            self.deduplicator.commit()
+        self._delete_stored(ids)
+        return ids
+    
+    def _delete_stored(self, ids: List[str]):
+        """Delete chunks from the vector store and the lexical index"""
+        batch_size = config.UPSERT_BATCH_SIZE
+        for start in range(0, len(ids), batch_size):
+            self.vector_store.delete(ids=ids[start:start + batch_size])
+        if self.lexical_index is not None:
+            self.lexical_index.remove(ids)
+        self.index_version += 1
+    
+    def _stored_ids(self, ids: List[str]) -> Set[str]:
+        """Which of the given chunk IDs are in the vector store"""
+        stored = set()
+        batch_size = config.UPSERT_BATCH_SIZE
+        for start in range(0, len(ids), batch_size):
+            stored.update(self.vector_store._collection.get(ids=ids[start:start + batch_size], include=[])["ids"])
+        return stored
+    
+    def _iter_collection(self, include: List[str]) -> Iterator[Dict[str, Any]]:
+        """Page through every chunk stored in the Chroma collection"""
+        collection = self.vector_store._collection
+        batch_size = config.UPSERT_BATCH_SIZE
+        for offset in range(0, collection.count(), batch_size):
+            yield collection.get(include=include, limit=batch_size, offset=offset)
+    
+    def _check_lexical_index(self):
+        """Rebuild the lexical index from the stored chunks if it is missing or stale
+        
+        The index is stale if its chunk count differs from the store's or it
+        was saved for a different manifest than the one on disk (an edit that
+        keeps the count, or an interrupted sync). Snapshots carry their own
+        index and are only checked by count.
+        """
+        if self.lexical_index is None:
+            return
+        if self.vector_store is None:
+            count = len(self.numpy_index)
+            batches = self.numpy_index.iter_texts(config.UPSERT_BATCH_SIZE)
         else:
-            raise FileNotFoundError("No existing vector store found")
+            count = self.vector_store._collection.count()
+            batches = ((result["ids"], result["documents"]) for result in self._iter_collection(["documents"]))
+        fingerprint = IndexManifest.digest(config.MANIFEST_PATH)
+        if len(self.lexical_index) == count and (
+                isinstance(self.numpy_index, SnapshotIndex) or self.lexical_index.fingerprint == fingerprint):
+            return
+        print(f"Rebuilding lexical index from {count} stored chunks...")
+        index = LexicalIndex(config.LEXICAL_INDEX_PATH)
+        for ids, texts in batches:
+            index.add(ids, texts)
+        index.fingerprint = fingerprint
+        index.save()
+        self.lexical_index = index
+    
+    def _open_numpy_index(self):
+        """Memory-map the exported NumPy index"""
+        self.numpy_index = NumpyVectorIndex(config.NUMPY_INDEX_DIR, config.NUMPY_INDEX_RESCORE_MULTIPLIER)
+        self.index_version += 1
+    
+    def export_numpy_index(self):
+        """Export the Chroma collection to the memory-mapped NumPy index and search it"""
+        self._open_vector_store()
+        count = self.vector_store._collection.count()
+        if not count:
+            print("⚠️  Collection is empty, NumPy index not exported")
+            return
+        writer = None
+        try:
+            for result in self._iter_collection(["embeddings", "documents", "metadatas"]):
+                if writer is None:
+                    writer = NumpyIndexWriter(
+                        config.NUMPY_INDEX_DIR, count, len(result["embeddings"][0]),
+                        config.NUMPY_INDEX_QUANTIZATION
+                    )
+                writer.add(result["ids"], result["embeddings"], result["documents"], result["metadatas"])
+            writer.commit()
+        except Exception:
+            if writer is not None:
+                writer.abort()
+            raise
+        self._open_numpy_index()
+        print(f"Exported {count} chunks to the NumPy vector index")
+    
+    def export_snapshot(self, path: str = config.SNAPSHOT_DEFAULT_PATH) -> Dict[str, Any]:
+        """Write the Chroma collection to a single-file snapshot bundle for replicas"""
+        self._open_vector_store()
+        count = self.vector_store._collection.count()
+        if not count:
+            raise ValueError("Collection is empty, nothing to snapshot")
+        writer = None
+        try:
+            for result in self._iter_collection(["embeddings", "documents", "metadatas"]):
+                if writer is None:
+                    writer = SnapshotWriter(path, count, len(result["embeddings"][0]),
+                                            embedding_runtime=get_embedding_runtime())
+                writer.add(result["ids"], result["embeddings"], result["documents"], result["metadatas"])
+            header = writer.commit()
+        except Exception:
+            if writer is not None:
+                writer.abort()
+            raise
+        print(f"Exported {count} chunks to snapshot {path}")
+        return header
+    
+    def load_snapshot(self, path: str = config.SNAPSHOT_DEFAULT_PATH, verify: bool = config.SNAPSHOT_VERIFY):
+        """Serve searches from a memory-mapped snapshot bundle
+        
+        Raises SnapshotError if the bundle is corrupted or was built with a
+        different embedding model than EMBEDDING_MODEL, or on a different
+        embedding runtime than the one queries are embedded with.
+        """
+        snapshot = SnapshotIndex(path, verify=verify, embedding_runtime=get_embedding_runtime())
+        lexical_index = None
+        if config.RETRIEVAL_MODE == "hybrid":
+            lexical_index = snapshot.load_lexical_index(config.LEXICAL_INDEX_PATH)
+        self._view = (snapshot, lexical_index)
+        self.index_version += 1
+        # Bundles written before BM25 was included are indexed here
+        self._check_lexical_index()
+        print(f"Loaded index snapshot {path} ({len(self.numpy_index)} chunks)")
+        return self.numpy_index
+    
+    def sync_documents(self, data_dir: str = config.DATA_DIR) -> Dict[str, Any]:
+        """Incrementally index new or changed files and drop removed ones
+        
+        Files that could not be read or indexed are listed in the returned
+        stats' "failed_files" (filename -> error); they keep their previous
+        manifest entry, if any, and are retried on the next sync.
+        """
+        stats = {"added_files": 0, "changed_files": 0, "removed_files": 0,
+                 "unchanged_files": 0, "added_chunks": 0, "deleted_chunks": 0,
+                 "dedup_chunks": 0, "dedup_bytes": 0}
+        errors: Dict[str, str] = {}
+        
+        if not os.path.exists(data_dir):
+            os.makedirs(data_dir)
+            print(f"Created data directory at {data_dir}")
+        
+        manifest = IndexManifest.load(config.MANIFEST_PATH)
+        self._open_vector_store()
+        self._check_lexical_index()
+        
+        if not manifest.exists():
+            # Stores built before the manifest existed use random chunk IDs
+            # that cannot be matched, so start from an empty collection
+            legacy_ids = self.vector_store.get(include=[])['ids']
+            if legacy_ids:
+                print(f"⚠️  No index manifest found, rebuilding {len(legacy_ids)} legacy chunks")
+                self._delete_chunks(legacy_ids)
+        
+        dedup = self.deduplicator.signature if self.deduplicator else None
+        if manifest.dedup != dedup or not manifest.files:
+            if manifest.files:
+                # Stored chunks and citations reflect the old settings; the
+                # embedding cache makes re-embedding them cheap
+                print(f"🔄 Near-duplicate settings changed ({manifest.dedup} -> {dedup}), rebuilding the index")
+            if self.deduplicator:
+                self.deduplicator.reset()
+            stored_ids = self.vector_store.get(include=[])['ids'] if manifest.files else []
+            if stored_ids:
+                self._delete_chunks(stored_ids)
+            manifest.files = {}
+            manifest.dedup = dedup
+        if self.deduplicator:
+            self.deduplicator.reset_stats()
+        
+        files = self._list_files(data_dir)
+        splitter = text_splitter_signature()
+        # Manifests written before the splitter was recorded used the default
+        rechunk = manifest.splitter is not None and manifest.splitter != splitter
+        if rechunk:
+            print(f"🔄 Chunking changed ({manifest.splitter} -> {splitter}), re-chunking every file")
+        
+        for filename in [name for name in manifest.files if name not in files]:
+            old_ids = manifest.remove_file(filename)
+            self._delete_chunks(old_ids)
+            stats["removed_files"] += 1
+            stats["deleted_chunks"] += len(old_ids)
+            print(f"Removed from index: {filename} ({len(old_ids)} chunks)")
+        
+        # Files whose size and modification time match the manifest are not
+        # read at all; the rest are hashed so only new or changed ones are parsed
+        pending = {}
+        hashes = {}
+        file_stats = {}
+        now_ns = time.time_ns()
+        for filename, file_path in files.items():
+            entry = manifest.get_file(filename)
+            try:
+                stat = os.stat(file_path)
+                file_stats[filename] = (stat.st_size, stat.st_mtime_ns)
+                # A file modified within the last couple of seconds may change
+                # again without its mtime moving, so it is always hashed
+                settled = now_ns - stat.st_mtime_ns > 2_000_000_000
+                if entry and not rechunk and settled and manifest.stat_matches(filename, *file_stats[filename]):
+                    stats["unchanged_files"] += 1
+                    continue
+                hashes[filename] = IndexManifest.hash_file(file_path)
+            except Exception as e:
+                print(f"Error loading {filename}: {str(e)}")
+                errors[filename] = str(e)
+                continue
+            if entry and entry['hash'] == hashes[filename] and not rechunk:
+                stats["unchanged_files"] += 1
+                # Touched but identical: remember its stat so it is not hashed again
+                if settled:
+                    manifest.set_file(filename, hashes[filename], entry['chunk_ids'], *file_stats[filename])
+            else:
+                pending[filename] = file_path
+        
+        # Chunks stream through a fixed-size batch, so memory stays bounded by
+        # config.UPSERT_BATCH_SIZE rather than by file or corpus size. A file
+        # is recorded in the manifest only once all of its chunks are stored.
+        batch = []
+        indexed = []
+        succeeded = set()
+        start = time.perf_counter()
+        
+        def flush():
+            stats["added_chunks"] += self._flush_chunk_batch(batch)
+            for filename, file_ids in indexed:
+                manifest.set_file(filename, hashes[filename], file_ids, *file_stats[filename])
+            if indexed:
+                manifest.save()
+                indexed.clear()
+            done = stats["added_files"] + stats["changed_files"]
+            elapsed = time.perf_counter() - start
+            print(f"  📦 {done}/{len(pending)} files, {stats['added_chunks']} chunks embedded "
+                  f"({stats['added_chunks'] / elapsed:.1f} chunks/s)")
+        
+        for filename, chunks in self.iter_file_chunks(pending):
+            added = []
+            stored = set()
+            try:
+                entry = manifest.get_file(filename)
+                old_ids = set(entry['chunk_ids']) if entry else set()
+                if self.deduplicator is not None and old_ids:
+                    # Forget the file's previous chunks before assigning its new
+                    # ones, so edited text is not collapsed into the text it
+                    # replaces; every chunk of the file is then assigned again
+                    emptied = self.deduplicator.remove(list(old_ids))
+                    stored = self._stored_ids(list(old_ids))
+                    # Groups stored under another file's chunk that only this
+                    # file's chunks still cited
+                    orphaned = [chunk_id for chunk_id in emptied if chunk_id not in old_ids]
+                    if orphaned:
+                        self._delete_stored(orphaned)
+                        stats["deleted_chunks"] += len(orphaned)
+                ids = []
+                for chunk in chunks:
+                    chunk_id = chunk.metadata['chunk_id']
+                    ids.append(chunk_id)
+                    # Only embed chunks whose ID is not already stored, and
+                    # that are not near-duplicates of a stored chunk
+                    if chunk_id not in old_ids or self.deduplicator is not None:
+                        added.append(chunk_id)
+                        if self._keep_chunk(chunk):
+                            if chunk_id in stored:
+                                # Still stored; only its citations may have changed
+                                self.deduplicator.dirty.add(chunk_id)
+                            else:
+                                batch.append(chunk)
+                        if self._batch_full(batch):
+                            flush()
+                
+                if self.deduplicator is not None:
+                    # Previous chunks that no longer stand for a group
+                    to_delete = [chunk_id for chunk_id in stored if not self.deduplicator.has_group(chunk_id)]
+                    if to_delete:
+                        self._delete_stored(to_delete)
+                else:
+                    new_ids = set(ids)
+                    to_delete = [chunk_id for chunk_id in old_ids if chunk_id not in new_ids]
+                    if to_delete:
+                        self._delete_chunks(to_delete)
+                
+                indexed.append((filename, ids))
+                succeeded.add(filename)
+                stats["changed_files" if entry else "added_files"] += 1
+                stats["deleted_chunks"] += len(to_delete)
+            except Exception as e:
+                # Roll back the failed file's new chunks, flushed or not; it is
+                # retried next sync. Ones that other files' duplicates were
+                # collapsed into stay, as do its previous chunks.
+                dropped = set(self._delete_chunks(added, keep=stored))
+                queued = len(batch)
+                batch[:] = [chunk for chunk in batch if chunk.metadata['chunk_id'] not in dropped]
+                # The rest were already flushed and counted as added
+                stats["added_chunks"] -= len(dropped) - (queued - len(batch))
+                print(f"Error indexing {filename}: {str(e)}")
+                errors[filename] = str(e)
+        if batch or indexed:
+            flush()
+        # With a process pool, files that fail to load are never yielded
+        for filename in pending:
+            if filename not in succeeded and filename not in errors:
+                errors[filename] = "could not be loaded"
+        stats["failed_files"] = errors
+        
+        # Record the new chunking only once every file has been re-chunked with it
+        if not (rechunk and errors):
+            manifest.splitter = splitter
+        manifest.save()
+        if self.lexical_index is not None:
+            self.lexical_index.fingerprint = IndexManifest.digest(config.MANIFEST_PATH)
+            self.lexical_index.save()
+        dedup_stats = self._report_dedup()
+        stats["dedup_chunks"] = dedup_stats.get("saved_chunks", 0)
+        stats["dedup_bytes"] = dedup_stats.get("saved_bytes", 0)
+        if config.VECTOR_BACKEND == "numpy" and (
+                stats["added_chunks"] or stats["deleted_chunks"] or stats["dedup_chunks"]
+                or not NumpyVectorIndex.exists(config.NUMPY_INDEX_DIR)):
+            self.export_numpy_index()
+        print(
+            f"Index sync: {stats['added_files']} added, {stats['changed_files']} changed, "
+            f"{stats['removed_files']} removed, {stats['unchanged_files']} unchanged, "
+            f"{len(errors)} failed files (+{stats['added_chunks']} / -{stats['deleted_chunks']} chunks)"
+        )
+        stats["embedding_cache"] = self._report_embedding_cache()
+        return stats
+    
+    def _report_dedup(self) -> Dict[str, int]:
+        """Print how many near-duplicate chunks this ingest collapsed, and the index totals"""
+        if not self.deduplicator:
+            return {}
+        dedup_stats = self.deduplicator.stats()
+        print(f"🧬 Dedup: {dedup_stats['saved_chunks']} near-duplicate chunks collapsed, "
+              f"{dedup_stats['saved_bytes'] / 1024:.1f} KB of text not embedded or stored "
+              f"(index: {dedup_stats['stored_chunks']} stored chunks stand for "
+              f"{dedup_stats['stored_chunks'] + dedup_stats['total_saved_chunks']}, "
+              f"{dedup_stats['total_saved_bytes'] / 2**20:.1f} MB saved)")
+        self.deduplicator.reset_stats()
+        return dedup_stats
+    
+    def _report_embedding_cache(self) -> Dict[str, int]:
+        """Persist the embedding cache and print its hit/miss counts for this ingest"""
+        if not self.embedding_cache:
+            return {}
+        self.embedding_cache.flush()
+        cache_stats = self.embedding_cache.stats()
+        print(f"Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+              f"({cache_stats['entries']} cached vectors)")
+        self.embedding_cache.reset_stats()
+        return cache_stats
+    
+    def index_status(self) -> Dict[str, Any]:
+        """Describe the loaded index, for readiness checks"""
+        if self.numpy_index is not None:
+            chunks = len(self.numpy_index)
+        elif self.vector_store is not None:
+            chunks = self.vector_store._collection.count()
+        else:
+            chunks = 0
+        return {
+            "loaded": self.vector_store is not None or self.numpy_index is not None,
+            "backend": "numpy" if self.numpy_index is not None else "chroma",
+            "chunks": chunks,
+            "index_version": self.index_version
+        }
+    
+    def index_fingerprint(self) -> str:
+        """Digest of the index manifest; unlike index_version it is stable across restarts"""
+        if self._fingerprint is None or self._fingerprint[0] != self.index_version:
+            if isinstance(self.numpy_index, SnapshotIndex):
+                # Replicas serving a snapshot have no manifest
+                self._fingerprint = (self.index_version, self.numpy_index.fingerprint)
+                return self._fingerprint[1]
+            self._fingerprint = (self.index_version, IndexManifest.digest(config.MANIFEST_PATH))
+        return self._fingerprint[1]
+    
+    def _require_store(self):
+        if self.vector_store is None and self.numpy_index is None:
+            raise ValueError("Vector store not initialized")
     
     def search_documents(self, query: str, k: int = 5) -> List[Document]:
         """Search for relevant documents"""
-        if not self.vector_store:
-            raise ValueError("Vector store not initialized")
+        self._require_store()
+        
+        if config.RETRIEVAL_MODE == "hybrid":
+            return [doc for _, doc in self.hybrid_search_with_ids(query, self.embed_query(query), k)]
+        if config.RETRIEVAL_MODE == "mmr":
+            hits = self.mmr_search_with_ids(self.embed_query(query), k, max(config.MMR_FETCH_K, k), config.MMR_LAMBDA)
+            return [doc for _, doc in hits]
+        return [doc for _, doc in self.search_by_vector_with_ids(self.embed_query(query), k)]
+
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a query with the store's embedding model"""
+        return self.embeddings.embed_query(query)
+    
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed many queries in one batched model call"""
+        embeddings = self.embeddings
+        # Queries bypass the on-disk cache, which is meant for chunk texts
+        if isinstance(embeddings, CachedEmbeddings):
+            embeddings = embeddings.embeddings
+        return embeddings.embed_documents(queries)
+    
+    def search_by_vector_with_ids(self, embedding: List[float], k: int = 5) -> List[Tuple[str, Document]]:
+        """Search for the chunks nearest to a query embedding, with their IDs"""
+        self._require_store()
+        return self._dense_search(embedding, k, self.numpy_index)
+    
+    def _dense_search(self, embedding: List[float], k: int,
+                      numpy_index: Optional[NumpyVectorIndex]) -> List[Tuple[str, Document]]:
+        if numpy_index is not None:
+            ids = [chunk_id for chunk_id, _ in numpy_index.search(embedding, k)]
+            documents = self._fetch_documents(ids, numpy_index)
+            return [(chunk_id, documents[chunk_id]) for chunk_id in ids]
+        
+        result = self.vector_store._collection.query(
+            query_embeddings=[embedding],
+            n_results=k,
+            include=["documents", "metadatas"]
+        )
+        return [
+            (chunk_id, Document(page_content=text, metadata=metadata or {}))
+            for chunk_id, text, metadata in zip(
+                result["ids"][0], result["documents"][0], result["metadatas"][0]
+            )
+        ]
+    
+    def hybrid_search_with_ids(self, query: str, embedding: List[float], k: int = 5) -> List[Tuple[str, Document]]:
+        """Run BM25 and vector search concurrently and fuse them with reciprocal rank fusion"""
+        self._require_store()
+        if self._search_executor is None:
+            self._search_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hybrid-search")
+        
+        if self.lexical_index is None:
+            # Hybrid search called directly while RETRIEVAL_MODE is not hybrid
+            self.lexical_index = LexicalIndex.load(config.LEXICAL_INDEX_PATH)
+            self._check_lexical_index()
+        numpy_index, lexical_index = self._view
+        candidates = k * config.HYBRID_CANDIDATE_MULTIPLIER
+        dense_future = self._search_executor.submit(self._dense_search, embedding, candidates, numpy_index)
+        lexical_hits = lexical_index.search(query, candidates)
+        dense_hits = dense_future.result()
+        
+        fused = reciprocal_rank_fusion(
+            [[chunk_id for chunk_id, _ in dense_hits], [chunk_id for chunk_id, _ in lexical_hits]],
+            k=config.RRF_K
+        )
+        top_ids = [chunk_id for chunk_id, _ in fused[:k]]
+        
+        # Lexical-only hits are not in the dense results, fetch their text
+        documents = dict(dense_hits)
+        missing = [chunk_id for chunk_id in top_ids if chunk_id not in documents]
+        if missing:
+            documents.update(self._fetch_documents(missing, numpy_index))
+        return [(chunk_id, documents[chunk_id]) for chunk_id in top_ids if chunk_id in documents]
+    
+    def mmr_search_with_ids(self, embedding: List[float], k: int = 5, fetch_k: int = 40,
+                            lambda_mult: float = 0.5) -> List[Tuple[str, Document]]:
+        """Fetch fetch_k nearest chunks with their stored embeddings and keep k by MMR"""
+        self._require_store()
         
-        return self.vector_store.similarity_search(query, k=k)
\ No newline at end of file
+        numpy_index = self.numpy_index
+        if numpy_index is not None:
+            hits = self._dense_search(embedding, fetch_k, numpy_index)
+            vectors = numpy_index.get_vectors([chunk_id for chunk_id, _ in hits])
+        else:
+            result = self.vector_store._collection.query(
+                query_embeddings=[embedding],
+                n_results=fetch_k,
+                include=["documents", "metadatas", "embeddings"]
+            )
+            hits = [
+                (chunk_id, Document(page_content=text, metadata=metadata or {}))
+                for chunk_id, text, metadata in zip(
+                    result["ids"][0], result["documents"][0], result["metadatas"][0]
+                )
+            ]
+            vectors = result["embeddings"][0]
+        
+        selected = maximal_marginal_relevance(embedding, vectors, k, lambda_mult)
+        return [hits[position] for position in selected]
+    
+    def get_documents_by_ids(self, ids: List[str]) -> List[Document]:
+        """Fetch stored chunks by ID, in the order requested"""
+        self._require_store()
+        
+        by_id = self._fetch_documents(ids, self.numpy_index)
+        return [by_id[chunk_id] for chunk_id in ids if chunk_id in by_id]
+    
+    def _fetch_documents(self, ids: List[str], numpy_index: Optional[NumpyVectorIndex]) -> Dict[str, Document]:
+        """Fetch stored chunks by ID from the given NumPy index, or from Chroma if None"""
+        if numpy_index is not None:
+            return {
+                chunk_id: Document(page_content=text, metadata=dict(metadata))
+                for chunk_id, (text, metadata) in numpy_index.get(ids).items()
+            }
+        result = self.vector_store.get(ids=list(ids), include=["documents", "metadatas"])
+        return {
+            chunk_id: Document(page_content=text, metadata=metadata or {})
+            for chunk_id, text, metadata in zip(result["ids"], result["documents"], result["metadatas"])
+        }
+
+    def close(self):
+        """Stop the hybrid search worker and close the dedup index"""
+        if self._search_executor:
+            self._search_executor.shutdown(wait=False)
+            self._search_executor = None
+        if self._deduplicator is not None:
+            self._deduplicator.close()
+            self._deduplicator = None
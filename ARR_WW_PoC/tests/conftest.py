@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Import src and benchmarks the way the benchmark scripts do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
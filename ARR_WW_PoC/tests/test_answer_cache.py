@@ -0,0 +1,95 @@
+"""
+Semantic answer cache: similarity threshold, generations, expiry and eviction
+"""
+
+import numpy as np
+import pytest
+
+from src import answer_cache
+from src.answer_cache import AnswerCache
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(answer_cache, "time", clock)
+    return clock
+
+def at_angle(radians: float):
+    return [float(np.cos(radians)), float(np.sin(radians))]
+
+def test_hit_needs_the_same_chunk_set_and_a_similar_query(tmp_path, clock):
+    cache = AnswerCache(str(tmp_path / "answers.sqlite3"), similarity=0.95)
+    cache.put("glacier floods?", [2.0, 0.0], ["c1", "c2"], "Outburst floods.", ["a.pdf"])
+    
+    # The chunk set is order-independent and embeddings are normalized
+    hit = cache.get(at_angle(0.3), ["c2", "c1", "c1"])
+    assert hit["answer"] == "Outburst floods." and hit["sources"] == ["a.pdf"]
+    assert hit["similarity"] == pytest.approx(np.cos(0.3), abs=1e-6)
+    # cos(0.33) is just under the threshold
+    assert cache.get(at_angle(0.33), ["c1", "c2"]) is None
+    assert cache.get([1.0, 0.0], ["c1"]) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+    
+    # The closest of several cached queries wins
+    cache.put("glacier lake floods?", at_angle(0.25), ["c1", "c2"], "Lake floods.", [])
+    assert cache.get(at_angle(0.2), ["c1", "c2"])["answer"] == "Lake floods."
+    cache.close()
+
+def test_generation_change_drops_every_entry(tmp_path, clock):
+    path = str(tmp_path / "answers.sqlite3")
+    cache = AnswerCache(path)
+    cache.check_generation("llm-a|embed|index-1")
+    cache.put("q", [1.0, 0.0], ["c1"], "old answer", [])
+    cache.check_generation("llm-a|embed|index-1")
+    assert cache.get([1.0, 0.0], ["c1"])["answer"] == "old answer"
+    cache.close()
+    
+    # The generation is persisted, so a restart keeps entries until it changes
+    cache = AnswerCache(path)
+    cache.check_generation("llm-a|embed|index-1")
+    assert cache.get([1.0, 0.0], ["c1"]) is not None
+    cache.check_generation("llm-a|embed|index-2")
+    assert cache.get([1.0, 0.0], ["c1"]) is None and cache.stats()["entries"] == 0
+    cache.close()
+    assert AnswerCache(path).generation == "llm-a|embed|index-2"
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    path = str(tmp_path / "answers.sqlite3")
+    cache = AnswerCache(path, ttl_seconds=60)
+    cache.put("q", [1.0, 0.0], ["c1"], "answer", [])
+    clock.now += 59
+    assert cache.get([1.0, 0.0], ["c1"]) is not None
+    clock.now += 2
+    assert cache.get([1.0, 0.0], ["c1"]) is None
+    cache.close()
+    # Expired rows are deleted on load
+    assert AnswerCache(path, ttl_seconds=60).stats()["entries"] == 0
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = AnswerCache(str(tmp_path / "answers.sqlite3"), max_entries=20)
+    for number in range(20):
+        clock.now += 1
+        cache.put(f"q{number}", [1.0, 0.0], [f"c{number}"], f"answer {number}", [])
+    # A hit refreshes the oldest entry
+    clock.now += 1
+    assert cache.get([1.0, 0.0], ["c0"]) is not None
+    
+    # Going over max_entries evicts the overflow plus a tenth of the budget
+    clock.now += 1
+    cache.put("q20", [1.0, 0.0], ["c20"], "answer 20", [])
+    assert cache.stats()["entries"] == 18
+    kept = [number for number in range(21) if cache.get([1.0, 0.0], [f"c{number}"]) is not None]
+    assert kept == [0] + list(range(4, 21))
+    cache.close()
+    
+    # The in-memory lookup matches the database after a reload
+    reloaded = AnswerCache(str(tmp_path / "answers.sqlite3"), max_entries=20)
+    assert reloaded.stats()["entries"] == 18
+    assert reloaded.get([1.0, 0.0], ["c1"]) is None and reloaded.get([1.0, 0.0], ["c0"]) is not None
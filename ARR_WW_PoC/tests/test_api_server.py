@@ -0,0 +1,132 @@
+"""
+API query coalescing, streaming fan-out and admission control
+"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from src.api_server import RAGApiServer, StreamBroadcast
+
+class GatedEngine:
+    """Holds every answer until `release` is set, counting the calls"""
+    
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.async_llm_client = self
+    
+    async def aprocess_query(self, query, history=None):
+        self.calls.append(query)
+        while not self.release.is_set():
+            await asyncio.sleep(0.005)
+        return {"success": True, "answer": f"answer to {query}"}
+    
+    def stream_query(self, query, history=None):
+        self.calls.append(query)
+        yield {"type": "delta", "content": "Glacier "}
+        self.release.wait(5)
+        yield {"type": "delta", "content": "floods"}
+        yield {"type": "done", "success": True, "answer": "Glacier floods"}
+    
+    async def close(self):
+        pass
+
+def serve(engine, test, **limits):
+    async def run():
+        server = RAGApiServer(rag_engine=engine, **limits)
+        async with TestClient(TestServer(server.create_app())) as client:
+            return await test(server, client)
+    return asyncio.run(run())
+
+async def post_all(client, path, bodies):
+    async def post(body):
+        response = await client.post(path, json=body)
+        return response.status, (await response.json() if path == "/query" else await response.text())
+    return [asyncio.ensure_future(post(body)) for body in bodies]
+
+def test_identical_queries_share_one_answer():
+    engine = GatedEngine()
+    
+    async def test(server, client):
+        tasks = await post_all(client, "/query", [
+            {"query": "Glacier floods?"},
+            {"query": "  glacier   FLOODS? "},
+            {"query": "glacier floods?", "session_id": "alice"},
+            {"query": "glacier floods?", "session_id": "alice"}
+        ])
+        await asyncio.sleep(0.1)
+        engine.release.set()
+        results = await asyncio.gather(*tasks)
+        assert server._inflight == {}
+        # A query after the shared answer completed runs again
+        await client.post("/query", json={"query": "glacier floods?"})
+        return server, results
+    
+    server, results = serve(engine, test)
+    assert [status for status, _ in results] == [200] * 4
+    assert results[0][1] == results[1][1] and results[0][1]["answer"] == "answer to Glacier floods?"
+    # Sessions coalesce only among themselves
+    assert engine.calls == ["Glacier floods?", "glacier floods?", "glacier floods?"]
+    assert server.coalesced == 2
+
+def test_streams_fan_out_to_late_subscribers():
+    engine = GatedEngine()
+    
+    async def test(server, client):
+        first = await post_all(client, "/query/stream", [{"query": "glacier floods"}])
+        while not engine.calls:
+            await asyncio.sleep(0.005)
+        # Joins after the first delta was published and replays it
+        await asyncio.sleep(0.05)
+        second = await post_all(client, "/query/stream", [{"query": "Glacier floods"}])
+        await asyncio.sleep(0.05)
+        engine.release.set()
+        results = await asyncio.gather(*first, *second)
+        return server, results
+    
+    server, results = serve(engine, test)
+    assert engine.calls == ["glacier floods"] and server.coalesced == 1
+    assert results[0] == results[1]
+    events = [json.loads(line[len("data: "):]) for line in results[0][1].splitlines() if line.startswith("data: ")]
+    assert [event["type"] for event in events] == ["delta", "delta", "done"]
+    assert server._inflight_streams == {}
+
+def test_full_queue_rejects_new_queries_but_not_coalesced_ones():
+    engine = GatedEngine()
+    
+    async def test(server, client):
+        tasks = await post_all(client, "/query", [{"query": "first"}])
+        await asyncio.sleep(0.05)
+        busy = await client.post("/query", json={"query": "second"})
+        tasks += await post_all(client, "/query", [{"query": "FIRST"}])
+        await asyncio.sleep(0.05)
+        engine.release.set()
+        return busy, await asyncio.gather(*tasks), server.admission.stats()
+    
+    busy, results, stats = serve(engine, test, max_concurrency=1, max_queue=0)
+    assert busy.status == 429 and busy.headers["Retry-After"]
+    assert [status for status, _ in results] == [200, 200]
+    assert stats == {"active": 0, "queued": 0, "rejected": 1}
+
+def test_broadcast_replays_events_to_each_subscriber():
+    async def run():
+        broadcast = StreamBroadcast()
+        broadcast.publish({"type": "delta", "content": "a"})
+        
+        async def collect():
+            return [event["content"] async for event in broadcast.subscribe()]
+        
+        early = asyncio.ensure_future(collect())
+        await asyncio.sleep(0)
+        broadcast.publish({"type": "delta", "content": "b"})
+        broadcast.close()
+        return await early, await collect()
+    
+    assert asyncio.run(run()) == (["a", "b"], ["a", "b"])
@@ -0,0 +1,74 @@
+"""
+Batch mode JSONL input parsing and resuming
+"""
+
+import json
+
+import pytest
+
+from src.batch import read_queries, completed_ids, run_batch
+
+def test_read_queries_accepts_strings_and_skips_non_objects(tmp_path, capsys):
+    path = tmp_path / "queries.jsonl"
+    path.write_text("\n".join([
+        '{"id": "a", "query": "What is GLOF?"}',
+        '"Bare string query"',
+        '["not", "a", "record"]',
+        '42',
+        '{"question": "Alias?"}',
+        '{"query": 7}',
+        'not json',
+        ''
+    ]), encoding="utf-8")
+    records = list(read_queries(str(path)))
+    assert records == [
+        {"id": "a", "query": "What is GLOF?"},
+        {"id": "2", "query": "Bare string query"},
+        {"id": "5", "query": "Alias?"}
+    ]
+    output = capsys.readouterr().out
+    assert "line 3: expected a JSON object or string, got list" in output
+    assert "line 4: expected a JSON object or string, got int" in output
+    assert "line 6: no query" in output
+
+def test_completed_ids_ignores_non_object_lines(tmp_path):
+    path = tmp_path / "results.jsonl"
+    path.write_text('{"id": "a", "success": true}\n[1, 2]\n"x"\n{"id": "b", "success": false}\n',
+                    encoding="utf-8")
+    assert completed_ids(str(path)) == {"a"}
+
+def test_failed_generation_is_retried_on_resume(tmp_path, monkeypatch):
+    pytest.importorskip("langchain_core")
+    from benchmarks.fakes import StubLLMServer
+    from src.config import config
+    from src.llm_client import LLMClient
+    from src.rag_engine import RAGEngine
+    
+    monkeypatch.setattr(config, "QUERY_CACHE_ENABLED", False)
+    monkeypatch.setattr(config, "ANSWER_CACHE_ENABLED", False)
+    monkeypatch.setattr(RAGEngine, "_initialize_vector_store", lambda self: None)
+    document = {"content": "Glacial lakes are monitored.", "source": "report.pdf", "page": 1,
+                "index": 1, "chunk_id": "c1", "citations": []}
+    # The first LLM request fails with a non-retryable error
+    server = StubLLMServer(latency_ms=0, errors=[400]).start()
+    engine = RAGEngine()
+    engine.llm_client = LLMClient(api_base=server.url, api_key="test", max_retries=0)
+    engine.embed_queries = lambda queries: [[0.0, 1.0] for _ in queries]
+    engine._retrieve_documents = lambda query, **kwargs: [document]
+    
+    input_path = tmp_path / "queries.jsonl"
+    output_path = tmp_path / "results.jsonl"
+    input_path.write_text('{"id": "a", "query": "first"}\n{"id": "b", "query": "second"}\n', encoding="utf-8")
+    try:
+        first = run_batch(str(input_path), str(output_path), workers=1, rag_engine=engine)
+        assert (first["succeeded"], first["failed"]) == (1, 1)
+        assert completed_ids(str(output_path)) == {"b"}
+        
+        resumed = run_batch(str(input_path), str(output_path), workers=1, rag_engine=engine)
+    finally:
+        engine.close()
+        server.stop()
+    assert (resumed["skipped"], resumed["succeeded"], resumed["failed"]) == (1, 1, 0)
+    results = [json.loads(line) for line in output_path.read_text(encoding="utf-8").splitlines()]
+    assert [(result["id"], result["success"]) for result in results] == [("a", False), ("b", True), ("a", True)]
+    assert "error" in results[0]["answer"].lower()
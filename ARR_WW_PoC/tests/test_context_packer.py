@@ -0,0 +1,57 @@
+"""
+Token-budgeted context packing: merging, near-duplicate removal, budget
+"""
+
+from src.context_packer import ContextPacker, _suffix_prefix_overlap, count_tokens
+
+def words(start: int, end: int, prefix: str = "glacier") -> str:
+    return " ".join(f"{prefix}{number}" for number in range(start, end))
+
+def doc(content: str, source: str = "a.pdf", page: int = 1, citations=None) -> dict:
+    return {"content": content, "source": source, "page": page, "citations": citations or []}
+
+def test_suffix_prefix_overlap():
+    assert _suffix_prefix_overlap("the lake outburst flood", "outburst flood risk", 5) == len("outburst flood")
+    assert _suffix_prefix_overlap("the lake", "outburst flood", 5) == 0
+    # Overlaps shorter than the minimum are not merges
+    assert _suffix_prefix_overlap("abc de", "de fgh", 5) == 0
+
+def test_overlapping_chunks_of_a_page_merge_in_rank_order():
+    packer = ContextPacker(max_tokens=10000, min_overlap=10)
+    first, second = words(0, 60), words(40, 100)
+    packed = packer.pack([
+        doc(second, citations=[{"source": "b.pdf", "page": 3}]),
+        doc(words(0, 50, "monsoon"), page=2),
+        doc(first, citations=[{"source": "c.pdf", "page": 1}]),
+        # Contained in the merged block
+        doc(words(45, 55))
+    ])
+    assert [(block["page"], block["index"]) for block in packed] == [(1, 1), (2, 2)]
+    assert packed[0]["content"] == words(0, 100)
+    assert packed[0]["citations"] == [{"source": "b.pdf", "page": 3}, {"source": "c.pdf", "page": 1}]
+
+def test_near_duplicate_from_another_source_is_dropped():
+    packer = ContextPacker(max_tokens=10000, duplicate_threshold=0.8)
+    passage = words(0, 80)
+    packed = packer.pack([
+        doc(passage, source="2023.pdf"),
+        doc(passage + " revised", source="2024.pdf"),
+        doc(words(0, 80, "monsoon"), source="2024.pdf")
+    ])
+    assert [block["source"] for block in packed] == ["2023.pdf", "2024.pdf"]
+    assert packed[1]["content"].startswith("monsoon0")
+
+def test_blocks_fill_the_budget_and_the_last_one_is_truncated():
+    documents = [doc(words(0, 100, f"topic{rank}x"), page=rank) for rank in range(5)]
+    block_tokens = count_tokens(documents[0]["content"]) + ContextPacker.SOURCE_PREFIX_TOKENS
+    # Two whole blocks, then 40 tokens for the third
+    packer = ContextPacker(max_tokens=2 * block_tokens + 40, min_block_tokens=32)
+    packed = packer.pack(documents)
+    assert [block["index"] for block in packed] == [1, 2, 3]
+    assert [block["content"] for block in packed[:2]] == [documents[0]["content"], documents[1]["content"]]
+    assert documents[2]["content"].startswith(packed[2]["content"])
+    assert count_tokens(packed[2]["content"]) <= 40 - packer.SOURCE_PREFIX_TOKENS
+    
+    # Nothing is added once less than min_block_tokens would be left
+    packer = ContextPacker(max_tokens=2 * block_tokens + 30, min_block_tokens=32)
+    assert len(packer.pack(documents)) == 2
@@ -0,0 +1,83 @@
+"""
+Near-duplicate groups when a file is edited
+"""
+
+import os
+import time
+
+import pytest
+
+from src.dedup import ChunkDeduplicator
+
+TEXT = " ".join(f"glacier lake outburst flood risk word{number}" for number in range(40))
+EDITED = TEXT.replace("word39", "word39 revised", 1)
+
+def test_edited_chunk_joins_its_old_group_unless_the_old_one_is_removed_first(tmp_path):
+    dedup = ChunkDeduplicator(str(tmp_path / "dedup.sqlite3"))
+    assert dedup.assign("old", TEXT, "report.pdf", 1) == "old"
+    # Assigned while the old chunk is still indexed, the edit collapses into it
+    assert dedup.assign("edited", EDITED, "report.pdf", 1) == "old"
+    dedup.reset()
+    
+    dedup.assign("old", TEXT, "report.pdf", 1)
+    assert dedup.remove(["old"]) == ["old"]
+    assert dedup.assign("edited", EDITED, "report.pdf", 1) == "edited"
+    assert not dedup.has_group("old")
+    assert dedup.citations(["edited"]) == {"edited": [{"source": "report.pdf", "page": 1}]}
+    dedup.close()
+
+def test_group_takes_no_new_members_once_its_stored_chunk_is_removed(tmp_path):
+    dedup = ChunkDeduplicator(str(tmp_path / "dedup.sqlite3"))
+    dedup.assign("old", TEXT, "a.pdf", 1)
+    assert dedup.assign("copy", TEXT, "b.pdf", 1) == "old"
+    # The copy still cites the stored chunk, so it is not deleted
+    assert dedup.remove(["old"]) == []
+    assert dedup.assign("edited", EDITED, "a.pdf", 1) == "edited"
+    assert dedup.remove(["copy"]) == ["old"]
+    dedup.close()
+
+class LengthEmbeddings:
+    def embed_documents(self, texts):
+        return [[float(len(text)), 1.0, 0.0] for text in texts]
+    
+    def embed_query(self, text):
+        return [1.0, 1.0, 0.0]
+
+def test_sync_stores_the_edited_text_of_a_changed_file(tmp_path, monkeypatch):
+    pytest.importorskip("langchain_community")
+    pytest.importorskip("chromadb")
+    from src import resources
+    from src.config import config
+    from src.vectorstore import VectorStoreManager
+    
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "DEDUP_ENABLED", True)
+    monkeypatch.setattr(config, "EMBEDDING_CACHE_ENABLED", False)
+    monkeypatch.setattr(config, "VECTOR_BACKEND", "chroma")
+    resources.set_embedding_model(LengthEmbeddings())
+    os.makedirs("data")
+    path = os.path.join("data", "report.txt")
+    
+    manager = VectorStoreManager()
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(TEXT)
+        manager.sync_documents("data")
+        old_ids = set(manager.vector_store.get(include=[])["ids"])
+        
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(EDITED)
+        future = time.time() + 10
+        os.utime(path, (future, future))
+        stats = manager.sync_documents("data")
+        
+        stored = manager.vector_store.get(include=["documents"])
+        assert stats["changed_files"] == 1
+        # The file spans several chunks; only the one holding the edit is
+        # replaced, and not collapsed into the text it replaces
+        assert any(text.endswith("word39 revised") for text in stored["documents"])
+        assert not any(text.endswith("word39") for text in stored["documents"])
+        assert len(old_ids - set(stored["ids"])) == 1
+        assert len(stored["ids"]) == len(old_ids)
+    finally:
+        manager.close()
@@ -0,0 +1,53 @@
+"""
+On-disk embedding cache: LRU eviction and the append-only index log
+"""
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from src.embedding_cache import EmbeddingCache, text_hash
+
+KEYS = {name: text_hash(name) for name in "abcde"}
+
+def vector(name: str):
+    return [float(ord(name)), 1.0]
+
+def log_lines(cache: EmbeddingCache) -> list:
+    with open(cache.index_path, encoding="utf-8") as f:
+        return f.read().splitlines()[1:]
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", max_entries=3)
+    cache.put_many({KEYS[name]: vector(name) for name in "abc"})
+    assert cache.get_many([KEYS["a"]]) == {KEYS["a"]: vector("a")}
+    cache.put_many({KEYS["d"]: vector("d")})
+    assert set(cache.get_many(list(KEYS.values()))) == {KEYS["a"], KEYS["c"], KEYS["d"]}
+
+def test_flush_appends_only_changes_and_reload_keeps_recency(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", max_entries=3)
+    cache.put_many({KEYS[name]: vector(name) for name in "abc"})
+    cache.flush()
+    assert len(log_lines(cache)) == 3
+    cache.get_many([KEYS["a"]])
+    cache.put_many({KEYS["d"]: vector("d")})
+    cache.flush()
+    # One line for the use of "a", one for "d" taking b's slot
+    assert len(log_lines(cache)) == 5
+    
+    reloaded = EmbeddingCache(str(tmp_path), "model", max_entries=3)
+    assert list(reloaded.entries) == [KEYS["c"], KEYS["a"], KEYS["d"]]
+    assert reloaded.get_many([KEYS["d"], KEYS["b"]]) == {KEYS["d"]: vector("d")}
+
+def test_torn_log_line_is_skipped_and_the_log_rewritten(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", max_entries=3)
+    cache.put_many({KEYS[name]: vector(name) for name in "ab"})
+    cache.flush()
+    cache.put_many({KEYS["c"]: vector("c")})
+    with open(cache.index_path, "a", encoding="utf-8") as f:
+        f.write(f"{KEYS['c']} 2")
+    
+    reloaded = EmbeddingCache(str(tmp_path), "model", max_entries=3)
+    assert list(reloaded.entries) == [KEYS["a"], KEYS["b"]]
+    reloaded.flush()
+    assert log_lines(reloaded) == [f"{KEYS['a']} 0", f"{KEYS['b']} 1"]
@@ -0,0 +1,29 @@
+"""
+Streaming ingest keeps its working memory bounded by the batch size
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("langchain_community")
+pytest.importorskip("chromadb")
+pytest.importorskip("pypdf")
+
+from benchmarks.bench_ingest_memory import run_isolated
+
+# Working set (tracemalloc peak minus what the ingest still holds afterwards)
+# allowed for UPSERT_BATCH_SIZE chunks of 384-dimensional embeddings and
+# their text, whatever the corpus size
+MAX_WORKING_SET_BYTES = 64 * 2**20
+
+def test_ingest_working_set_does_not_grow_with_corpus(tmp_path):
+    args = SimpleNamespace(pages_per_pdf=30, dim=384)
+    small = run_isolated(str(tmp_path / "small"), 6, args)
+    large = run_isolated(str(tmp_path / "large"), 24, args)
+    
+    assert large["chunks"] >= 3 * small["chunks"] > large["batch_size"]
+    assert large["working_set"] < MAX_WORKING_SET_BYTES
+    # A 4x larger corpus may not need more than 1.5x the memory (plus 1 MB of
+    # allocator noise); loading it all at once would need about 4x
+    assert large["working_set"] <= small["working_set"] * 1.5 + 2**20
@@ -0,0 +1,81 @@
+"""
+Background ingest retries of files that failed to index
+"""
+
+import time
+
+from src.config import config
+from src.ingest_worker import IngestWorker
+
+class FlakyWriter:
+    """Write side whose sync fails for the files in `broken`"""
+    
+    def __init__(self):
+        self.broken = {"b.txt": "corrupt"}
+        self.syncs = 0
+    
+    def sync_documents(self, data_dir):
+        self.syncs += 1
+        return {"added_chunks": 1, "deleted_chunks": 0, "dedup_chunks": 0,
+                "failed_files": dict(self.broken)}
+
+class ServingManager:
+    numpy_index = None
+    last_publish = None
+    
+    def __init__(self):
+        self.published = []
+    
+    def publish(self, numpy_index, lexical_index, vector_store=None):
+        self.published.append((numpy_index, lexical_index, vector_store))
+
+def test_failed_files_are_reported_and_retried(tmp_path):
+    for name in ("a.txt", "b.txt"):
+        (tmp_path / name).write_text(f"{name} text")
+    worker = IngestWorker(ServingManager(), str(tmp_path), poll_seconds=0.05)
+    worker.writer = FlakyWriter()
+    worker._publish = lambda: None
+    
+    files = worker._scan()
+    worker._ingest(files)
+    # The failed file is not marked indexed, so it stays pending
+    assert set(worker._indexed) == {"a.txt"}
+    assert worker.pending == {"b.txt": "new"}
+    status = worker.status()
+    assert status["failed_files"] == {"b.txt": {"error": "corrupt", "attempts": 1}}
+    assert "b.txt" in status["last_error"]
+    
+    # Not retried until the backoff has passed, unless the file changes
+    assert not worker._due(files)
+    time.sleep(0.15)
+    assert worker._due(files)
+    
+    worker.writer.broken = {}
+    worker._ingest(files)
+    assert set(worker._indexed) == {"a.txt", "b.txt"}
+    assert worker.pending == {}
+    assert worker.status()["failed_files"] == {}
+    assert worker.last_error is None
+
+class Collection:
+    def count(self):
+        return 3
+
+class ChromaStore:
+    _collection = Collection()
+
+class ChromaWriter:
+    vector_store = ChromaStore()
+    
+    def export_numpy_index(self):
+        raise AssertionError("publishing must not re-export the collection")
+
+def test_chroma_publish_swaps_the_collection_without_exporting(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "VECTOR_BACKEND", "chroma")
+    monkeypatch.setattr(config, "RETRIEVAL_MODE", "dense")
+    serving = ServingManager()
+    worker = IngestWorker(serving, str(tmp_path))
+    worker.writer = ChromaWriter()
+    worker._publish()
+    assert serving.published == [(None, None, worker.writer.vector_store)]
+    assert worker.publishes == 1
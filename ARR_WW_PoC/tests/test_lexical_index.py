@@ -0,0 +1,143 @@
+"""
+BM25 lexical index: impact-ordered search, persistence and rank fusion
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from src.config import config
+from src.lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+
+WORDS = [f"w{number}" for number in range(60)]
+
+def random_index(path: str = "", count: int = 600, seed: int = 0) -> LexicalIndex:
+    rng = random.Random(seed)
+    index = LexicalIndex(path)
+    # Skewed word frequencies so terms have long and short postings
+    texts = [" ".join(WORDS[int(len(WORDS) * rng.random() ** 2)] for _ in range(rng.randint(3, 30)))
+             for _ in range(count)]
+    index.add([f"chunk-{number}" for number in range(count)], texts)
+    return index
+
+def brute_force(index: LexicalIndex, query: str, k: int):
+    """Score every live chunk from its postings"""
+    n = index.live_count
+    avg_length = index.total_length / n
+    scores = {}
+    for term in set(tokenize(query)):
+        entry = index._get_postings(term)
+        if entry is None or (len(index.doc_ids) > 100 and len(entry[0]) > index.max_df_ratio * len(index.doc_ids)):
+            continue
+        docs, tfs = entry
+        idf = np.log(1.0 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+        for doc, weight in zip(docs.tolist(), index._weights(tfs, docs, avg_length).tolist()):
+            if not index.deleted[doc]:
+                scores[doc] = scores.get(doc, 0.0) + idf * weight
+    return sorted(scores.values(), reverse=True)[:k]
+
+def assert_matches_brute_force(index: LexicalIndex, queries, k: int = 10):
+    for query in queries:
+        hits = index.search(query, k)
+        assert [score for _, score in hits] == pytest.approx(brute_force(index, query, k), rel=1e-5), query
+        assert all(index.doc_numbers.get(chunk_id) is not None for chunk_id, _ in hits)
+
+def test_pruned_search_returns_the_exact_top_k():
+    index = random_index()
+    rng = random.Random(1)
+    queries = [" ".join(rng.sample(WORDS, rng.randint(1, 4))) for _ in range(40)]
+    # Small prefix and no full-scoring shortcut, so pruning is exercised
+    index.exhaustive_postings = 0
+    search = index.search
+    index.search = lambda query, k: search(query, k, prefix=8)
+    assert_matches_brute_force(index, queries)
+    
+    # Tombstones are skipped, and orders go stale once the average length moves
+    index.remove([f"chunk-{number}" for number in range(0, 600, 3)])
+    index.add(["late"], [" ".join(["w59"] * 40)])
+    assert_matches_brute_force(index, queries + ["w59"])
+    assert index.search("w59", 1)[0][0] == "late"
+    
+    index.exhaustive_postings = 10 ** 9
+    assert_matches_brute_force(index, queries)
+
+def test_orders_and_fingerprint_survive_save_and_compaction(tmp_path):
+    path = str(tmp_path / "lexical.npz")
+    index = random_index(path, count=1500)
+    index.fingerprint = "abc"
+    index.search("w3 w7", 5)
+    # Removing a third of the chunks compacts the index and renumbers them
+    index.remove([f"chunk-{number}" for number in range(500)])
+    assert len(index.doc_ids) == 1000
+    assert_matches_brute_force(index, ["w3 w7", "w0 w12 w40"])
+    index.save()
+    
+    loaded = LexicalIndex.load(path)
+    assert loaded.fingerprint == "abc"
+    assert set(loaded.orders) == set(loaded.postings)
+    loaded.exhaustive_postings = 0
+    assert_matches_brute_force(loaded, ["w3 w7", "w0 w12 w40", "w59"])
+    assert [score for _, score in loaded.search("w3 w7", 5)] == [score for _, score in index.search("w3 w7", 5)]
+
+def test_reciprocal_rank_fusion_favours_chunks_ranked_by_both():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["a", "c", "d"]], k=60)
+    assert [chunk_id for chunk_id, _ in fused] == ["a", "c", "b", "d"]
+    assert fused[1][1] == pytest.approx(1 / 63 + 1 / 62)
+
+def test_index_saved_for_another_manifest_is_rebuilt(tmp_path, monkeypatch):
+    pytest.importorskip("langchain_core")
+    from src.manifest import IndexManifest
+    from src.numpy_index import NumpyIndexWriter, NumpyVectorIndex
+    from src.vectorstore import VectorStoreManager
+    
+    monkeypatch.setattr(config, "RETRIEVAL_MODE", "hybrid")
+    monkeypatch.setattr(config, "MANIFEST_PATH", str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(config, "LEXICAL_INDEX_PATH", str(tmp_path / "lexical.npz"))
+    ids = ["a", "b"]
+    writer = NumpyIndexWriter(str(tmp_path / "numpy"), 2, 2, "none")
+    writer.add(ids, np.eye(2, dtype=np.float32), ["fresh text", "other text"], [None, None])
+    writer.commit()
+    manifest = IndexManifest(config.MANIFEST_PATH)
+    manifest.set_file("a.txt", "hash-1", ids)
+    manifest.save()
+    
+    # Same chunk count as the store, but built before the last edit
+    stale = LexicalIndex(config.LEXICAL_INDEX_PATH)
+    stale.add(ids, ["stale text", "other text"])
+    stale.fingerprint = "older manifest"
+    manager = VectorStoreManager()
+    manager._view = (NumpyVectorIndex(str(tmp_path / "numpy")), stale)
+    manager._check_lexical_index()
+    assert manager.lexical_index is not stale
+    assert manager.lexical_index.search("fresh", 1)[0][0] == "a"
+    assert manager.lexical_index.fingerprint == IndexManifest.digest(config.MANIFEST_PATH)
+    
+    current = manager.lexical_index
+    manager._check_lexical_index()
+    assert manager.lexical_index is current
+
+def test_hybrid_search_fuses_dense_and_lexical_rankings(tmp_path, monkeypatch):
+    pytest.importorskip("langchain_core")
+    from src.numpy_index import NumpyIndexWriter, NumpyVectorIndex
+    from src.vectorstore import VectorStoreManager
+    
+    monkeypatch.setattr(config, "HYBRID_CANDIDATE_MULTIPLIER", 1)
+    ids = ["both", "dense", "dense-2", "lexical"]
+    texts = ["glacier outburst floods", "rainfall records", "rainfall trends", "glacier outburst glacier outburst"]
+    # Unit vectors at decreasing similarity to the query [1, 0]
+    angles = np.array([0.0, 0.1, 0.2, 1.5])
+    writer = NumpyIndexWriter(str(tmp_path / "numpy"), 4, 2, "none")
+    writer.add(ids, np.stack([np.cos(angles), np.sin(angles)], axis=1).astype(np.float32), texts, [None] * 4)
+    writer.commit()
+    lexical = LexicalIndex("")
+    lexical.add(ids, texts)
+    manager = VectorStoreManager()
+    manager._view = (NumpyVectorIndex(str(tmp_path / "numpy")), lexical)
+    
+    hits = manager.hybrid_search_with_ids("glacier outburst", [1.0, 0.0], k=3)
+    # Ranked by both comes first; the lexical-only hit is fetched from the
+    # store although it is outside the dense candidates
+    assert [chunk_id for chunk_id, _ in hits] == ["both", "lexical", "dense"]
+    assert hits[1][1].page_content == texts[3]
+    manager.close()
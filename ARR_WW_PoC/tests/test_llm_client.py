@@ -0,0 +1,195 @@
+"""
+LLMClient against the local OpenAI-compatible stub server
+"""
+
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+# The stub server lives beside FakeEmbeddings, a langchain Embeddings
+pytest.importorskip("langchain_core")
+
+from benchmarks.fakes import StubLLMServer
+from src.llm_client import LLMClient, AsyncLLMClient, RequestBudget
+
+@pytest.fixture
+def start_server():
+    servers = []
+    
+    def start(**kwargs) -> StubLLMServer:
+        server = StubLLMServer(**kwargs).start()
+        servers.append(server)
+        return server
+    
+    yield start
+    for server in servers:
+        server.stop()
+
+def make_client(server: StubLLMServer, **kwargs) -> LLMClient:
+    kwargs.setdefault("backoff_base", 0.01)
+    return LLMClient(api_base=server.url, api_key="test", **kwargs)
+
+def test_stream_chat_decodes_raw_utf8(start_server):
+    answer = "Thimphu – café ’ok Ḏzongkha ཇོང་ཁ"
+    server = start_server(latency_ms=0, answer=answer, tokens=len(answer.split()))
+    client = make_client(server)
+    try:
+        deltas = list(client.stream_chat([{"role": "user", "content": "hi"}]))
+    finally:
+        client.close()
+    assert len(deltas) == len(answer.split())
+    assert "".join(deltas).strip() == answer
+
+def test_closing_a_stream_early_releases_its_slot(start_server):
+    server = start_server(latency_ms=0, tokens=20, token_ms=50)
+    client = make_client(server, max_concurrency=1)
+    try:
+        stream = client.stream_chat([{"role": "user", "content": "hi"}])
+        assert next(stream)
+        assert not client._slots.acquire(blocking=False)
+        stream.close()
+        assert client._slots.acquire(blocking=False)
+        client._slots.release()
+    finally:
+        client.close()
+
+def test_cancelled_hedge_gives_its_slot_back(start_server):
+    server = start_server(latency_ms=0)
+    client = make_client(server, hedge_after_seconds=0.05, max_concurrency=1)
+    try:
+        # The only executor thread is busy, so the hedge is still queued when
+        # the winner cancels it; chat() hands it the slot it took
+        client._hedge_executor.submit(time.sleep, 0.2)
+        assert client._slots.acquire(blocking=False)
+        hedge = client._hedge_executor.submit(client._complete, {}, True)
+        hedge.add_done_callback(client._release_if_cancelled)
+        assert hedge.cancel()
+        assert client._slots.acquire(blocking=False)
+        assert server.requests == 0
+    finally:
+        client.close()
+
+def test_retry_honours_retry_after(start_server):
+    server = start_server(latency_ms=0, errors=[429], retry_after="0.3")
+    client = make_client(server, max_retries=2)
+    try:
+        answer = client.chat([{"role": "user", "content": "hi"}])
+    finally:
+        client.close()
+    assert answer
+    assert server.requests == 2
+    assert server.arrivals[1] - server.arrivals[0] >= 0.3
+
+def test_retries_exhausted_raises_last_error(start_server):
+    server = start_server(latency_ms=0, errors=[503] * 10)
+    client = make_client(server, max_retries=2)
+    try:
+        with pytest.raises(requests.exceptions.HTTPError) as excinfo:
+            client.chat([{"role": "user", "content": "hi"}])
+    finally:
+        client.close()
+    assert excinfo.value.response.status_code == 503
+    assert server.requests == 3
+
+def test_non_retryable_status_is_not_retried(start_server):
+    server = start_server(latency_ms=0, errors=[400])
+    client = make_client(server, max_retries=3)
+    try:
+        with pytest.raises(requests.exceptions.HTTPError):
+            client.chat([{"role": "user", "content": "hi"}])
+    finally:
+        client.close()
+    assert server.requests == 1
+
+def test_hedge_returns_fast_copy_and_abandons_slow_one(start_server):
+    server = start_server(latency_ms=0, latencies_ms=[2000])
+    client = make_client(server, hedge_after_seconds=0.1, max_concurrency=2)
+    try:
+        start = time.monotonic()
+        answer = client.chat([{"role": "user", "content": "hi"}])
+        elapsed = time.monotonic() - start
+        assert answer
+        assert server.requests == 2
+        assert elapsed < 1.0
+        # The slow primary gives its concurrency slot back once it completes
+        assert all(client._slots.acquire(timeout=5) for _ in range(2))
+    finally:
+        client.close()
+
+def test_no_hedge_when_primary_is_fast(start_server):
+    server = start_server(latency_ms=0)
+    client = make_client(server, hedge_after_seconds=0.5)
+    try:
+        assert client.chat([{"role": "user", "content": "hi"}])
+    finally:
+        client.close()
+    assert server.requests == 1
+
+def test_hedge_skipped_at_concurrency_cap(start_server):
+    server = start_server(latency_ms=300)
+    client = make_client(server, hedge_after_seconds=0.05, max_concurrency=1)
+    try:
+        assert client.chat([{"role": "user", "content": "hi"}])
+    finally:
+        client.close()
+    assert server.requests == 1
+
+def test_sync_and_async_clients_share_one_concurrency_cap(start_server):
+    server = start_server(latency_ms=200)
+    client = make_client(server, max_concurrency=2)
+    async_client = AsyncLLMClient(api_base=server.url, api_key="test", budget=client.budget)
+    messages = [{"role": "user", "content": "hi"}]
+    
+    async def run_async():
+        try:
+            return await asyncio.gather(*(async_client.chat(messages) for _ in range(2)))
+        finally:
+            await async_client.close()
+    
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            start = time.monotonic()
+            sync_answers = [pool.submit(client.chat, messages) for _ in range(2)]
+            async_answers = asyncio.run(run_async())
+            assert all(future.result() for future in sync_answers) and all(async_answers)
+            elapsed = time.monotonic() - start
+    finally:
+        client.close()
+    # Four 200 ms requests through two shared slots take two rounds
+    assert server.requests == 4
+    assert elapsed >= 0.38
+
+def test_async_waiters_hold_no_executor_threads():
+    budget = RequestBudget(max_concurrency=1)
+    
+    async def run():
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=1))
+        budget.slots.acquire()
+        waiters = [asyncio.create_task(budget.acquire_async()) for _ in range(5)]
+        await asyncio.sleep(0.02)
+        # The single executor thread is still free while they wait
+        assert await asyncio.wait_for(loop.run_in_executor(None, lambda: "free"), 1) == "free"
+        waiters[0].cancel()
+        budget.release()
+        for waiter in waiters[1:]:
+            await asyncio.wait_for(waiter, 1)
+            budget.release()
+        # A cancelled waiter does not keep the slot
+        assert budget.slots.acquire(blocking=False)
+    
+    asyncio.run(run())
+
+def test_close_sync_closes_async_session(start_server):
+    server = start_server(latency_ms=0)
+    async_client = AsyncLLMClient(api_base=server.url, api_key="test")
+    loop = asyncio.new_event_loop()
+    try:
+        assert loop.run_until_complete(async_client.chat([{"role": "user", "content": "hi"}]))
+        async_client.close_sync()
+        assert async_client._session.closed
+    finally:
+        loop.close()
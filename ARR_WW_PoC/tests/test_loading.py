@@ -0,0 +1,66 @@
+"""
+Parallel document loading and splitting in the ingest process pool
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("langchain_community")
+
+from src.config import config
+from src.vectorstore import VectorStoreManager, _bounded_map
+
+def test_bounded_map_keeps_input_order_and_caps_tasks_in_flight():
+    lock = threading.Lock()
+    running = [0, 0]  # now, peak
+    
+    def work(number):
+        with lock:
+            running[0] += 1
+            running[1] = max(running[1], running[0])
+        # Later tasks finish first
+        time.sleep(0.02 * (10 - number) / 10)
+        with lock:
+            running[0] -= 1
+        return number
+    
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = []
+        for result in _bounded_map(executor, work, range(10), window=3):
+            results.append(result)
+            time.sleep(0.01)
+    assert results == list(range(10))
+    assert running[1] <= 3
+
+def chunks_by_file(manager: VectorStoreManager, files):
+    return [(filename, [(chunk.metadata["chunk_id"], chunk.page_content) for chunk in chunks])
+            for filename, chunks in manager.iter_file_chunks(files)]
+
+def test_process_pool_yields_the_same_chunks_in_input_order(tmp_path, monkeypatch):
+    files = {}
+    for number in range(5):
+        path = tmp_path / f"report-{number}.txt"
+        path.write_text(" ".join(f"monsoon glacier {number}-{word}" for word in range(200 * (5 - number))),
+                        encoding="utf-8")
+        files[path.name] = str(path)
+    manager = VectorStoreManager()
+    
+    monkeypatch.setattr(config, "INGEST_WORKERS", 1)
+    serial = chunks_by_file(manager, files)
+    monkeypatch.setattr(config, "INGEST_WORKERS", 3)
+    parallel = chunks_by_file(manager, files)
+    assert [filename for filename, _ in parallel] == list(files)
+    assert parallel == serial
+    assert all(len(chunks) > 1 for _, chunks in serial)
+
+def test_unreadable_file_is_skipped_by_the_pool(tmp_path, monkeypatch):
+    good = tmp_path / "good.txt"
+    good.write_text("glacier lake outburst", encoding="utf-8")
+    files = {"good.txt": str(good), "missing.txt": os.path.join(str(tmp_path), "missing.txt")}
+    monkeypatch.setattr(config, "INGEST_WORKERS", 2)
+    # sync_documents reports files the pool never yields as failed
+    assert [filename for filename, _ in VectorStoreManager().iter_files(files)] == ["good.txt"]
@@ -0,0 +1,60 @@
+"""
+Per-stage latency spans, percentiles and exports
+"""
+
+import json
+import time
+
+import pytest
+
+from src.metrics import Histogram, Metrics
+
+def test_percentiles_are_nearest_rank_over_the_window():
+    histogram = Histogram(max_samples=100)
+    for millis in range(1, 201):
+        histogram.observe(millis / 1000)
+    # Only the last 100 samples are kept; count and sum cover all of them
+    assert histogram.percentile(50) == pytest.approx(0.150)
+    assert histogram.percentile(99) == pytest.approx(0.199)
+    assert histogram.percentile(100) == pytest.approx(0.200)
+    assert histogram.count == 200
+    assert histogram.total == pytest.approx(sum(range(1, 201)) / 1000)
+    assert Histogram(10).percentile(50) == 0.0
+
+def test_span_records_the_stage_and_fills_timings():
+    metrics = Metrics()
+    timings = {}
+    with pytest.raises(ValueError):
+        with metrics.span("retrieval", timings):
+            time.sleep(0.01)
+            raise ValueError("failed stages are still timed")
+    assert timings["retrieval"] >= 10
+    summary = metrics.summary()["retrieval"]
+    assert summary["count"] == 1
+    assert summary["p50_ms"] == pytest.approx(timings["retrieval"], abs=0.01)
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics(enabled=False)
+    timings = {}
+    with metrics.span("llm", timings):
+        pass
+    metrics.observe("llm", 1.0)
+    assert timings == {} and metrics.summary() == {}
+
+def test_exports_cover_every_stage():
+    metrics = Metrics()
+    metrics.observe("llm", 0.5)
+    metrics.observe("llm", 1.5)
+    metrics.observe("vector_search", 0.002)
+    
+    prometheus = metrics.to_prometheus()
+    assert 'rag_stage_duration_seconds{stage="llm",quantile="0.5"} 0.500000' in prometheus
+    assert 'rag_stage_duration_seconds_sum{stage="llm"} 2.000000' in prometheus
+    assert 'rag_stage_duration_seconds_count{stage="vector_search"} 1' in prometheus
+    
+    lines = [json.loads(line) for line in metrics.to_json_lines().splitlines()]
+    assert [line["stage"] for line in lines] == ["llm", "vector_search"]
+    assert lines[0]["mean_ms"] == 1000.0 and lines[0]["p99_ms"] == 1500.0
+    
+    metrics.reset()
+    assert metrics.summary() == {}
@@ -0,0 +1,66 @@
+"""
+Maximal marginal relevance selection for diverse retrieval
+"""
+
+import numpy as np
+import pytest
+
+from src.mmr import maximal_marginal_relevance
+
+def pairwise_mmr(query, candidates, k, lambda_mult):
+    """Reference MMR recomputing similarity to every selected candidate"""
+    unit = candidates / np.linalg.norm(candidates, axis=1, keepdims=True)
+    relevance = unit @ (query / np.linalg.norm(query))
+    selected = []
+    while len(selected) < min(k, len(unit)):
+        best, best_score = None, -np.inf
+        for position in range(len(unit)):
+            if position in selected:
+                continue
+            redundancy = max((unit[position] @ unit[other] for other in selected), default=0.0)
+            score = relevance[position] if not selected else (
+                lambda_mult * relevance[position] - (1 - lambda_mult) * redundancy)
+            if score > best_score:
+                best, best_score = position, score
+        selected.append(best)
+    return selected
+
+@pytest.mark.parametrize("lambda_mult", [0.0, 0.3, 0.5, 0.9])
+def test_matches_pairwise_reference(lambda_mult):
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        candidates = rng.normal(size=(30, 8))
+        query = rng.normal(size=8)
+        assert maximal_marginal_relevance(query, candidates, 6, lambda_mult) == \
+            pairwise_mmr(query, candidates, 6, lambda_mult)
+
+def test_near_duplicates_give_way_to_a_different_candidate():
+    query = [1.0, 0.0]
+    candidates = [[1.0, 0.05], [1.0, 0.06], [0.8, -0.6]]
+    assert maximal_marginal_relevance(query, candidates, 2, lambda_mult=0.5) == [0, 2]
+    # lambda_mult=1 is plain relevance order
+    assert maximal_marginal_relevance(query, candidates, 2, lambda_mult=1.0) == [0, 1]
+
+def test_degenerate_inputs():
+    assert maximal_marginal_relevance([1.0, 0.0], [], 3) == []
+    assert maximal_marginal_relevance([1.0, 0.0], [[1.0, 0.0]], 0) == []
+    # k beyond the candidates returns each once; zero vectors do not divide by zero
+    assert sorted(maximal_marginal_relevance([1.0, 0.0], [[0.0, 0.0], [0.0, 1.0]], 5)) == [0, 1]
+
+def test_mmr_search_returns_diverse_stored_chunks(tmp_path):
+    pytest.importorskip("langchain_core")
+    from src.numpy_index import NumpyIndexWriter, NumpyVectorIndex
+    from src.vectorstore import VectorStoreManager
+    
+    ids = ["flood", "flood-copy", "drought"]
+    vectors = np.array([[1.0, 0.05], [1.0, 0.06], [0.8, -0.6]], dtype=np.float32)
+    writer = NumpyIndexWriter(str(tmp_path / "numpy"), 3, 2, "none")
+    writer.add(ids, vectors / np.linalg.norm(vectors, axis=1, keepdims=True),
+               ["glacier flood", "glacier flood again", "monsoon drought"], [None] * 3)
+    writer.commit()
+    manager = VectorStoreManager()
+    manager.numpy_index = NumpyVectorIndex(str(tmp_path / "numpy"))
+    
+    hits = manager.mmr_search_with_ids([1.0, 0.0], k=2, fetch_k=3)
+    assert [chunk_id for chunk_id, _ in hits] == ["flood", "drought"]
+    assert hits[1][1].page_content == "monsoon drought"
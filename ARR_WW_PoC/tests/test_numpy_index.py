@@ -0,0 +1,45 @@
+"""
+Memory-mapped NumPy vector index export and lookups
+"""
+
+import numpy as np
+
+from src.numpy_index import NumpyIndexWriter, NumpyVectorIndex
+
+def write_index(path, count: int = 50, dim: int = 8, quantization: str = "none"):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(count, dim)).astype(np.float32)
+    ids = [f"chunk-{number:03d}" for number in range(count)][::-1]
+    writer = NumpyIndexWriter(str(path), count, dim, quantization)
+    # Two batches, the second without metadata
+    writer.add(ids[:20], vectors[:20], [f"Thimphu café {number}" for number in range(20)],
+               [{"source": "a.pdf", "page": number} for number in range(20)])
+    writer.add(ids[20:], vectors[20:], [f"Thimphu café {number}" for number in range(20, count)],
+               [None] * (count - 20))
+    writer.commit()
+    return ids, vectors
+
+def test_ids_and_metadata_are_memory_mapped(tmp_path):
+    ids, _ = write_index(tmp_path / "index")
+    index = NumpyVectorIndex(str(tmp_path / "index"))
+    # Shared through the page cache like the vectors, not parsed per process
+    for array in (index.ids, index.sorted_ids, index.sorted_rows, index.metadata_offsets, index.metadata):
+        assert isinstance(array, np.memmap)
+    assert not hasattr(index, "metadatas")
+    assert index.get([ids[3], ids[30], "missing"]) == {
+        ids[3]: ("Thimphu café 3", {"source": "a.pdf", "page": 3}),
+        ids[30]: ("Thimphu café 30", {})
+    }
+
+def test_search_returns_chunk_ids(tmp_path):
+    for quantization in ("none", "int8"):
+        ids, vectors = write_index(tmp_path / quantization, quantization=quantization)
+        index = NumpyVectorIndex(str(tmp_path / quantization))
+        assert index.search(vectors[7], 3)[0][0] == ids[7]
+        assert index.get_vectors([ids[1]]).shape == (1, 8)
+
+def test_exists_rejects_older_layout(tmp_path):
+    write_index(tmp_path / "index")
+    assert NumpyVectorIndex.exists(str(tmp_path / "index"))
+    (tmp_path / "index" / "index.json").write_text('{"count": 0, "dim": 8, "ids": [], "metadatas": []}')
+    assert not NumpyVectorIndex.exists(str(tmp_path / "index"))
@@ -0,0 +1,66 @@
+"""
+Query embedding and retrieval result caches
+"""
+
+import sys
+import time
+
+import pytest
+
+from src.query_cache import LRUTTLCache, QueryCache
+
+EMBEDDING = [0.1, 0.2, 0.3]
+
+def test_results_of_a_search_that_raced_an_index_update_are_dropped():
+    cache = QueryCache(max_bytes=1 << 20, ttl_seconds=60)
+    cache.check_version(1)
+    # A search starts at version 1; the index changes and another query
+    # sees version 2 before the first one stores its results
+    cache.check_version(2)
+    cache.put_results(EMBEDDING, 5, ["stale"], index_version=1)
+    assert cache.get_results(EMBEDDING, 5, 2) is None
+    
+    cache.put_results(EMBEDDING, 5, ["fresh"], index_version=2)
+    assert cache.get_results(EMBEDDING, 5, 2) == ("fresh",)
+    assert cache.get_results(EMBEDDING, 5, 1) is None
+
+def test_entries_expire_after_their_ttl():
+    cache = LRUTTLCache(max_bytes=1 << 20, ttl_seconds=0.05)
+    cache.put("key", "value")
+    assert cache.get("key") == "value"
+    time.sleep(0.06)
+    assert cache.get("key") is None
+    assert cache.stats()["entries"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_least_recently_used_entries_are_evicted_over_the_byte_budget():
+    # Room for three entries; keys are charged too
+    entry_bytes = 50 + sys.getsizeof("a")
+    cache = LRUTTLCache(max_bytes=3 * entry_bytes, ttl_seconds=60, sizeof=lambda value: 50)
+    for key in "abc":
+        cache.put(key, key)
+    assert cache.get("a") == "a"
+    cache.put("d", "d")
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == ["a", "c", "d"]
+    assert cache.current_bytes == 3 * entry_bytes
+    
+    # A value larger than the whole budget is not cached at all
+    small = LRUTTLCache(max_bytes=10, ttl_seconds=60)
+    small.put("huge", "x" * 1000)
+    assert small.get("huge") is None and small.current_bytes == 0
+
+def test_store_change_drops_results_but_keeps_query_embeddings():
+    cache = QueryCache(max_bytes=1 << 20, ttl_seconds=60)
+    cache.check_version(1)
+    cache.put_embedding("What  is GLOF?", EMBEDDING)
+    cache.put_results(EMBEDDING, 5, ["chunk-1"], index_version=1)
+    # Queries differing only in case and spacing share the embedding
+    assert cache.get_embedding("what is glof?") == pytest.approx(EMBEDDING)
+    assert cache.get_results(EMBEDDING, 5, 1) == ("chunk-1",)
+    assert cache.get_results(EMBEDDING, 3, 1) is None
+    
+    cache.check_version(2)
+    assert cache.get_results(EMBEDDING, 5, 2) is None
+    assert cache.results.stats()["entries"] == 0
+    assert cache.get_embedding("what is glof?") == pytest.approx(EMBEDDING)
@@ -0,0 +1,41 @@
+"""
+Shared embedding model loading
+"""
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from src import resources, embedding_service
+from src.config import config
+
+class FakeHuggingFaceEmbeddings:
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+@pytest.fixture
+def fresh_resources(monkeypatch):
+    monkeypatch.setattr(resources, "_embedding_model", None)
+    monkeypatch.setattr(resources, "_embedding_runtime", None)
+    monkeypatch.setattr(resources, "_embedding_cache", None)
+    monkeypatch.setattr(config, "EMBEDDING_BATCH_MAX_SIZE", 1)
+
+def test_runtime_tag_follows_the_onnx_fallback(fresh_resources, monkeypatch, tmp_path):
+    community = pytest.importorskip("langchain_community.embeddings")
+    
+    def unavailable(variant, model_name=config.EMBEDDING_MODEL):
+        raise ImportError("No module named 'onnxruntime'")
+    
+    monkeypatch.setattr(embedding_service, "load_onnx_embeddings", unavailable)
+    monkeypatch.setattr(community, "HuggingFaceEmbeddings", FakeHuggingFaceEmbeddings)
+    monkeypatch.setattr(config, "EMBEDDING_RUNTIME", "onnx-int8")
+    monkeypatch.setattr(config, "EMBEDDING_CACHE_DIR", str(tmp_path))
+    
+    assert isinstance(resources.get_embedding_model(), FakeHuggingFaceEmbeddings)
+    assert resources.get_embedding_runtime() == "torch"
+    # PyTorch vectors go to the PyTorch cache, not the ONNX one
+    assert resources.get_embedding_cache().model_name == config.EMBEDDING_MODEL
+
+def test_set_embedding_model_sets_runtime(fresh_resources):
+    resources.set_embedding_model(FakeHuggingFaceEmbeddings("fake"), runtime="onnx")
+    assert resources.get_embedding_runtime() == "onnx"
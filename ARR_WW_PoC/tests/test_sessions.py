@@ -0,0 +1,46 @@
+"""
+Session history ordering across concurrent queries
+"""
+
+import asyncio
+
+from src.sessions import SessionManager
+
+class SlowEngine:
+    """Answers after a delay, recording the history each query saw"""
+    
+    def __init__(self):
+        self.histories = []
+    
+    async def aprocess_query(self, query, history=None):
+        self.histories.append([message["content"] for message in history or []])
+        await asyncio.sleep(0.05)
+        return {"success": True, "answer": f"answer to {query}"}
+
+def test_async_queries_of_one_session_are_serialized():
+    engine = SlowEngine()
+    sessions = SessionManager(rag_engine=engine)
+    
+    async def run():
+        return await asyncio.gather(*(sessions.aprocess_query("alice", f"q{number}") for number in range(3)))
+    
+    results = asyncio.run(run())
+    assert [result["answer"] for result in results] == ["answer to q0", "answer to q1", "answer to q2"]
+    # Each query saw every earlier turn, so none ran concurrently with another
+    assert [len(history) for history in engine.histories] == [0, 2, 4]
+    assert len(sessions.get_session("alice").turns) == 6
+
+def test_async_queries_of_different_sessions_overlap():
+    engine = SlowEngine()
+    sessions = SessionManager(rag_engine=engine)
+    
+    async def run():
+        await asyncio.gather(*(sessions.aprocess_query(f"user{number}", "q") for number in range(5)))
+    
+    loop = asyncio.new_event_loop()
+    try:
+        start = loop.time()
+        loop.run_until_complete(run())
+        assert loop.time() - start < 0.2
+    finally:
+        loop.close()
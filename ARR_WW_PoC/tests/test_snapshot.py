@@ -0,0 +1,110 @@
+"""
+Snapshot bundles: BM25 index included, cheap default checks, cold start
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+from src.lexical_index import LexicalIndex
+from src.snapshot import SnapshotError, SnapshotIndex, SnapshotWriter
+
+WORDS = ["glacier", "monsoon", "outburst", "flood", "hydropower", "carbon", "forest", "rainfall"]
+
+def make_chunks(count: int, dim: int = 16, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    ids = [f"{row:032x}" for row in range(count)]
+    texts = [" ".join(rng.choice(WORDS, size=12)) + f" NEC-{row}" for row in range(count)]
+    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+    metadatas = [{"source": f"report-{row // 50}.pdf", "page": row % 50} for row in range(count)]
+    return ids, vectors, texts, metadatas
+
+def write_snapshot(path, count: int = 200, embedding_model: str = "test", embedding_runtime: str = "torch"):
+    ids, vectors, texts, metadatas = make_chunks(count)
+    writer = SnapshotWriter(str(path), count, vectors.shape[1], embedding_model=embedding_model,
+                            embedding_runtime=embedding_runtime)
+    for start in range(0, count, 64):
+        end = start + 64
+        writer.add(ids[start:end], vectors[start:end], texts[start:end], metadatas[start:end])
+    writer.commit()
+    return ids, texts
+
+def test_bundle_carries_the_bm25_index(tmp_path):
+    ids, texts = write_snapshot(tmp_path / "index.ragsnap")
+    rebuilt = LexicalIndex("")
+    rebuilt.add(ids, texts)
+    
+    snapshot = SnapshotIndex(str(tmp_path / "index.ragsnap"), embedding_model="test", verify=False)
+    loaded = snapshot.load_lexical_index("")
+    assert len(loaded) == len(ids)
+    for query in ("glacier outburst flood", "NEC-17", "hydropower carbon"):
+        assert loaded.search(query, 5) == rebuilt.search(query, 5)
+
+def test_default_load_checks_size_and_header_but_not_section_hashes(tmp_path):
+    path = tmp_path / "index.ragsnap"
+    write_snapshot(path)
+    snapshot = SnapshotIndex(str(path), embedding_model="test", verify=False)
+    vectors_offset = snapshot.header["sections"]["vectors"]["offset"]
+    del snapshot
+    data = bytearray(path.read_bytes())
+    data[vectors_offset] ^= 0xFF
+    path.write_bytes(bytes(data))
+    
+    SnapshotIndex(str(path), embedding_model="test", verify=False)
+    with pytest.raises(SnapshotError, match="corrupted"):
+        SnapshotIndex(str(path), embedding_model="test", verify=True)
+    
+    path.write_bytes(bytes(data) + b"\x00")
+    with pytest.raises(SnapshotError, match="larger"):
+        SnapshotIndex(str(path), embedding_model="test", verify=False)
+    path.write_bytes(bytes(data[:-10]))
+    with pytest.raises(SnapshotError, match="truncated"):
+        SnapshotIndex(str(path), embedding_model="test", verify=False)
+
+def test_bundle_from_another_embedding_runtime_is_refused(tmp_path):
+    path = tmp_path / "index.ragsnap"
+    write_snapshot(path, count=10, embedding_runtime="onnx-int8")
+    with pytest.raises(SnapshotError, match="onnx-int8"):
+        SnapshotIndex(str(path), embedding_model="test", verify=False, embedding_runtime="torch")
+    snapshot = SnapshotIndex(str(path), embedding_model="test", verify=False, embedding_runtime="onnx-int8")
+    assert snapshot.count == 10
+
+def test_cold_start_loads_bm25_faster_than_rebuilding_it(tmp_path):
+    ids, texts = write_snapshot(tmp_path / "index.ragsnap", count=20000)
+    
+    start = time.perf_counter()
+    snapshot = SnapshotIndex(str(tmp_path / "index.ragsnap"), embedding_model="test", verify=False)
+    loaded = snapshot.load_lexical_index("")
+    load_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    rebuilt = LexicalIndex("")
+    for row in range(0, len(ids), 500):
+        rebuilt.add(ids[row:row + 500], [snapshot.get_text(number) for number in range(row, min(row + 500, len(ids)))])
+    rebuild_seconds = time.perf_counter() - start
+    
+    assert len(loaded) == len(rebuilt) == len(ids)
+    assert load_seconds < rebuild_seconds / 2
+
+def test_vector_store_manager_serves_snapshot_bm25_without_rebuilding(tmp_path, monkeypatch):
+    pytest.importorskip("langchain_core")
+    from src import resources
+    from src.config import config
+    from src.vectorstore import VectorStoreManager
+    
+    # Queries would be embedded on PyTorch, as the bundle was
+    monkeypatch.setattr(resources, "_embedding_model", object())
+    monkeypatch.setattr(resources, "_embedding_runtime", "torch")
+    ids, _ = write_snapshot(tmp_path / "index.ragsnap", embedding_model=config.EMBEDDING_MODEL)
+    monkeypatch.setattr(config, "RETRIEVAL_MODE", "hybrid")
+    monkeypatch.setattr(config, "LEXICAL_INDEX_PATH", str(tmp_path / "lexical_index.npz"))
+    
+    def rebuild(self, ids, texts):
+        raise AssertionError("BM25 index rebuilt on cold start")
+    
+    manager = VectorStoreManager()
+    monkeypatch.setattr(LexicalIndex, "add", rebuild)
+    manager.load_snapshot(str(tmp_path / "index.ragsnap"), verify=False)
+    assert len(manager.lexical_index) == len(ids)
+    assert manager.lexical_index.search("NEC-17", 3)[0][0] == ids[17]
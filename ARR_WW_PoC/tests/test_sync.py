@@ -0,0 +1,95 @@
+"""
+Incremental re-indexing against the content-hash manifest
+"""
+
+import os
+import time
+
+import pytest
+
+pytest.importorskip("langchain_community")
+pytest.importorskip("chromadb")
+
+from benchmarks.fakes import FakeEmbeddings
+from src import resources
+from src.config import config
+from src.manifest import IndexManifest
+from src.vectorstore import VectorStoreManager
+
+class BrokenEmbeddings(FakeEmbeddings):
+    """Fails to embed any text mentioning "broken" while `fail` is set"""
+    
+    fail = True
+    
+    def embed_documents(self, texts):
+        if self.fail and any("broken" in text for text in texts):
+            raise RuntimeError("embedding failed")
+        return super().embed_documents(texts)
+
+def write(name: str, text: str, age_seconds: float = 60):
+    path = os.path.join("data", name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    # Older than the settle window, so its stat can be trusted next sync
+    stamp = time.time() - age_seconds
+    os.utime(path, (stamp, stamp))
+
+def stored_texts(manager: VectorStoreManager) -> set:
+    return set(manager.vector_store.get(include=["documents"])["documents"])
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Chroma caches clients by path, so give each test its own absolute one
+    monkeypatch.setattr(config, "CHROMA_PERSIST_DIR", str(tmp_path / "chroma_db"))
+    monkeypatch.setattr(config, "VECTOR_BACKEND", "chroma")
+    monkeypatch.setattr(config, "RETRIEVAL_MODE", "dense")
+    monkeypatch.setattr(config, "EMBEDDING_CACHE_ENABLED", False)
+    monkeypatch.setattr(config, "DEDUP_ENABLED", False)
+    monkeypatch.setattr(resources, "_embedding_model", BrokenEmbeddings(dim=16))
+    monkeypatch.setattr(resources, "_embedding_runtime", "torch")
+    os.makedirs("data")
+    manager = VectorStoreManager()
+    yield manager
+    manager.close()
+
+def test_only_new_changed_and_removed_files_are_reindexed(manager, monkeypatch):
+    write("a.txt", "glacier lake outburst")
+    write("b.txt", "monsoon rainfall")
+    stats = manager.sync_documents("data")
+    assert (stats["added_files"], stats["added_chunks"]) == (2, 2)
+    
+    os.remove(os.path.join("data", "a.txt"))
+    write("b.txt", "monsoon rainfall revised", age_seconds=30)
+    write("c.txt", "hydropower forest")
+    stats = manager.sync_documents("data")
+    assert (stats["added_files"], stats["changed_files"], stats["removed_files"]) == (1, 1, 1)
+    assert stats["deleted_chunks"] == 2
+    assert stored_texts(manager) == {"monsoon rainfall revised", "hydropower forest"}
+    
+    # Files whose size and mtime match the manifest are not even read
+    def hash_file(path, block_size=1 << 20):
+        raise AssertionError(f"{path} hashed")
+    
+    monkeypatch.setattr(IndexManifest, "hash_file", staticmethod(hash_file))
+    stats = manager.sync_documents("data")
+    assert stats["unchanged_files"] == 2 and stats["added_chunks"] == 0
+
+def test_failed_file_is_rolled_back_and_retried(manager, monkeypatch):
+    monkeypatch.setattr(config, "UPSERT_BATCH_SIZE", 1)
+    write("good.txt", "glacier lake outburst")
+    # Long enough for several chunks; the last one fails to embed after the
+    # first ones were already stored
+    write("bad.txt", " ".join(f"carbon sink {number}" for number in range(300)) + " broken")
+    stats = manager.sync_documents("data")
+    assert stats["failed_files"] == {"bad.txt": "embedding failed"}
+    assert stats["added_chunks"] == 1
+    assert stored_texts(manager) == {"glacier lake outburst"}
+    manifest = IndexManifest.load(config.MANIFEST_PATH)
+    assert set(manifest.files) == {"good.txt"}
+    
+    manager.embeddings.fail = False
+    stats = manager.sync_documents("data")
+    assert stats["failed_files"] == {}
+    assert (stats["added_files"], stats["unchanged_files"]) == (1, 1)
+    assert len(stored_texts(manager)) > 2
@@ -0,0 +1,72 @@
+"""
+Token-sized chunking: break strengths and boundary choice
+"""
+
+import re
+
+import numpy as np
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from src.token_splitter import LINE, MID_WORD, PARAGRAPH, SENTENCE, WORD, TokenTextSplitter
+
+def offsets(text: str):
+    """Word and punctuation tokens, with words over 4 letters split into
+    4-letter pieces like subword tokens"""
+    pieces = []
+    for match in re.finditer(r"\w+|[^\w\s]", text):
+        for start in range(match.start(), match.end(), 4):
+            pieces.append((start, min(start + 4, match.end())))
+    return pieces
+
+def splitter(chunk_size: int, chunk_overlap: int = 0) -> TokenTextSplitter:
+    # Skip loading a tokenizer; _split_offsets only needs the sizes
+    splitter = TokenTextSplitter.__new__(TokenTextSplitter)
+    splitter.chunk_size = chunk_size
+    splitter.chunk_overlap = chunk_overlap
+    return splitter
+
+def test_break_scores():
+    text = "Glaciers melt. Lakes\nburst\n\nfloods"
+    tokens = offsets(text)
+    assert [text[start:end] for start, end in tokens] == \
+        ["Glac", "iers", "melt", ".", "Lake", "s", "burs", "t", "floo", "ds"]
+    scores = TokenTextSplitter._break_scores(
+        text, np.array([start for start, _ in tokens]), np.array([end for _, end in tokens]))
+    assert scores.tolist() == [PARAGRAPH, MID_WORD, WORD, MID_WORD, SENTENCE, MID_WORD,
+                               LINE, MID_WORD, PARAGRAPH, MID_WORD, PARAGRAPH]
+
+def test_chunks_end_at_the_strongest_break_in_the_second_half():
+    text = "one two. three four five six seven eight"
+    # A sentence end in the second half beats the later word breaks
+    assert splitter(6)._split_offsets(text, offsets(text))[0] == "one two."
+    # Breaks in the first half are ignored, so chunks do not get too short
+    text = "one. two three four five six seven eight"
+    assert splitter(6)._split_offsets(text, offsets(text))[0] == "one. two three four"
+    # A paragraph beats a sentence, and the latest of equal breaks wins
+    text = "aa bb. cc\n\ndd ee. ff gg hh"
+    assert splitter(8)._split_offsets(text, offsets(text))[0] == "aa bb. cc"
+    text = "aa bb. cc dd. ee ff gg hh"
+    assert splitter(8)._split_offsets(text, offsets(text))[0] == "aa bb. cc dd."
+
+def test_long_words_are_cut_mid_word_only_without_a_better_break():
+    text = "a" * 40
+    chunks = splitter(4)._split_offsets(text, offsets(text))
+    assert chunks == ["a" * 16, "a" * 16, "a" * 8]
+
+def test_overlap_starts_on_a_word_boundary_and_chunks_stay_in_budget():
+    text = " ".join(f"glacier{number} lake" for number in range(30))
+    tokens = offsets(text)
+    chunks = splitter(10, 3)._split_offsets(text, tokens)
+    assert len(chunks) > 3
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert len(offsets(chunk)) <= 10
+        # Whole words carry over: the chunk starts inside the previous one
+        # and on a word, never on a "7 " piece of "glacier7"
+        assert chunk.split()[0] in previous.split()
+    assert chunks[0].startswith("glacier0") and chunks[-1].endswith("glacier29 lake")
+
+def test_empty_tokens_are_ignored():
+    assert splitter(4)._split_offsets("", []) == []
+    assert splitter(4)._split_offsets("ab", [(0, 0), (0, 2), (2, 2)]) == ["ab"]